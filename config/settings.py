@@ -11,8 +11,63 @@ class Settings:
     TELEGRAM_ADMIN_ID = os.getenv("TELEGRAM_ADMIN_ID")
     VSE_GPT_API_KEY = os.getenv("VSE_GPT_API_KEY")
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/easuz")
+
+    # Профиль SQLite (src/database/session.py): бот и краулер работают с одним файлом
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "15000"))  # ожидание блокировки записи
+    SQLITE_CACHE_SIZE_MB = int(os.getenv("SQLITE_CACHE_SIZE_MB", "64"))        # кэш страниц на соединение
+    SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))         # 0 — без mmap
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))         # постоянных соединений в пуле
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # сверх пула при всплеске
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # сек ожидания свободного соединения
+
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"
     YANDEX_GEOCODER_API_KEY = os.getenv("YANDEX_GEOCODER_API_KEY")
 
+    # Парсер ЕАСУЗ: параллельная загрузка карточек лотов
+    EASUZ_BASE_URL = os.getenv("EASUZ_BASE_URL", "https://easuz.mosreg.ru")
+    PARSER_MAX_WORKERS = int(os.getenv("PARSER_MAX_WORKERS", "8"))
+    PARSER_RATE_LIMIT = float(os.getenv("PARSER_RATE_LIMIT", "8"))  # запросов в секунду на хост
+    PARSER_RATE_BURST = float(os.getenv("PARSER_RATE_BURST", "8"))
+    PARSER_PREFETCH_PAGES = int(os.getenv("PARSER_PREFETCH_PAGES", "2"))   # страниц, готовящихся заранее
+    PARSER_MIN_RATE = float(os.getenv("PARSER_MIN_RATE", "0.5"))            # нижняя граница при замедлении
+    PARSER_TARGET_LATENCY = float(os.getenv("PARSER_TARGET_LATENCY", "2"))  # сек, выше — замедляемся
+    PARSER_MAX_ATTEMPTS = int(os.getenv("PARSER_MAX_ATTEMPTS", "6"))
+    PARSER_BACKOFF_BASE = float(os.getenv("PARSER_BACKOFF_BASE", "1"))
+    PARSER_BACKOFF_MAX = float(os.getenv("PARSER_BACKOFF_MAX", "60"))
+    PARSER_BREAKER_THRESHOLD = int(os.getenv("PARSER_BREAKER_THRESHOLD", "5"))
+    PARSER_BREAKER_COOLDOWN = float(os.getenv("PARSER_BREAKER_COOLDOWN", "60"))
+
+    # Кэш HTML-карточек лотов (пустой путь — кэш только в памяти процесса)
+    HTML_CACHE_PATH = os.getenv("HTML_CACHE_PATH", "./data/html_cache.db")
+    HTML_CACHE_TTL_HOURS = float(os.getenv("HTML_CACHE_TTL_HOURS", "168"))
+    HTML_CACHE_NEGATIVE_TTL_MINUTES = float(os.getenv("HTML_CACHE_NEGATIVE_TTL_MINUTES", "60"))
+    HTML_CACHE_MAX_ENTRIES = int(os.getenv("HTML_CACHE_MAX_ENTRIES", "20000"))
+
+    # Архив сырых ответов API и HTML (пустой путь — не архивировать)
+    RAW_ARCHIVE_DIR = os.getenv("RAW_ARCHIVE_DIR", "./data/archive")
+    RAW_ARCHIVE_SEGMENT_RECORDS = int(os.getenv("RAW_ARCHIVE_SEGMENT_RECORDS", "500"))
+
+    # Пакетная запись объявлений в БД
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "200"))     # строк в одном INSERT
+    INGEST_COMMIT_EVERY = int(os.getenv("INGEST_COMMIT_EVERY", "1"))   # пакетов на один COMMIT
+
+    # Кэш фото объявлений в боте: битый URL повторно пробуется не раньше, чем через столько часов
+    PHOTO_BAD_URL_RETRY_HOURS = int(os.getenv("PHOTO_BAD_URL_RETRY_HOURS", "24"))
+
+    # Фоновая синхронизация с ЕАСУЗ внутри процесса бота
+    INGEST_SCHEDULER_ENABLED = os.getenv("INGEST_SCHEDULER_ENABLED", "True").lower() == "true"
+    INGEST_INCREMENTAL_INTERVAL_MINUTES = int(os.getenv("INGEST_INCREMENTAL_INTERVAL_MINUTES", "60"))
+    INGEST_FULL_INTERVAL_HOURS = int(os.getenv("INGEST_FULL_INTERVAL_HOURS", "24"))
+    INGEST_FULL_MAX_PAGES = int(os.getenv("INGEST_FULL_MAX_PAGES", "0"))  # 0 — вся лента
+
+    # Распределённый обход: шарды ленты раздаются воркерам через таблицу crawl_shards
+    CRAWL_SHARD_PAGES = int(os.getenv("CRAWL_SHARD_PAGES", "20"))          # страниц в шарде
+    CRAWL_LEASE_SECONDS = int(os.getenv("CRAWL_LEASE_SECONDS", "120"))     # аренда без heartbeat истекает
+    CRAWL_SHARD_MAX_ATTEMPTS = int(os.getenv("CRAWL_SHARD_MAX_ATTEMPTS", "3"))
+    CRAWL_RATE_BUDGET = float(os.getenv("CRAWL_RATE_BUDGET", str(PARSER_RATE_LIMIT)))  # запросов/с на всех воркеров
+    CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "1"))   # воркеров на всех хостах: на них делится CRAWL_RATE_BUDGET
+
 
 settings = Settings()
\ No newline at end of file
@@ -1,6 +1,6 @@
 import requests
 import time
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 from parser.models import LandListing
 
 class EasuzParser:
@@ -107,16 +107,16 @@ class EasuzParser:
         
         return listings, pagination
     
-    def get_all(self, max_pages: Optional[int] = None, delay: float = 1.0) -> List[LandListing]:
+    def iter_all(self, max_pages: Optional[int] = None, delay: float = 1.0) -> Iterator[LandListing]:
         """
-        Получить все объявления со всех страниц
+        Лениво отдаёт объявления со всех страниц, по мере загрузки
         
         Args:
             max_pages: Максимальное количество страниц (None = все)
             delay: Задержка между запросами в секундах
         """
-        all_listings = []
         page = 1
+        count = 0
         
         print(f"Начинаем парсинг...")
         
@@ -129,12 +129,12 @@ class EasuzParser:
                 print("Нет данных")
                 break
             
-            all_listings.extend(listings)
-            
+            count += len(listings)
             total_pages = pagination.get('pageCount', 0)
             total_count = pagination.get('countTotal', 0)
             
-            print(f"Получено {len(listings)} объявлений. Всего: {len(all_listings)}/{total_count}")
+            print(f"Получено {len(listings)} объявлений. Всего: {count}/{total_count}")
+            yield from listings
             
             # Проверяем условия выхода
             if page >= total_pages:
@@ -147,8 +147,11 @@ class EasuzParser:
             page += 1
             time.sleep(delay)  # Задержка между запросами
         
-        print(f"\nПарсинг завершен! Всего объявлений: {len(all_listings)}")
-        return all_listings
+        print(f"\nПарсинг завершен! Всего объявлений: {count}")
+    
+    def get_all(self, max_pages: Optional[int] = None, delay: float = 1.0) -> List[LandListing]:
+        """Получить все объявления со всех страниц списком (см. iter_all)"""
+        return list(self.iter_all(max_pages, delay))
     
     def search(self, 
                query: Optional[str] = None,
@@ -0,0 +1,147 @@
+# scripts/bench_bot_latency.py
+# Бенчмарк задержки обработчиков бота при одновременных пользователях: синхронные сервисы
+# на цикле событий (как было) против AsyncSession + aiosqlite
+#
+# Каждый «пользователь» в цикле выполняет типичный сценарий обработчика: поиск,
+# проверка избранного для выдачи, добавление в избранное, и «отправку» ответа
+# (asyncio.sleep — сетевой запрос к Telegram). Без LLM: поиск идёт через умный fallback.
+#
+# Использование:
+#     python scripts/bench_bot_latency.py --rows 20000 --users 1 10 50
+#     python scripts/bench_bot_latency.py --mode async --users 100 200 --seconds 10
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from config.settings import settings
+
+# Без ключа LLM поиск не ходит в сеть — измеряем только БД
+settings.VSE_GPT_API_KEY = None
+
+from src.database.async_session import make_async_engine
+from src.database.bulk import ListingWriter
+from src.database.models import Base
+from src.database.session import make_engine
+from src.services.favorites import AsyncFavoritesService, FavoritesService
+from src.services.search import AsyncSearchService, SearchService
+from scripts.bench_sqlite_contention import make_rows, percentile
+
+QUERIES = ["участок до 3000000", "участок до 15 млн", "земля до 800 тыс", "участок до 40 млн"]
+
+
+async def sync_handler(SessionLocal, user_id: int, step: int, send_delay: float):
+    """Старый путь: синхронная сессия прямо на цикле событий"""
+    with SessionLocal() as db:
+        results = SearchService(db).search_by_natural_language(QUERIES[step % len(QUERIES)])
+        fav_service = FavoritesService(db)
+        for listing in results[:7]:
+            fav_service.is_favorite(user_id, listing.id)
+        if results:
+            fav_service.add(user_id, results[step % len(results)].id)
+    await asyncio.sleep(send_delay)
+
+
+async def async_handler(SessionLocal, user_id: int, step: int, send_delay: float):
+    """Новый путь: AsyncSession, запросы не блокируют цикл"""
+    async with SessionLocal() as db:
+        results = await AsyncSearchService(db).search_by_natural_language(QUERIES[step % len(QUERIES)])
+        fav_service = AsyncFavoritesService(db)
+        await fav_service.favorite_ids(user_id, [listing.id for listing in results[:7]])
+        if results:
+            await fav_service.add(user_id, results[step % len(results)].id)
+    await asyncio.sleep(send_delay)
+
+
+async def user(handler, SessionLocal, user_id: int, deadline: float, latencies: list, args):
+    # Случайные паузы (экспоненциальные), чтобы пользователи не шли в ногу
+    rng = random.Random(user_id)
+    await asyncio.sleep(rng.uniform(0, args.think / 1000))
+    step = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await handler(SessionLocal, user_id, step, args.send_delay / 1000)
+        latencies.append(time.perf_counter() - started)
+        step += 1
+        await asyncio.sleep(rng.expovariate(1000 / args.think) if args.think else 0)
+
+
+async def loop_lag(deadline: float, lags: list, interval: float = 0.01):
+    """Насколько позже срока просыпается цикл событий — время, когда он был занят"""
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def run_load(mode: str, users: int, db_url: str, args):
+    if mode == "sync":
+        engine = make_engine(db_url)
+        SessionLocal, handler = sessionmaker(bind=engine, autoflush=False), sync_handler
+    else:
+        engine = make_async_engine(db_url)
+        SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        handler = async_handler
+
+    latencies, lags = [], []
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(loop_lag(deadline, lags), *(
+        user(handler, SessionLocal, user_id, deadline, latencies, args) for user_id in range(1, users + 1)
+    ))
+    if mode == "sync":
+        engine.dispose()
+    else:
+        await engine.dispose()
+
+    ms = [value * 1000 for value in latencies]
+    print(f"  {mode:<7}{users:>7}{len(ms):>9}{len(ms) / args.seconds:>9.1f}"
+          f"{statistics.median(ms):>10.1f}{percentile(ms, 0.99):>10.1f}"
+          f"{percentile(lags, 0.99) * 1000:>12.1f}{max(lags) * 1000:>11.1f}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Задержка обработчиков бота под нагрузкой")
+    arg_parser.add_argument("--rows", type=int, default=20000, help="объявлений в БД")
+    arg_parser.add_argument("--users", type=int, nargs="+", default=[1, 10, 50])
+    arg_parser.add_argument("--seconds", type=float, default=5, help="длительность замера на точку")
+    arg_parser.add_argument("--send-delay", type=float, default=50, help="«отправка» ответа в Telegram, мс")
+    arg_parser.add_argument("--think", type=float, default=1000, help="средняя пауза пользователя между запросами, мс")
+    arg_parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    args = arg_parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    db_url = f"sqlite:///{os.path.join(tmp_dir.name, 'bot.db')}"
+    engine = make_engine(db_url)
+    Base.metadata.create_all(engine)
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write(make_rows(args.rows))
+    engine.dispose()
+
+    # Логи поиска на каждый запрос исказили бы замер
+    logging.disable(logging.ERROR)
+
+    print("=" * 60)
+    print(f"🤖 Задержка обработчиков: {args.rows} объявлений, отправка {args.send_delay:.0f} мс")
+    print("=" * 60)
+    print(f"  {'режим':<7}{'польз.':>7}{'запросов':>9}{'в сек':>9}{'p50, мс':>10}{'p99, мс':>10}"
+          f"{'лаг p99, мс':>12}{'лаг макс':>11}")
+    for users in args.users:
+        for mode in (["sync", "async"] if args.mode == "both" else [args.mode]):
+            asyncio.run(run_load(mode, users, db_url, args))
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# scripts/bench_extract.py
+# Бенчмарк извлечения данных из HTML-карточки лота: BeautifulSoup против быстрого экстрактора
+#
+# Использование:
+#     python scripts/bench_extract.py [путь_к_html] [--runs N]
+
+import argparse
+import os
+import sys
+import time
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.parser.extract import extract_left_col_pairs, extract_left_col_pairs_soup
+
+DEFAULT_PAGE = os.path.join(os.path.dirname(__file__), '..', 'correct_lot.html')
+
+
+def measure(func, html: str, runs: int) -> float:
+    """Среднее процессорное время одного вызова, мс"""
+    func(html)  # прогрев
+    start = time.process_time()
+    for _ in range(runs):
+        func(html)
+    return (time.process_time() - start) / runs * 1000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк разбора карточки лота")
+    arg_parser.add_argument("page", nargs="?", default=DEFAULT_PAGE)
+    arg_parser.add_argument("--runs", type=int, default=50)
+    args = arg_parser.parse_args()
+
+    with open(args.page, encoding='utf-8') as f:
+        html = f.read()
+
+    print("=" * 60)
+    print(f"📄 Страница: {os.path.basename(args.page)} ({len(html.encode('utf-8')) / 1024:.0f} КБ)")
+    print("=" * 60)
+
+    expected = extract_left_col_pairs_soup(html)
+    actual = extract_left_col_pairs(html)
+    if actual != expected:
+        print("❌ Результаты различаются!")
+        print(f"   BeautifulSoup: {expected}")
+        print(f"   Экстрактор:    {actual}")
+        sys.exit(1)
+    print(f"✅ Результаты совпадают: {len(actual)} пар")
+    for label, value in actual:
+        print(f"   • {label}: {value[:60]}")
+
+    soup_ms = measure(extract_left_col_pairs_soup, html, args.runs)
+    fast_ms = measure(extract_left_col_pairs, html, args.runs)
+
+    print(f"\n🐢 BeautifulSoup: {soup_ms:.2f} мс CPU на страницу")
+    print(f"🚀 Экстрактор:    {fast_ms:.2f} мс CPU на страницу")
+    print(f"⚡ Ускорение:     x{soup_ms / fast_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
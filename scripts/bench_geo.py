@@ -0,0 +1,140 @@
+# scripts/bench_geo.py
+# Бенчмарк поиска по расстоянию: haversine по всем лотам в Python (как было)
+# против R*Tree listings_rtree + точного haversine по кандидатам
+#
+# Для каждого запроса — медиана по случайным точкам внутри области лотов:
+#     ids   — только отбор (id, км), без загрузки объектов Listing
+#     полный — SearchService.find_nearest / find_within_radius с загрузкой лотов
+# Результаты R*Tree сверяются с полным перебором.
+#
+# Использование:
+#     python scripts/bench_geo.py --rows 100000
+#     python scripts/bench_geo.py --rows 20000 --points 200 --plan
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+
+# Без ключа LLM SearchService не создаёт сетевой клиент
+settings.VSE_GPT_API_KEY = None
+
+from src.database.bulk import ListingWriter
+from src.database.models import Base, Listing
+from src.database.session import make_engine
+from src.database.spatial import NEARBY_SQL, bounding_box, haversine
+from src.services.search import NEAREST_MAX_RADIUS_KM, SearchService
+from scripts.bench_sqlite_contention import make_rows
+
+# (подпись, режим, параметр, limit)
+CASES = [
+    ("10 ближайших", "nearest", 10, None),
+    ("в радиусе 2 км", "radius", 2.0, None),
+    ("в радиусе 15 км, 10 ближайших", "radius", 15.0, 10),
+]
+
+
+def brute_force(db, lat, lon, mode, value, limit):
+    """Старый способ: все координаты из БД, haversine в Python"""
+    rows = db.execute(select(Listing.id, Listing.latitude, Listing.longitude).where(Listing.is_active == True))
+    found = sorted(
+        (haversine(lat, lon, row_lat, row_lon), listing_id) for listing_id, row_lat, row_lon in rows
+        if row_lat is not None and row_lon is not None
+    )
+    if mode == "nearest":
+        return [listing_id for _, listing_id in found[:value]]
+    within = [listing_id for distance, listing_id in found if distance <= value]
+    return within[:limit] if limit else within
+
+
+def rtree_ids(service, lat, lon, mode, value, limit):
+    if mode == "nearest":
+        found = service._nearest(lat, lon, value, NEAREST_MAX_RADIUS_KM)
+    elif limit:
+        found = service._nearest(lat, lon, limit, value)
+    else:
+        found = service._nearby(lat, lon, value)
+    return [listing_id for listing_id, _ in found]
+
+
+def rtree_full(service, lat, lon, mode, value, limit):
+    if mode == "nearest":
+        return service.find_nearest(lat, lon, k=value)
+    return service.find_within_radius(lat, lon, value, limit=limit)
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Поиск лотов по расстоянию: перебор против R*Tree")
+    arg_parser.add_argument("--rows", type=int, default=100000)
+    arg_parser.add_argument("--points", type=int, default=100, help="случайных точек на запрос")
+    arg_parser.add_argument("--brute-points", type=int, default=5, help="точек для полного перебора (он медленный)")
+    arg_parser.add_argument("--plan", action="store_true", help="показать план запроса к R*Tree")
+    args = arg_parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    engine = make_engine(f"sqlite:///{os.path.join(tmp_dir.name, 'geo.db')}")
+    Base.metadata.create_all(engine)
+
+    started = time.perf_counter()
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write(make_rows(args.rows))
+    ingest = time.perf_counter() - started
+
+    rng = random.Random(7)
+    points = [(55.05 + rng.random() * 0.9, 37.05 + rng.random() * 0.9) for _ in range(args.points)]
+
+    print("=" * 88)
+    print(f"🗺  Поиск по расстоянию: {args.rows} лотов (запись с R*Tree: {ingest:.1f} с), {args.points} точек")
+    print("=" * 88)
+    print(f"  {'запрос':<32}{'перебор, мс':>13}{'R*Tree ids, мс':>16}{'полный, мс':>12}{'лотов':>8}{'сверка':>8}")
+    # Без LLM SearchService пишет ошибку инициализации клиента — в замере она не нужна
+    logging.disable(logging.ERROR)
+    with Session(engine) as db:
+        service = SearchService(db)
+        if args.plan:
+            plan = db.connection().exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {NEARBY_SQL}", bounding_box(*points[0], 2.0)
+            ).all()
+            print("  план: " + "; ".join(row[-1] for row in plan))
+
+        for label, mode, value, limit in CASES:
+            brute_times, ids_times, full_times, sizes, mismatches = [], [], [], [], 0
+            for i, (lat, lon) in enumerate(points):
+                ids_time, ids = timed(rtree_ids, service, lat, lon, mode, value, limit)
+                full_time, full = timed(rtree_full, service, lat, lon, mode, value, limit)
+                db.expunge_all()
+                ids_times.append(ids_time)
+                full_times.append(full_time)
+                sizes.append(len(ids))
+                if i < args.brute_points:
+                    brute_time, expected = timed(brute_force, db, lat, lon, mode, value, limit)
+                    brute_times.append(brute_time)
+                    mismatches += ids != expected
+            print(f"  {label:<32}{statistics.median(brute_times) * 1000:>13.1f}"
+                  f"{statistics.median(ids_times) * 1000:>16.3f}{statistics.median(full_times) * 1000:>12.3f}"
+                  f"{statistics.median(sizes):>8.0f}{'✅' if not mismatches else f'❌{mismatches}':>8}")
+
+    engine.dispose()
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# scripts/bench_ingest.py
+# Сквозной бенчмарк загрузки: EasuzParser + ListingWriter против локального фейкового ЕАСУЗ
+#
+# Сервер (scripts/fake_easuz.py) запускается в отдельном процессе, поэтому
+# процессорное время и память в отчёте — только парсера и записи в БД.
+#
+# Использование:
+#     python scripts/bench_ingest.py --lots 1000
+#     python scripts/bench_ingest.py --lots 100000 --latency 30 --error-rate 0.01 --workers 16
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config.settings import settings
+from src.database.bulk import ListingWriter
+from src.database.models import Base
+from src.database.session import make_engine
+from src.parser.html_cache import HtmlDetailCache
+from src.parser.scraper import EasuzParser
+from scripts.fake_easuz import serve
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS процесса, МБ (на Linux ru_maxrss в КБ, на macOS — в байтах)"""
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def start_server(args) -> tuple:
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=serve,
+        kwargs=dict(lots=args.lots, latency=args.latency, error_rate=args.error_rate, ready=ready),
+        daemon=True,
+    )
+    process.start()
+    port = ready.get(timeout=30)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк загрузки лотов")
+    arg_parser.add_argument("--lots", type=int, default=1000, help="размер ленты (1k…100k)")
+    arg_parser.add_argument("--per-page", type=int, default=10)
+    arg_parser.add_argument("--workers", type=int, default=settings.PARSER_MAX_WORKERS)
+    arg_parser.add_argument("--rate", type=float, default=1000, help="лимит запросов в секунду")
+    arg_parser.add_argument("--latency", type=float, default=0, help="задержка сервера, мс")
+    arg_parser.add_argument("--error-rate", type=float, default=0, help="доля ошибок сервера (0..1)")
+    arg_parser.add_argument("--db", help="файл SQLite (по умолчанию временный)")
+    args = arg_parser.parse_args()
+
+    process, base_url = start_server(args)
+    tmp_dir = tempfile.TemporaryDirectory()
+    db_path = args.db or os.path.join(tmp_dir.name, 'bench.db')
+    engine = make_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+
+    print("=" * 60)
+    print(f"🧪 Лента: {args.lots} лотов, {args.workers} потоков, задержка {args.latency:.0f} мс, "
+          f"ошибок {args.error_rate:.0%}")
+    print(f"🌐 Сервер: {base_url}, БД: {db_path}")
+    print("=" * 60)
+
+    # Архив и дисковый кэш не нужны: измеряем сеть, разбор и запись
+    settings.RAW_ARCHIVE_DIR = ''
+    parser = EasuzParser(
+        max_workers=args.workers, rate_limit=args.rate, rate_burst=args.rate, base_url=base_url,
+        html_cache=HtmlDetailCache(':memory:', ttl=1, negative_ttl=1, max_entries=1),
+    )
+    requests_made = 0
+    lock = threading.Lock()
+
+    def count_request(response, *a, **kw):
+        nonlocal requests_made
+        with lock:
+            requests_made += 1
+
+    parser.session.hooks['response'].append(count_request)
+
+    lots = 0
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        with ListingWriter(engine=engine, generation=1) as writer:
+            for page in parser.iter_pages(per_page=args.per_page, fetch_html=True):
+                lots += writer.write(page.listings)
+                if page.page % 100 == 0:
+                    print(f"  … {lots} лотов, {lots / (time.perf_counter() - wall_start):.0f} лот/с")
+    finally:
+        parser.close()
+        process.terminate()
+        process.join()
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    print(f"\n📦 Загружено лотов: {lots} (новых {writer.inserted}, изменилось {writer.updated})")
+    print(f"⏱️  Время:          {wall:.1f} с")
+    print(f"🚀 Лотов в секунду: {lots / wall:.1f}")
+    print(f"🌐 Запросов:        {requests_made} ({requests_made / wall:.1f} в секунду)")
+    print(f"🧠 CPU на лот:      {cpu / max(lots, 1) * 1000:.2f} мс")
+    print(f"💾 Пиковый RSS:     {peak_rss_mb():.0f} МБ")
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
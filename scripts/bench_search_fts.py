@@ -0,0 +1,147 @@
+# scripts/bench_search_fts.py
+# Бенчмарк фильтров поиска: lower() LIKE '%...%' (как было), FTS5 listings_fts
+# и нормализованные колонки с составными индексами (municipality, purpose_mask, deal_type)
+#
+# Для каждого запроса — медиана времени выдачи бота (LIMIT 10) и число найденных лотов.
+# LIKE с lower() в SQLite не приводит кириллицу к нижнему регистру, поэтому
+# «Мытищи» и «мытищ» для него — разные строки; FTS и колонки находят и те, и другие.
+#
+# Использование:
+#     python scripts/bench_search_fts.py --rows 100000
+#     python scripts/bench_search_fts.py --rows 20000 --repeat 50 --plan
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from src.database.bulk import ListingWriter
+from src.database.fts import ADDRESS_COLUMNS, match_all, match_any, matching_ids
+from src.database.models import Base, Listing
+from src.database.normalize import deal_type, purpose_category_ids
+from src.database.session import make_engine
+from src.services.search import PURCHASE_KIND_MAPPING, PURPOSE_COLUMNS, PURPOSE_MAPPING, SearchService
+from scripts.bench_sqlite_contention import make_rows
+
+# (подпись, город, ключ назначения, тип сделки, потолок цены)
+CASES = [
+    ("город", "мытищ", None, None, None),
+    ("назначение", None, "ижс", None, None),
+    ("город + назначение", "королёв", "склад", None, None),
+    ("город+назн.+сделка+цена", "балаших", "садовод", "аренда", 10_000_000),
+    ("редкий город", "дмитров", "торгов", "продажа", 2_000_000),
+]
+
+
+def like_conditions(city, purpose_key, deal):
+    """Старые фильтры SearchService: lower() LIKE '%...%'"""
+    conditions = []
+    if city:
+        conditions.append(or_(
+            func.lower(Listing.address_description).like(f"%{city}%"),
+            func.lower(Listing.name).like(f"%{city}%"),
+        ))
+    if purpose_key:
+        conditions.append(or_(*[
+            func.lower(Listing.land_allowed_use_name).like(f"%{p.lower()}%") for p in PURPOSE_MAPPING[purpose_key]
+        ]))
+    if deal:
+        conditions.append(or_(*[
+            func.lower(Listing.purchase_kind_name).like(f"%{k.lower()}%") for k in PURCHASE_KIND_MAPPING[deal]
+        ]))
+    return conditions
+
+
+def fts_conditions(city, purpose_key, deal):
+    """Город и назначение — MATCH по listings_fts, тип сделки — по-прежнему LIKE"""
+    expression = match_all([
+        match_any([city], ("name",) + ADDRESS_COLUMNS) if city else None,
+        match_any(PURPOSE_MAPPING[purpose_key], PURPOSE_COLUMNS) if purpose_key else None,
+    ])
+    conditions = [Listing.id.in_(matching_ids(expression))] if expression else []
+    return conditions + like_conditions(None, None, deal)
+
+
+def column_conditions(city, purpose_key, deal):
+    """Текущие фильтры SearchService: равенство, биты и IN по теневым колонкам"""
+    conditions = []
+    if city:
+        conditions.append(SearchService._municipality_condition(city))
+    if purpose_key:
+        conditions.append(SearchService._purpose_condition(purpose_category_ids(PURPOSE_MAPPING[purpose_key])))
+    if deal:
+        conditions.append(Listing.deal_type.in_(sorted({deal_type(k) for k in PURCHASE_KIND_MAPPING[deal]})))
+    return conditions
+
+
+def build_query(db, conditions, price_cap):
+    query = db.query(Listing).filter(Listing.is_active == True, *conditions)
+    if price_cap:
+        query = query.filter(Listing.start_price <= price_cap)
+    return query
+
+
+def measure(db, conditions, price_cap, repeat):
+    query = build_query(db, conditions, price_cap)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        query.order_by(Listing.start_price.asc()).limit(10).all()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, query.count()
+
+
+def query_plan(db, conditions, price_cap) -> str:
+    statement = build_query(db, conditions, price_cap).order_by(Listing.start_price.asc()).limit(10).statement
+    compiled = statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+    return "; ".join(row[-1] for row in rows)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="LIKE, FTS5 и индексированные колонки в поиске лотов")
+    arg_parser.add_argument("--rows", type=int, default=100000)
+    arg_parser.add_argument("--repeat", type=int, default=20, help="повторов каждого запроса")
+    arg_parser.add_argument("--plan", action="store_true", help="показать план запроса по колонкам")
+    args = arg_parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    engine = make_engine(f"sqlite:///{os.path.join(tmp_dir.name, 'search.db')}")
+    Base.metadata.create_all(engine)
+
+    started = time.perf_counter()
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write(make_rows(args.rows))
+    ingest = time.perf_counter() - started
+    db_size = sum(os.path.getsize(os.path.join(tmp_dir.name, name)) for name in os.listdir(tmp_dir.name))
+
+    print("=" * 84)
+    print(f"🔎 Поиск по {args.rows} лотам (запись: {ingest:.1f} с, "
+          f"{args.rows / ingest:.0f} строк/с; файлы БД {db_size / 1024 / 1024:.0f} МБ)")
+    print("=" * 84)
+    print(f"  {'запрос':<26}{'LIKE, мс':>10}{'найдено':>9}{'FTS, мс':>10}{'найдено':>9}"
+          f"{'индекс, мс':>12}{'найдено':>9}")
+    with Session(engine) as db:
+        for label, city, purpose_key, deal, price_cap in CASES:
+            row = f"  {label:<26}"
+            for build, width in ((like_conditions, 10), (fts_conditions, 10), (column_conditions, 12)):
+                ms, found = measure(db, build(city, purpose_key, deal), price_cap, args.repeat)
+                row += f"{ms:>{width}.2f}{found:>9}"
+            print(row)
+            if args.plan:
+                print(f"      план: {query_plan(db, column_conditions(city, purpose_key, deal), price_cap)}")
+
+    engine.dispose()
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
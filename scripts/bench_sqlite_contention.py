@@ -0,0 +1,173 @@
+# scripts/bench_sqlite_contention.py
+# Бенчмарк конкуренции в SQLite: задержка чтения (запросы бота), пока идёт пакетная запись (синхронизация)
+#
+# Для каждого профиля — новая временная БД:
+#     default — create_engine() без настроек (как было до профиля)
+#     tuned   — src.database.session.make_engine (WAL, synchronous=NORMAL, busy_timeout, кэш, mmap, пул)
+#
+# Использование:
+#     python scripts/bench_sqlite_contention.py --rows 20000
+#     python scripts/bench_sqlite_contention.py --rows 50000 --readers 4 --commit-every 10 --profile tuned
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from src.database.bulk import ListingWriter
+from src.database.models import Base, Listing
+from src.database.session import make_engine
+from src.parser.models import ListingRow
+
+PURPOSES = ["Для индивидуального жилищного строительства", "Склад", "Магазины", "Ведение садоводства"]
+KINDS = ["Аренда", "Продажа"]
+CITIES = ["Мытищи", "Балашиха", "Королёв", "Подольск", "Химки", "Сергиев Посад", "Коломна", "Дмитров"]
+
+
+def make_rows(count: int, price_factor: float = 1.0):
+    rng = random.Random(42)
+    for i in range(1, count + 1):
+        price = rng.uniform(1e5, 5e7) * price_factor
+        address = f"Московская обл., г.о. {rng.choice(CITIES)}, участок {i}"
+        yield ListingRow(
+            id=i, name=f"Земельный участок №{i}", registry_number=f"BENCH-{i:07d}",
+            start_price=price, deposit_amount=price * 0.2, start_step_amount=price * 0.03,
+            total_square=rng.uniform(300, 50000), address_description=address,
+            latitude=55 + rng.random(), longitude=37 + rng.random(), district_code=None,
+            right_term_use_year=None, right_term_use_month=None,
+            purchase_kind_name=rng.choice(KINDS), purchase_form_name="Аукцион",
+            stage_state_name="Прием заявок", land_allowed_use_name=rng.choice(PURPOSES),
+            accept_plan_end_date=None, review_plan_end_date=None, count_views=0, photos_json=None,
+            full_address=address, direct_url=f"https://easuz.mosreg.ru/{i}",
+            object_type="land", cadastral_number=f"50:00:0000000:{i}",
+        )
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def read_once(engine, rng) -> float:
+    """Типичный запрос поиска бота: фильтр + сортировка + LIMIT"""
+    low = rng.uniform(1e5, 4e7)
+    started = time.perf_counter()
+    with Session(engine) as db:
+        db.query(Listing).filter(
+            Listing.is_active == True,
+            Listing.start_price.between(low, low * 1.5),
+            Listing.land_allowed_use_name == rng.choice(PURPOSES),
+        ).order_by(Listing.start_price).limit(10).all()
+    return time.perf_counter() - started
+
+
+def reader(engine, stop: threading.Event, latencies: list, errors: list, seed: int, pause: float):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        try:
+            latencies.append(read_once(engine, rng))
+        except OperationalError as e:
+            errors.append(str(e.orig))
+        time.sleep(pause)
+
+
+def measure_reads(engine, args, duration: float = None, writer_thread: threading.Thread = None):
+    """Читатели работают заданное время или пока жив поток записи"""
+    stop = threading.Event()
+    latencies, errors = [], []
+    readers = [
+        threading.Thread(target=reader, args=(engine, stop, latencies, errors, seed, args.pause / 1000), daemon=True)
+        for seed in range(args.readers)
+    ]
+    for thread in readers:
+        thread.start()
+    if writer_thread is not None:
+        writer_thread.join()
+    else:
+        time.sleep(duration)
+    stop.set()
+    for thread in readers:
+        thread.join()
+    return latencies, errors
+
+
+def report(label: str, latencies: list, errors: list):
+    ms = [value * 1000 for value in latencies]
+    print(f"  {label:<22}{len(ms):>7}{statistics.median(ms) if ms else float('nan'):>9.1f}"
+          f"{percentile(ms, 0.95):>9.1f}{percentile(ms, 0.99):>9.1f}{max(ms, default=float('nan')):>10.1f}"
+          f"{len(errors):>8}")
+    if errors:
+        print(f"    ❌ {errors[0]}")
+
+
+def run_profile(profile: str, args):
+    tmp_dir = tempfile.TemporaryDirectory()
+    url = f"sqlite:///{os.path.join(tmp_dir.name, 'contention.db')}"
+    engine = make_engine(url) if profile == 'tuned' else create_engine(url)
+    Base.metadata.create_all(engine)
+
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write(make_rows(args.rows))
+
+    print(f"\n🧪 Профиль {profile}: {args.rows} строк, {args.readers} читателей, "
+          f"COMMIT каждые {args.commit_every} пакетов")
+    print(f"  {'':<22}{'чтений':>7}{'p50, мс':>9}{'p95, мс':>9}{'p99, мс':>9}{'макс, мс':>10}{'ошибок':>8}")
+    latencies, errors = measure_reads(engine, args, duration=args.idle_seconds)
+    report("без записи", latencies, errors)
+
+    write_errors = []
+    write_time = [0.0]
+
+    def bulk_write():
+        # Все строки меняются — полный UPDATE таблицы, как при полной синхронизации
+        started = time.perf_counter()
+        try:
+            with ListingWriter(engine=engine, generation=2, commit_every=args.commit_every) as writer:
+                writer.write(make_rows(args.rows, price_factor=1.1))
+        except OperationalError as e:
+            write_errors.append(str(e.orig))
+        write_time[0] = time.perf_counter() - started
+
+    writer_thread = threading.Thread(target=bulk_write, daemon=True)
+    writer_thread.start()
+    latencies, errors = measure_reads(engine, args, writer_thread=writer_thread)
+    report("во время записи", latencies, errors)
+    status = f"❌ {write_errors[0]}" if write_errors else "✅"
+    print(f"  ✍️  Запись {args.rows} строк: {write_time[0]:.1f} с ({args.rows / max(write_time[0], 1e-9):.0f} строк/с) {status}")
+
+    engine.dispose()
+    tmp_dir.cleanup()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Задержка чтения SQLite во время пакетной записи")
+    arg_parser.add_argument("--rows", type=int, default=10000)
+    arg_parser.add_argument("--readers", type=int, default=4, help="параллельных читателей (обработчиков бота)")
+    arg_parser.add_argument("--pause", type=float, default=5, help="пауза между чтениями, мс")
+    arg_parser.add_argument("--commit-every", type=int, default=5, help="пакетов записи на один COMMIT")
+    arg_parser.add_argument("--idle-seconds", type=float, default=2, help="замер без записи, сек")
+    arg_parser.add_argument("--profile", choices=["default", "tuned", "both"], default="both")
+    args = arg_parser.parse_args()
+
+    print("=" * 60)
+    print("🗄️  Конкуренция чтения и записи в SQLite")
+    print("=" * 60)
+    for profile in (["default", "tuned"] if args.profile == "both" else [args.profile]):
+        run_profile(profile, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# scripts/bench_stats.py
+# Бенчмарк статистики: COUNT(*) по listings (как было в SearchService.get_stats,
+# AdminService.get_usage_stats и view_db.py) против счётчиков stats_counters
+#
+# 1. Запись лотов ListingWriter с триггерами счётчиков и без них — цена поддержки.
+# 2. Новый обход с изменёнными лотами, снятие пропавших с публикации, удаление
+#    и правка через ORM, регистрация пользователей — и сверка счётчиков с пересчётом.
+# 3. Время чтения статистики: медиана по --reads повторам.
+#
+# Использование:
+#     python scripts/bench_stats.py --rows 20000
+#     python scripts/bench_stats.py --rows 100000 --reads 50
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+
+# Без ключа LLM SearchService не создаёт сетевой клиент
+settings.VSE_GPT_API_KEY = None
+
+from src.database import counters
+from src.database.bulk import ListingWriter, deactivate_stale_listings
+from src.database.models import Base, LandUse, Listing, TelegramUser
+from src.database.session import make_engine
+from src.services.search import SearchService
+from scripts.bench_sqlite_contention import make_rows
+
+DISTRICTS = [f"50:{code:02d}" for code in range(1, 41)]
+
+
+def make_listings(count: int, price_factor: float = 1.0, seed: int = 1):
+    """Строки make_rows с районом: по нему тоже ведутся счётчики"""
+    rng = random.Random(seed)
+    for row in make_rows(count, price_factor):
+        yield row._replace(district_code=rng.choice(DISTRICTS))
+
+
+def ingest(engine, rows, generation: int) -> float:
+    started = time.perf_counter()
+    with ListingWriter(engine=engine, generation=generation) as writer:
+        writer.write(rows)
+    return time.perf_counter() - started
+
+
+def count_stats(db) -> dict:
+    """Прежний способ: отдельный COUNT(*) на каждое число"""
+    return {
+        "total_listings": db.query(Listing).count(),
+        "active_listings": db.query(Listing).filter(Listing.is_active == True).count(),
+        "with_price": db.query(Listing).filter(Listing.is_active == True, Listing.start_price > 0).count(),
+        "land_plots": db.query(Listing).filter(
+            Listing.is_active == True, Listing.land_allowed_use_id.isnot(None)
+        ).count(),
+        "purposes": db.query(LandUse.name, func.count(Listing.id)).select_from(Listing).outerjoin(
+            LandUse, LandUse.id == Listing.land_allowed_use_id
+        ).filter(Listing.is_active == True).group_by(Listing.land_allowed_use_id).all(),
+        "total_users": db.query(TelegramUser).count(),
+    }
+
+
+def counter_stats(db) -> dict:
+    """Новый способ: те же числа из stats_counters"""
+    conn = db.connection()
+    stats = SearchService(db).get_stats()
+    stats.update({
+        "all_listings": counters.read_total(conn, 'listings', is_active=None),
+        "land_uses": counters.read_counters(conn, 'land_use'),
+        "total_users": counters.read_total(conn, counters.USERS),
+    })
+    return stats
+
+
+def snapshot(conn) -> dict:
+    rows = conn.exec_driver_sql(f"SELECT dimension, key, is_active, total FROM {counters.COUNTERS_TABLE}")
+    return {(dimension, key, bool(is_active)): total for dimension, key, is_active, total in rows if total}
+
+
+def check_counters(engine) -> int:
+    """Сверка счётчиков с полным пересчётом (REBUILD_STATEMENTS); число расхождений"""
+    with engine.connect() as conn:
+        maintained = snapshot(conn)
+        for statement in counters.REBUILD_STATEMENTS:
+            conn.exec_driver_sql(statement)
+        rebuilt = snapshot(conn)
+        conn.rollback()
+    return sum(maintained.get(key) != rebuilt.get(key) for key in maintained.keys() | rebuilt.keys())
+
+
+def median_ms(fn, db, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(db)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Статистика БД: COUNT(*) против stats_counters")
+    arg_parser.add_argument("--rows", type=int, default=20000)
+    arg_parser.add_argument("--reads", type=int, default=20, help="повторов чтения статистики")
+    args = arg_parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    engines = {}
+    for name in ("plain", "counters"):
+        engines[name] = make_engine(f"sqlite:///{os.path.join(tmp_dir.name, f'{name}.db')}")
+        Base.metadata.create_all(engines[name])
+    with engines["plain"].begin() as conn:
+        for statement in counters.DROP_STATEMENTS:
+            conn.exec_driver_sql(statement)
+    engine = engines["counters"]
+
+    print("=" * 80)
+    print(f"📊 Статистика БД: {args.rows} лотов")
+    print("=" * 80)
+    plain = ingest(engines["plain"], make_listings(args.rows), generation=1)
+    with_counters = ingest(engine, make_listings(args.rows), generation=1)
+    print(f"  запись без счётчиков:   {plain:8.2f} с")
+    print(f"  запись со счётчиками:   {with_counters:8.2f} с  ({(with_counters / plain - 1) * 100:+.0f}%)")
+
+    # Второй обход: цены другие у всех лотов, последней десятой части нет — она снимается с публикации
+    rng = random.Random(3)
+    kept = args.rows - args.rows // 10
+    second = ingest(engine, (row._replace(district_code=rng.choice(DISTRICTS))
+                             for row in make_listings(kept, price_factor=1.1)), generation=2)
+    deactivated = deactivate_stale_listings(2, engine=engine)
+    print(f"  второй обход (все лоты изменились): {second:.2f} с, снято с публикации: {deactivated}")
+
+    with Session(engine) as db:
+        for listing in db.query(Listing).filter(Listing.id <= 50):
+            db.delete(listing)
+        for listing in db.query(Listing).filter(Listing.id.between(51, 100)):
+            listing.is_active = not listing.is_active
+            listing.start_price = 0
+        db.add_all(TelegramUser(telegram_id=1000 + i, username=f"user{i}") for i in range(25))
+        db.commit()
+        db.query(TelegramUser).filter(TelegramUser.telegram_id < 1005).delete()
+        db.commit()
+
+    mismatches = check_counters(engine)
+    print(f"  сверка с пересчётом:    {'✅' if not mismatches else f'❌ расхождений: {mismatches}'}")
+
+    # Без LLM SearchService пишет ошибку инициализации клиента — в замере она не нужна
+    logging.disable(logging.ERROR)
+    with Session(engine) as db:
+        old, new = count_stats(db), counter_stats(db)
+        same = (old["active_listings"], old["with_price"], old["land_plots"], old["total_listings"],
+                old["total_users"]) == (new["total_listings"], new["with_price"], new["land_plots"],
+                                        new["all_listings"], new["total_users"])
+        print(f"  COUNT(*):               {median_ms(count_stats, db, args.reads):8.2f} мс")
+        print(f"  stats_counters:         {median_ms(counter_stats, db, args.reads):8.3f} мс"
+              f"  {'✅ числа совпадают' if same else '❌ числа расходятся'}")
+
+    for item in engines.values():
+        item.dispose()
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# scripts/crawl_metrics.py
+# Сводка телеметрии обхода ЕАСУЗ по этапам (таблица crawl_metrics)
+#
+# Использование:
+#     python scripts/crawl_metrics.py              # последний запуск
+#     python scripts/crawl_metrics.py --run-id 42
+
+import argparse
+import os
+import sys
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.parser.telemetry import format_summary, load_metrics
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Метрики обхода ЕАСУЗ")
+    arg_parser.add_argument("--run-id", type=int, help="номер запуска (по умолчанию последний)")
+    args = arg_parser.parse_args()
+
+    run, metrics = load_metrics(args.run_id)
+    print(format_summary(run, metrics))
+
+
+if __name__ == "__main__":
+    main()
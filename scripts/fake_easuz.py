@@ -0,0 +1,196 @@
+# scripts/fake_easuz.py
+# Локальная замена портала ЕАСУЗ для бенчмарков и отладки парсера
+#
+# Отдаёт страницы GetPurchasePage (JSON) и карточки /torgi/{category}/{district}/{id}/info (HTML).
+# Лоты синтетические: объекты API строятся по образцам из research/api_response.json,
+# карточки — по correct_lot.html с подменой адреса и кадастрового номера.
+#
+# Использование:
+#     python scripts/fake_easuz.py --lots 10000 --port 8800 --latency 50 --error-rate 0.02
+#     EASUZ_BASE_URL=http://127.0.0.1:8800 python -m src.parser.full_reparse
+
+import argparse
+import copy
+import html
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+SAMPLE_API = os.path.join(ROOT, 'research', 'api_response.json')
+SAMPLE_LOT = os.path.join(ROOT, 'correct_lot.html')
+
+API_PATH = "/api/v1-web/Purchase/GetPurchasePage"
+LOT_PATH = re.compile(r'^/torgi/([^/]+)/([^/]+)/(\d+)/info$')
+
+# Значения из correct_lot.html, которые подменяются в карточке каждого лота
+SAMPLE_ADDRESS = 'Московская обл, Воскресенск г.о.,'
+SAMPLE_CADASTRAL = '50:29:0020119:108'
+
+
+class FakeFeed:
+    """Синтетическая лента из lots лотов, Id по убыванию — как у портала"""
+
+    def __init__(self, lots: int, first_id: int = 100000, seed: int = 0):
+        self.lots = lots
+        self.first_id = first_id
+        self.seed = seed
+        with open(SAMPLE_API, encoding='utf-8') as f:
+            self.templates = json.load(f)['objects']
+        with open(SAMPLE_LOT, encoding='utf-8') as f:
+            self.lot_html = f.read()
+
+    def lot_id(self, index: int) -> int:
+        return self.first_id + self.lots - index
+
+    def has_lot(self, lot_id: int) -> bool:
+        return self.first_id < lot_id <= self.first_id + self.lots
+
+    def make_object(self, lot_id: int) -> Dict:
+        rnd = random.Random(self.seed * 1_000_003 + lot_id)
+        obj = copy.deepcopy(self.templates[lot_id % len(self.templates)])
+        square = round(rnd.uniform(300, 50000), 2)
+        price = round(square * rnd.uniform(20, 2000), 2)
+        obj.update({
+            'id': lot_id,
+            'name': f"Земельный участок площадью {square:.2f} кв.м (лот {lot_id})",
+            'registryNumber': f"{99000000000000 + lot_id}",
+            'startPrice': price,
+            'depositAmount': round(price * 0.2, 2),
+            'startStepAmount': round(price * 0.03, 2),
+            'countViews': rnd.randint(0, 20000),
+            'latitude': round(rnd.uniform(54.9, 56.9), 6),
+            'longitude': round(rnd.uniform(35.2, 40.1), 6),
+        })
+        obj['objectPurchases'][0]['totalSquare'] = square
+        return obj
+
+    def page(self, page: int, take: int) -> Dict:
+        start = (page - 1) * take
+        ids = [self.lot_id(i) for i in range(start, min(start + take, self.lots))]
+        return {
+            'objects': [self.make_object(lot_id) for lot_id in ids],
+            'pagination': {
+                'page': page,
+                'take': take,
+                'countStart': start + 1,
+                'countFinish': start + len(ids),
+                'countTotal': self.lots,
+                'pageCount': -(-self.lots // take),
+            },
+        }
+
+    def lot_page(self, lot_id: int) -> str:
+        obj = self.make_object(lot_id)
+        address = html.escape(obj.get('addressDescription', '').strip())
+        cadastral = f"50:{lot_id % 60:02d}:{lot_id:07d}:{lot_id % 997}"
+        return self.lot_html.replace(SAMPLE_ADDRESS, address).replace(SAMPLE_CADASTRAL, cadastral)
+
+
+class FakeEasuzServer(ThreadingHTTPServer):
+    """
+    HTTP-сервер поверх FakeFeed.
+    latency — средняя задержка ответа в мс (±50%), error_rate — доля ответов 500/503/429.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, feed: FakeFeed, latency: float = 0, error_rate: float = 0):
+        super().__init__(address, FakeEasuzHandler)
+        self.feed = feed
+        self.latency = latency / 1000
+        self.error_rate = error_rate
+        self.stats = {'api': 0, 'html': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+
+class FakeEasuzHandler(BaseHTTPRequestHandler):
+    server: FakeEasuzServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _simulate(self) -> bool:
+        """Задержка и, с вероятностью error_rate, ошибка вместо ответа"""
+        if self.server.latency:
+            time.sleep(self.server.latency * random.uniform(0.5, 1.5))
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self.server.count('errors')
+            status = random.choice((500, 503, 429))
+            self.send_response(status)
+            if status != 500:
+                self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return False
+        return True
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if self.path != API_PATH:
+            return self._send(404, b'', 'text/plain')
+        if not self._simulate():
+            return
+        self.server.count('api')
+        data = self.server.feed.page(int(payload.get('page', 1)), int(payload.get('take', 10)))
+        self._send(200, json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+    def do_GET(self):
+        match = LOT_PATH.match(self.path)
+        if not match or not self.server.feed.has_lot(int(match.group(3))):
+            return self._send(404, b'Not found', 'text/plain')
+        if not self._simulate():
+            return
+        self.server.count('html')
+        page = self.server.feed.lot_page(int(match.group(3)))
+        self._send(200, page.encode('utf-8'), 'text/html; charset=utf-8')
+
+
+def serve(lots: int, host: str = '127.0.0.1', port: int = 0, latency: float = 0,
+          error_rate: float = 0, seed: int = 0, ready: Optional[object] = None):
+    """Запустить сервер; ready (очередь multiprocessing) получает фактический порт"""
+    server = FakeEasuzServer((host, port), FakeFeed(lots, seed=seed), latency, error_rate)
+    if ready is not None:
+        ready.put(server.server_address[1])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv: Optional[List[str]] = None):
+    arg_parser = argparse.ArgumentParser(description="Локальный сервер-заменитель ЕАСУЗ")
+    arg_parser.add_argument("--lots", type=int, default=1000, help="число лотов в ленте")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8800)
+    arg_parser.add_argument("--latency", type=float, default=0, help="средняя задержка ответа, мс")
+    arg_parser.add_argument("--error-rate", type=float, default=0, help="доля ответов с ошибкой (0..1)")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args(argv)
+
+    print(f"🧪 Фейковый ЕАСУЗ: {args.lots} лотов на http://{args.host}:{args.port} "
+          f"(задержка {args.latency:.0f} мс, ошибок {args.error_rate:.0%})")
+    serve(args.lots, args.host, args.port, args.latency, args.error_rate, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 """Спарсить ВСЕ объявления с сайта"""
 import sys
 from pathlib import Path
-import time
 
 sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
 
@@ -40,51 +39,30 @@ def main():
     print("ПАРСИНГ...")
     print("="*60 + "\n")
     
-    all_listings = []
-    page = 1
-    errors = 0
+    pending = []
+    total = 0
     
-    while page <= total_pages:
-        print(f"[{page}/{total_pages}] ", end='', flush=True)
-        
-        try:
-            listings, _ = parser.get_page(page=page, per_page=50)
-            
-            if not listings:
-                print("✗ нет данных")
-                errors += 1
-                if errors > 5:
-                    print("\n❌ Слишком много ошибок, останавливаемся")
-                    break
-                page += 1
-                continue
-            
-            all_listings.extend(listings)
-            print(f"✓ {len(listings)} объявлений (всего: {len(all_listings)})")
-            errors = 0  # Сбрасываем счетчик ошибок
+    try:
+        # Поток объявлений: следующие страницы грузятся в фоне, в памяти —
+        # только текущая пачка, сколько бы объявлений ни было на сайте
+        for listing in parser.iter_listings(per_page=50):
+            pending.append(listing)
+            total += 1
             
             # Сохраняем каждые 100 объявлений
-            if len(all_listings) >= 100:
-                print(f"   💾 Сохранение...", end=' ', flush=True)
-                saved = db.save_many(all_listings)
+            if len(pending) >= 100:
+                print(f"   💾 Сохранение (всего: {total})...", end=' ', flush=True)
+                saved = db.save_many(pending)
                 print(f"✓ {saved}")
-                all_listings = []
-            
-            page += 1
-            time.sleep(0.5)
+                pending = []
             
-        except KeyboardInterrupt:
-            print("\n\n⚠️  Прервано пользователем")
-            break
-        except Exception as e:
-            print(f"✗ ошибка: {e}")
-            errors += 1
-            page += 1
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Прервано пользователем")
     
     # Сохраняем остаток
-    if all_listings:
-        print(f"\n💾 Сохранение последних {len(all_listings)}...", end=' ', flush=True)
-        saved = db.save_many(all_listings)
+    if pending:
+        print(f"\n💾 Сохранение последних {len(pending)}...", end=' ', flush=True)
+        saved = db.save_many(pending)
         print(f"✓ {saved}")
     
     print("\n" + "="*60)
@@ -8,8 +8,9 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.database.session import get_db
-from src.database.models import Listing
-from sqlalchemy import func
+from src.database.counters import read_counters, read_total
+from src.database.models import LandUse, Listing
+from src.database.normalize import DEAL_RENT, DEAL_SALE
 
 def view_database():
     """Просмотр статистики базы данных"""
@@ -18,12 +19,15 @@ def view_database():
     print("=" * 80)
     
     with next(get_db()) as db:
+        # Итоги — из счётчиков stats_counters, без COUNT(*) по listings
+        conn = db.connection()
+        
         # Общее количество объявлений
-        total = db.query(Listing).count()
+        total = read_total(conn, 'listings', is_active=None)
         print(f"\n📋 Всего объявлений: {total}")
         
         # Активные объявления
-        active = db.query(Listing).filter(Listing.is_active == True).count()
+        active = read_total(conn, 'listings')
         print(f"✅ Активных: {active}")
         
         # Неактивные
@@ -41,21 +45,26 @@ def view_database():
         print("🏷️  ПО НАЗНАЧЕНИЯМ:")
         print("=" * 80)
         
-        purposes = db.query(
-            Listing.land_allowed_use_name,
-            func.count(Listing.id).label('count')
-        ).filter(
-            Listing.is_active == True
-        ).group_by(
-            Listing.land_allowed_use_name
-        ).order_by(
-            func.count(Listing.id).desc()
-        ).limit(10).all()
+        land_uses = read_counters(conn, 'land_use')
+        top = sorted(land_uses.items(), key=lambda item: item[1], reverse=True)[:10]
+        ids = [int(key) for key, _ in top if key]
+        names = dict(db.query(LandUse.id, LandUse.name).filter(LandUse.id.in_(ids)).all())
+        purposes = [(names.get(int(key)) if key else None, count) for key, count in top]
         
         for purpose, count in purposes:
             purpose_name = purpose if purpose else "Не указано"
             print(f"  • {purpose_name[:60]}: {count}")
         
+        # По типу сделки
+        print("\n" + "=" * 80)
+        print("🤝 ПО ТИПУ СДЕЛКИ:")
+        print("=" * 80)
+        
+        deals = read_counters(conn, 'deal')
+        print(f"  • Продажа: {deals.get(str(DEAL_SALE), 0)}")
+        print(f"  • Аренда: {deals.get(str(DEAL_RENT), 0)}")
+        print(f"  • Не определено: {deals.get('', 0)}")
+        
         # Примеры объявлений
         print("\n" + "=" * 80)
         print("📌 ПРИМЕРЫ ОБЪЯВЛЕНИЙ:")
@@ -50,7 +50,8 @@ async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"👥 Всего пользователей: <code>{stats['total_users']}</code>\n"
         f"🟢 Активно за 7 дней: <code>{stats['active_users_7d']}</code>\n\n"
         f"🏘️ Всего участков: <code>{stats['total_listings']}</code>\n"
-        f"✅ Активных объявлений: <code>{stats['active_listings']}</code>"
+        f"✅ Активных объявлений: <code>{stats['active_listings']}</code>\n"
+        f"   продажа: <code>{stats['sale_listings']}</code>, аренда: <code>{stats['rent_listings']}</code>"
     )
     await update.message.reply_html(msg)
 
@@ -5,14 +5,20 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from aiogram import Bot, Dispatcher, types, F
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
-from src.services.search import SearchService
-from src.services.favorites import FavoritesService
+from src.services.search import AsyncSearchService
+from src.services.favorites import AsyncFavoritesService
 from src.services.comparison import ComparisonService
 from src.services.geocoder import YandexGeocoder
+from src.services.admin import AdminService
+from src.services.photos import AsyncPhotoCacheService
+from src.services.ingest import IngestScheduler, format_result, ingest_runner
 from src.database.session import get_db
+from src.database.async_session import async_engine, get_async_db
+from config.settings import settings
 import asyncio
+import html
 import logging
 import re
 
@@ -88,9 +94,8 @@ async def cmd_start(message: types.Message):
     )
 
     # Получаем количество избранных
-    with next(get_db()) as db:
-        fav_service = FavoritesService(db)
-        fav_count = fav_service.count(message.from_user.id)
+    async with get_async_db() as db:
+        fav_count = await AsyncFavoritesService(db).count(message.from_user.id)
 
     # 7 КНОПОК (новый порядок: консультация перед избранным)
     fav_text = f"⭐ Мое избранное ({fav_count})" if fav_count > 0 else "⭐ Мое избранное"
@@ -177,9 +182,8 @@ async def handle_category_button(callback: types.CallbackQuery):
 
     logger.info(f"🔍 Поиск по категории {category_id}: '{keywords}'")
 
-    with next(get_db()) as db:
-        service = SearchService(db)
-        results = service.search_by_natural_language(keywords)
+    async with get_async_db() as db:
+        results = await AsyncSearchService(db).search_by_natural_language(keywords)
 
     category_names = {
         "1": "Аренда и покупка имущества",
@@ -211,6 +215,81 @@ async def handle_category_button(callback: types.CallbackQuery):
     await callback.answer()
 
 
+def _is_admin(user_id: int) -> bool:
+    return bool(settings.TELEGRAM_ADMIN_ID) and str(user_id) == str(settings.TELEGRAM_ADMIN_ID)
+
+
+def _admin_call(method: str, *args):
+    """Метод AdminService на синхронной сессии — вызывается через asyncio.to_thread"""
+    with next(get_db()) as db:
+        return getattr(AdminService(db), method)(*args)
+
+
+async def _notify_admin(text: str):
+    """Сообщение администратору (итоги плановых синхронизаций)"""
+    if settings.TELEGRAM_ADMIN_ID:
+        await bot.send_message(int(settings.TELEGRAM_ADMIN_ID), text)
+
+
+@dp.message(Command("update"))
+async def cmd_update(message: types.Message, command: CommandObject):
+    """/update [full|status] — синхронизация с ЕАСУЗ (только для администратора)"""
+    if not _is_admin(message.from_user.id):
+        logger.warning(f"Попытка доступа к /update от {message.from_user.id}")
+        await message.answer("🔒 Эта команда доступна только администратору.")
+        return
+
+    arg = (command.args or "").strip().lower()
+    if arg == "status":
+        await message.answer(ingest_runner.describe())
+        return
+
+    mode = "full" if arg == "full" else "incremental"
+    previous = ingest_runner.future
+    reply = await asyncio.to_thread(_admin_call, "trigger_db_update", mode)
+    await message.answer(reply)
+
+    # Обход идёт в отдельном потоке; здесь только ждём итог, polling не блокируется
+    future = ingest_runner.future
+    if future is not None and future is not previous:
+        result = await asyncio.wrap_future(future)
+        await message.answer(format_result(result))
+
+
+@dp.message(Command("stats"))
+async def cmd_stats(message: types.Message):
+    """/stats — пользователи и лоты по счётчикам stats_counters (только для администратора)"""
+    if not _is_admin(message.from_user.id):
+        logger.warning(f"Попытка доступа к /stats от {message.from_user.id}")
+        await message.answer("🔒 Эта команда доступна только администратору.")
+        return
+
+    stats = await asyncio.to_thread(_admin_call, "get_usage_stats")
+    await message.answer(
+        "📊 <b>Статистика использования</b>\n\n"
+        f"👥 Всего пользователей: <code>{stats['total_users']}</code>\n"
+        f"🟢 Активно за 7 дней: <code>{stats['active_users_7d']}</code>\n\n"
+        f"🏘️ Всего участков: <code>{stats['total_listings']}</code>\n"
+        f"✅ Активных объявлений: <code>{stats['active_listings']}</code>\n"
+        f"   продажа: <code>{stats['sale_listings']}</code>, аренда: <code>{stats['rent_listings']}</code>",
+        parse_mode="HTML"
+    )
+
+
+@dp.message(Command("metrics"))
+async def cmd_metrics(message: types.Message, command: CommandObject):
+    """/metrics [run_id] — телеметрия обхода ЕАСУЗ по этапам (только для администратора)"""
+    if not _is_admin(message.from_user.id):
+        logger.warning(f"Попытка доступа к /metrics от {message.from_user.id}")
+        await message.answer("🔒 Эта команда доступна только администратору.")
+        return
+
+    arg = (command.args or "").strip()
+    run_id = int(arg) if arg.isdigit() else None
+    summary = await asyncio.to_thread(_admin_call, "get_crawl_metrics", run_id)
+    await message.answer(f"<pre>{html.escape(summary)}</pre>", parse_mode="HTML")
+
+
 @dp.message(F.text)
 async def handle_text_message(message: types.Message):
     """Обработка текстовых сообщений (поиск, координаты или адрес)"""
@@ -242,18 +321,7 @@ async def handle_text_message(message: types.Message):
                     )
                     
                     # АВТОМАТИЧЕСКИ показываем меню сравнения
-                    with next(get_db()) as db:
-                        fav_service = FavoritesService(db)
-                        fav_count = fav_service.count(user_id)
-                        
-                        if fav_count >= 2:
-                            await show_comparison_menu(message, user_id)
-                        else:
-                            await message.answer(
-                                f"💡 У вас сохранено {fav_count} объявлений.\n"
-                                f"Добавьте минимум 2 объявления в избранное для сравнения.",
-                                parse_mode="HTML"
-                            )
+                    await _offer_comparison(message, user_id)
                     
                     return
                 else:
@@ -267,7 +335,7 @@ async def handle_text_message(message: types.Message):
         
         # Если не координаты - пробуем как адрес
         geocoder = YandexGeocoder()
-        coords = geocoder.geocode_address(user_text)
+        coords = await asyncio.to_thread(geocoder.geocode_address, user_text)
         
         if coords:
             lat, lon = coords
@@ -283,18 +351,7 @@ async def handle_text_message(message: types.Message):
             )
             
             # АВТОМАТИЧЕСКИ показываем меню сравнения
-            with next(get_db()) as db:
-                fav_service = FavoritesService(db)
-                fav_count = fav_service.count(user_id)
-                
-                if fav_count >= 2:
-                    await show_comparison_menu(message, user_id)
-                else:
-                    await message.answer(
-                        f"💡 У вас сохранено {fav_count} объявлений.\n"
-                        f"Добавьте минимум 2 объявления в избранное для сравнения.",
-                        parse_mode="HTML"
-                    )
+            await _offer_comparison(message, user_id)
             
             return
         else:
@@ -312,78 +369,109 @@ async def handle_text_message(message: types.Message):
     # Обычный поиск
     logger.info(f"🔍 Поиск по запросу: '{user_text}'")
 
-    with next(get_db()) as db:
-        service = SearchService(db)
-        results = service.search_by_natural_language(user_text)
+    async with get_async_db() as db:
+        results = await AsyncSearchService(db).search_by_natural_language(user_text)
 
-        if not results:
-            logger.warning(f"❌ По запросу '{user_text}' ничего не найдено")
-            await message.answer(
-                "🔍 К сожалению, по вашему запросу ничего не найдено\n\n"
-                "💡 <b>Попробуйте:</b>\n"
-                "• Изменить название района (например: <i>Балашиха вместо Балашихинский</i>)\n"
-                "• Увеличить максимальную цену\n"
-                "• Убрать часть критериев из запроса\n"
-                "• Использовать другие ключевые слова",
-                parse_mode="HTML"
-            )
-        else:
-            logger.info(f"✅ Найдено {len(results)} объектов")
-            await _send_listings(message, results[:7], message.from_user.id)
+    if not results:
+        logger.warning(f"❌ По запросу '{user_text}' ничего не найдено")
+        await message.answer(
+            "🔍 К сожалению, по вашему запросу ничего не найдено\n\n"
+            "💡 <b>Попробуйте:</b>\n"
+            "• Изменить название района (например: <i>Балашиха вместо Балашихинский</i>)\n"
+            "• Увеличить максимальную цену\n"
+            "• Убрать часть критериев из запроса\n"
+            "• Использовать другие ключевые слова",
+            parse_mode="HTML"
+        )
+    else:
+        logger.info(f"✅ Найдено {len(results)} объектов")
+        await _send_listings(message, results[:7], message.from_user.id)
+
+
+async def _update_photo_cache(method: str, *args):
+    """Запись в кэш фото короткой сессией; ошибка кэша не мешает отправке выдачи"""
+    try:
+        async with get_async_db() as db:
+            await getattr(AsyncPhotoCacheService(db), method)(*args)
+    except Exception as e:
+        logger.error(f"❌ Кэш фото ({method}) не обновлён: {e}")
 
 
 async def _send_listings(message, listings, user_id):
     """Отправка списка объявлений с кнопками избранного"""
-    with next(get_db()) as db:
-        fav_service = FavoritesService(db)
+    # Избранное и кэш фото для всей выдачи — по одному запросу; соединение
+    # не держим, пока сообщения уходят в Telegram
+    async with get_async_db() as db:
+        fav_ids = await AsyncFavoritesService(db).favorite_ids(user_id, [listing.id for listing in listings])
+        photo_cache = await AsyncPhotoCacheService(db).get_many(
+            listing.photos[0] for listing in listings if listing.photos
+        )
+
+    for i, listing in enumerate(listings, 1):
+        easuz_link = _build_easuz_link(listing)
+        full_address = listing.full_address or listing.address_description or "Адрес не указан"
+        display_address = (full_address[:100] + "...") if len(full_address) > 100 else full_address
+        purpose = _get_purpose_fallback(listing)
+        cadastral = listing.cadastral_number or "Не указан"
+
+        caption = (
+            f"📌 <b>Объявление {i}</b>\n"
+            f"{listing.name}\n\n"
+            f"💰 <b>Цена:</b> {int(listing.start_price):,} ₽\n"
+            f"📏 <b>Площадь:</b> {int(listing.total_square) if listing.total_square else 0} кв.м\n"
+            f"📍 <b>Адрес:</b> {display_address}\n"
+            f"🏷 <b>Назначение:</b> {purpose}\n"
+            f"🆔 <b>Кадастр:</b> <code>{cadastral}</code>\n"
+            f"🔗 <a href='{easuz_link}'>Открыть на ЕАСУЗ</a>"
+        )
+
+        # Кнопка избранного
+        is_fav = listing.id in fav_ids
+        fav_button_text = "⭐ Убрать из избранного" if is_fav else "⭐ В избранное"
+        fav_callback = f"rem_fav_{listing.id}" if is_fav else f"add_fav_{listing.id}"
         
-        for i, listing in enumerate(listings, 1):
-            easuz_link = _build_easuz_link(listing)
-            full_address = listing.full_address or listing.address_description or "Адрес не указан"
-            display_address = (full_address[:100] + "...") if len(full_address) > 100 else full_address
-            purpose = _get_purpose_fallback(listing)
-            cadastral = listing.cadastral_number or "Не указан"
-
-            caption = (
-                f"📌 <b>Объявление {i}</b>\n"
-                f"{listing.name}\n\n"
-                f"💰 <b>Цена:</b> {int(listing.start_price):,} ₽\n"
-                f"📏 <b>Площадь:</b> {int(listing.total_square) if listing.total_square else 0} кв.м\n"
-                f"📍 <b>Адрес:</b> {display_address}\n"
-                f"🏷 <b>Назначение:</b> {purpose}\n"
-                f"🆔 <b>Кадастр:</b> <code>{cadastral}</code>\n"
-                f"🔗 <a href='{easuz_link}'>Открыть на ЕАСУЗ</a>"
-            )
+        keyboard = InlineKeyboardMarkup(
+            inline_keyboard=[[
+                InlineKeyboardButton(text=fav_button_text, callback_data=fav_callback)
+            ]]
+        )
 
-            # Кнопка избранного
-            is_fav = fav_service.is_favorite(user_id, listing.id)
-            fav_button_text = "⭐ Убрать из избранного" if is_fav else "⭐ В избранное"
-            fav_callback = f"rem_fav_{listing.id}" if is_fav else f"add_fav_{listing.id}"
-            
-            keyboard = InlineKeyboardMarkup(
-                inline_keyboard=[[
-                    InlineKeyboardButton(text=fav_button_text, callback_data=fav_callback)
-                ]]
-            )
+        # Отправка с фото: по file_id из кэша, иначе по URL (и запоминаем file_id)
+        photo_sent = False
+        photo_url = listing.photos[0] if listing.photos else None
+        if photo_url and (photo_url.startswith('http://') or photo_url.startswith('https://')):
+            entry = photo_cache.get(photo_url)
+            if entry is not None and entry.file_id:
+                try:
+                    await message.answer_photo(
+                        photo=entry.file_id,
+                        caption=caption,
+                        parse_mode="HTML",
+                        reply_markup=keyboard
+                    )
+                    photo_sent = True
+                except Exception as e:
+                    logger.warning(f"⚠️ file_id фото объявления {listing.id} не принят: {e}")
+                    await _update_photo_cache("forget_file_id", photo_url)
+
+            if not photo_sent and not AsyncPhotoCacheService.is_bad(entry):
+                try:
+                    sent = await message.answer_photo(
+                        photo=photo_url,
+                        caption=caption,
+                        parse_mode="HTML",
+                        reply_markup=keyboard
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ Фото объявления {listing.id} не загрузилось: {e}")
+                    if AsyncPhotoCacheService.is_bad_url_error(str(e)):
+                        await _update_photo_cache("mark_bad", photo_url, str(e))
+                else:
+                    photo_sent = True
+                    await _update_photo_cache("remember", photo_url, sent.photo[-1].file_id)
 
-            # Отправка с фото
-            photo_sent = False
-            if listing.photos and len(listing.photos) > 0:
-                photo_url = listing.photos[0]
-                if photo_url and (photo_url.startswith('http://') or photo_url.startswith('https://')):
-                    try:
-                        await message.answer_photo(
-                            photo=photo_url,
-                            caption=caption,
-                            parse_mode="HTML",
-                            reply_markup=keyboard
-                        )
-                        photo_sent = True
-                    except Exception:
-                        pass
-
-            if not photo_sent:
-                await message.answer(caption, parse_mode="HTML", reply_markup=keyboard)
+        if not photo_sent:
+            await message.answer(caption, parse_mode="HTML", reply_markup=keyboard)
 
 
 @dp.callback_query(lambda c: c.data.startswith("add_fav_"))
@@ -392,18 +480,17 @@ async def handle_add_favorite(callback: types.CallbackQuery):
     listing_id = int(callback.data.split("_")[2])
     user_id = callback.from_user.id
 
-    with next(get_db()) as db:
-        fav_service = FavoritesService(db)
-        
-        if fav_service.add(user_id, listing_id):
-            count = fav_service.count(user_id)
-            await callback.answer(f"✅ Добавлено в избранное ({count}/10)", show_alert=True)
-        else:
-            count = fav_service.count(user_id)
-            if count >= 10:
-                await callback.answer("❌ Достигнут лимит (10 объявлений)", show_alert=True)
-            else:
-                await callback.answer("❌ Уже в избранном", show_alert=True)
+    async with get_async_db() as db:
+        fav_service = AsyncFavoritesService(db)
+        added = await fav_service.add(user_id, listing_id)
+        count = await fav_service.count(user_id)
+
+    if added:
+        await callback.answer(f"✅ Добавлено в избранное ({count}/10)", show_alert=True)
+    elif count >= 10:
+        await callback.answer("❌ Достигнут лимит (10 объявлений)", show_alert=True)
+    else:
+        await callback.answer("❌ Уже в избранном", show_alert=True)
 
 
 @dp.callback_query(lambda c: c.data.startswith("rem_fav_"))
@@ -412,14 +499,15 @@ async def handle_remove_favorite(callback: types.CallbackQuery):
     listing_id = int(callback.data.split("_")[2])
     user_id = callback.from_user.id
 
-    with next(get_db()) as db:
-        fav_service = FavoritesService(db)
-        
-        if fav_service.remove(user_id, listing_id):
-            count = fav_service.count(user_id)
-            await callback.answer(f"✅ Удалено из избранного ({count})", show_alert=True)
-        else:
-            await callback.answer("❌ Не найдено в избранном", show_alert=True)
+    async with get_async_db() as db:
+        fav_service = AsyncFavoritesService(db)
+        removed = await fav_service.remove(user_id, listing_id)
+        count = await fav_service.count(user_id)
+
+    if removed:
+        await callback.answer(f"✅ Удалено из избранного ({count})", show_alert=True)
+    else:
+        await callback.answer("❌ Не найдено в избранном", show_alert=True)
 
 
 @dp.callback_query(lambda c: c.data == "show_favorites")
@@ -427,44 +515,43 @@ async def handle_show_favorites(callback: types.CallbackQuery):
     """Показ избранного"""
     user_id = callback.from_user.id
 
-    with next(get_db()) as db:
-        fav_service = FavoritesService(db)
-        favorites = fav_service.get_all(user_id)
+    async with get_async_db() as db:
+        favorites = await AsyncFavoritesService(db).get_all(user_id)
 
-        if not favorites:
-            await callback.message.answer(
-                "⭐ <b>Ваше избранное пусто</b>\n\n"
-                "Добавьте объявления, нажав кнопку <b>⭐ В избранное</b> под интересующими предложениями.",
-                parse_mode="HTML"
+    if not favorites:
+        await callback.message.answer(
+            "⭐ <b>Ваше избранное пусто</b>\n\n"
+            "Добавьте объявления, нажав кнопку <b>⭐ В избранное</b> под интересующими предложениями.",
+            parse_mode="HTML"
+        )
+    else:
+        count = len(favorites)
+        await callback.message.answer(
+            f"⭐ <b>Ваше избранное ({count}/10)</b>\n\n"
+            f"Всего сохранено: {count} объявлений",
+            parse_mode="HTML"
+        )
+        await _send_listings(callback.message, favorites, user_id)
+
+        # Кнопки управления избранным
+        if count >= 2:
+            keyboard = InlineKeyboardMarkup(
+                inline_keyboard=[
+                    [InlineKeyboardButton(text="📊 Сравнить", callback_data="show_compare_menu")],
+                    [InlineKeyboardButton(text="🗑 Очистить избранное", callback_data="clear_favorites")]
+                ]
             )
         else:
-            count = len(favorites)
-            await callback.message.answer(
-                f"⭐ <b>Ваше избранное ({count}/10)</b>\n\n"
-                f"Всего сохранено: {count} объявлений",
-                parse_mode="HTML"
-            )
-            await _send_listings(callback.message, favorites, user_id)
-
-            # Кнопки управления избранным
-            if count >= 2:
-                keyboard = InlineKeyboardMarkup(
-                    inline_keyboard=[
-                        [InlineKeyboardButton(text="📊 Сравнить", callback_data="show_compare_menu")],
-                        [InlineKeyboardButton(text="🗑 Очистить избранное", callback_data="clear_favorites")]
-                    ]
-                )
-            else:
-                keyboard = InlineKeyboardMarkup(
-                    inline_keyboard=[
-                        [InlineKeyboardButton(text="🗑 Очистить избранное", callback_data="clear_favorites")]
-                    ]
-                )
-            
-            await callback.message.answer(
-                "Управление избранным:",
-                reply_markup=keyboard
+            keyboard = InlineKeyboardMarkup(
+                inline_keyboard=[
+                    [InlineKeyboardButton(text="🗑 Очистить избранное", callback_data="clear_favorites")]
+                ]
             )
+        
+        await callback.message.answer(
+            "Управление избранным:",
+            reply_markup=keyboard
+        )
 
     await callback.answer()
 
@@ -474,15 +561,14 @@ async def handle_clear_favorites(callback: types.CallbackQuery):
     """Очистка избранного"""
     user_id = callback.from_user.id
 
-    with next(get_db()) as db:
-        fav_service = FavoritesService(db)
-        count = fav_service.clear(user_id)
-        
-        await callback.answer(f"✅ Удалено {count} объявлений", show_alert=True)
-        await callback.message.answer(
-            "🗑 <b>Избранное очищено</b>",
-            parse_mode="HTML"
-        )
+    async with get_async_db() as db:
+        count = await AsyncFavoritesService(db).clear(user_id)
+
+    await callback.answer(f"✅ Удалено {count} объявлений", show_alert=True)
+    await callback.message.answer(
+        "🗑 <b>Избранное очищено</b>",
+        parse_mode="HTML"
+    )
 
 
 @dp.callback_query(lambda c: c.data == "show_compare_menu")
@@ -492,6 +578,21 @@ async def handle_show_compare_menu(callback: types.CallbackQuery):
     await callback.answer()
 
 
+async def _offer_comparison(message: types.Message, user_id: int):
+    """После сохранения местоположения: меню сравнения или подсказка добавить объявления"""
+    async with get_async_db() as db:
+        fav_count = await AsyncFavoritesService(db).count(user_id)
+
+    if fav_count >= 2:
+        await show_comparison_menu(message, user_id)
+    else:
+        await message.answer(
+            f"💡 У вас сохранено {fav_count} объявлений.\n"
+            f"Добавьте минимум 2 объявления в избранное для сравнения.",
+            parse_mode="HTML"
+        )
+
+
 async def show_comparison_menu(message: types.Message, user_id: int):
     """Вспомогательная функция для показа меню сравнения"""
     # Проверяем наличие геопозиции
@@ -579,18 +680,7 @@ async def handle_location(message: types.Message):
     )
     
     # АВТОМАТИЧЕСКИ показываем меню сравнения
-    with next(get_db()) as db:
-        fav_service = FavoritesService(db)
-        fav_count = fav_service.count(user_id)
-        
-        if fav_count >= 2:
-            await show_comparison_menu(message, user_id)
-        else:
-            await message.answer(
-                f"💡 У вас сохранено {fav_count} объявлений.\n"
-                f"Добавьте минимум 2 объявления в избранное для сравнения.",
-                parse_mode="HTML"
-            )
+    await _offer_comparison(message, user_id)
 
 
 @dp.callback_query(lambda c: c.data.startswith("compare_"))
@@ -599,50 +689,49 @@ async def handle_compare(callback: types.CallbackQuery):
     user_id = callback.from_user.id
     compare_type = callback.data.split("_")[1]
     
-    with next(get_db()) as db:
-        fav_service = FavoritesService(db)
-        favorites = fav_service.get_all(user_id)
+    async with get_async_db() as db:
+        favorites = await AsyncFavoritesService(db).get_all(user_id)
 
-        if len(favorites) < 2:
-            await callback.answer("❌ Добавьте минимум 2 объявления для сравнения", show_alert=True)
-            return
+    if len(favorites) < 2:
+        await callback.answer("❌ Добавьте минимум 2 объявления для сравнения", show_alert=True)
+        return
 
-        # Получаем геопозицию пользователя (если есть)
-        user_location = user_locations.get(user_id)
-        
-        # Если выбрано сравнение по расстоянию, но геопозиции нет
-        if compare_type == "distance" and not user_location:
-            await callback.answer("❌ Сначала укажите свое местоположение", show_alert=True)
-            return
-
-        # Сортировка
-        comp_service = ComparisonService()
-        if compare_type == "price":
-            sorted_listings = comp_service.compare(favorites, "price")
-            sort_type = "price"
-        elif compare_type == "area":
-            sorted_listings = comp_service.compare(favorites, "area")
-            sort_type = "area"
-        elif compare_type in ["price", "per", "sqm"]:  # compare_price_per_sqm
-            sorted_listings = comp_service.compare(favorites, "price_per_sqm")
-            sort_type = "price_per_sqm"
-        elif compare_type == "distance":
-            sorted_listings = comp_service.compare(favorites, "distance", user_location=user_location)
-            sort_type = "distance"
-        else:
-            sorted_listings = favorites
-            sort_type = "price"
+    # Получаем геопозицию пользователя (если есть)
+    user_location = user_locations.get(user_id)
+    
+    # Если выбрано сравнение по расстоянию, но геопозиции нет
+    if compare_type == "distance" and not user_location:
+        await callback.answer("❌ Сначала укажите свое местоположение", show_alert=True)
+        return
+
+    # Сортировка
+    comp_service = ComparisonService()
+    if compare_type == "price":
+        sorted_listings = comp_service.compare(favorites, "price")
+        sort_type = "price"
+    elif compare_type == "area":
+        sorted_listings = comp_service.compare(favorites, "area")
+        sort_type = "area"
+    elif compare_type in ["price", "per", "sqm"]:  # compare_price_per_sqm
+        sorted_listings = comp_service.compare(favorites, "price_per_sqm")
+        sort_type = "price_per_sqm"
+    elif compare_type == "distance":
+        sorted_listings = comp_service.compare(favorites, "distance", user_location=user_location)
+        sort_type = "distance"
+    else:
+        sorted_listings = favorites
+        sort_type = "price"
 
-        # Форматирование таблицы
-        table = comp_service.format_comparison_table(sorted_listings, sort_type, user_location=user_location)
-        
-        # Умные рекомендации
-        recommendations = comp_service.get_best_recommendations(sorted_listings, user_location=user_location)
-        
-        result = table + recommendations
-        
-        await callback.message.answer(result, parse_mode="HTML", disable_web_page_preview=True)
+    # Форматирование таблицы
+    table = comp_service.format_comparison_table(sorted_listings, sort_type, user_location=user_location)
+    
+    # Умные рекомендации
+    recommendations = comp_service.get_best_recommendations(sorted_listings, user_location=user_location)
     
+    result = table + recommendations
+    
+    await callback.message.answer(result, parse_mode="HTML", disable_web_page_preview=True)
+
     await callback.answer()
 
 
@@ -652,19 +741,41 @@ async def main():
     # ============================================
     logger.info("🔧 Проверка базы данных...")
     try:
-        from src.database.models import Base
-        from src.database.session import engine
+        from src.database.models import Base, missing_listing_columns
+        from src.database.fts import ensure_listings_fts
+        from src.database.spatial import ensure_listings_rtree
+        from src.database.counters import ensure_stats_counters
         
         # Создаем все таблицы если их нет
-        Base.metadata.create_all(engine)
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            missing = await conn.run_sync(missing_listing_columns)
+            if missing:
+                # Индексы и счётчики строятся по колонкам из миграций — на старой схеме не трогаем
+                logger.warning(f"⚠️ В listings нет колонок {missing}: примените миграции "
+                               f"(python src/database/migrate.py); индексы и счётчики не проверялись")
+            else:
+                # БД, созданная до полнотекстового индекса, — строим его один раз
+                if await conn.run_sync(ensure_listings_fts):
+                    logger.info("✅ Построен полнотекстовый индекс listings_fts")
+                if await conn.run_sync(ensure_listings_rtree):
+                    logger.info("✅ Построен пространственный индекс listings_rtree")
+                if await conn.run_sync(ensure_stats_counters):
+                    logger.info("✅ Пересчитаны счётчики stats_counters")
         logger.info("✅ База данных инициализирована")
     except Exception as e:
         logger.error(f"❌ Ошибка инициализации БД: {e}")
         raise
     # ============================================
     
+    if settings.INGEST_SCHEDULER_ENABLED:
+        IngestScheduler(notify=_notify_admin).start()
+
     logger.info("🤖 Бот запущен")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await async_engine.dispose()
 
 
 if __name__ == "__main__":
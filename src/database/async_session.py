@@ -0,0 +1,39 @@
+# src/database/async_session.py
+# Асинхронный доступ к БД для обработчиков aiogram (SQLAlchemy asyncio + aiosqlite)
+
+from contextlib import asynccontextmanager
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config.settings import settings
+from src.database.session import engine_options, install_pragmas, is_memory_database
+
+
+def make_async_engine(url: str = None, pragmas: dict = None, **kwargs) -> AsyncEngine:
+    """
+    Асинхронный движок с тем же профилем, что и src.database.session.make_engine:
+    PRAGMA SQLite на каждом соединении и размеры пула из настроек.
+    """
+    url = make_url(url or settings.DATABASE_URL)
+    if url.drivername == "sqlite":
+        # DATABASE_URL общий с краулером: sqlite:/// → sqlite+aiosqlite:///
+        url = url.set(drivername="sqlite+aiosqlite")
+    if url.get_backend_name() == "sqlite" and not is_memory_database(url):
+        # aiosqlite по умолчанию открывает соединение на каждый запрос (NullPool)
+        kwargs.setdefault("poolclass", AsyncAdaptedQueuePool)
+    engine = create_async_engine(url, **engine_options(url, **kwargs))
+    install_pragmas(engine.sync_engine, pragmas)
+    return engine
+
+
+async_engine = make_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+@asynccontextmanager
+async def get_async_db():
+    """async with get_async_db() as db: — сессия на один обработчик"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,317 @@
+# src/database/bulk.py
+# Пакетная запись объявлений: INSERT ... ON CONFLICT(registry_number) DO UPDATE
+# только для новых и изменившихся лотов, изменения полей — в listing_history
+
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, insert, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config.settings import settings
+from src.database.lookups import LookupCache
+from src.database.models import LOOKUP_COLUMNS, Listing, ListingHistory
+from src.database.normalize import DERIVED_COLUMNS, derive_columns
+
+# Колонки, которые приходят из парсера (служебные created_at/updated_at/is_active — нет)
+UPSERT_COLUMNS = [
+    'id', 'name', 'registry_number', 'start_price', 'deposit_amount', 'start_step_amount',
+    'total_square', 'address_description', 'latitude', 'longitude', 'district_code',
+    'right_term_use_year', 'right_term_use_month', 'purchase_kind_name', 'purchase_form_name',
+    'stage_state_name', 'land_allowed_use_name', 'accept_plan_end_date', 'review_plan_end_date',
+    'count_views', 'photos_json', 'full_address', 'direct_url', 'object_type', 'cadastral_number',
+]
+
+# Счётчики, меняющиеся почти на каждом обходе: не входят в хэш и историю,
+# обновляются отдельно и не считаются изменением лота
+VOLATILE_COLUMNS = {'count_views'}
+TRACKED_COLUMNS = [c for c in UPSERT_COLUMNS if c != 'id' and c not in VOLATILE_COLUMNS]
+
+# Колонки из HTML-карточки лота. Пустой direct_url — карточку загрузить не удалось
+# (при успехе это URL ответа): у сохранённого лота эти колонки тогда не трогаются
+HTML_COLUMNS = ('full_address', 'direct_url', 'object_type', 'cadastral_number')
+
+# Колонки listings, в которые пишется строка: текст справочников заменён на id
+WRITE_COLUMNS = [LOOKUP_COLUMNS[c][0] if c in LOOKUP_COLUMNS else c for c in UPSERT_COLUMNS]
+
+# Ограничение SQLite на число параметров в одном запросе (SQLITE_MAX_VARIABLE_NUMBER)
+SQLITE_MAX_VARIABLES = 32766
+
+
+def listing_to_row(listing) -> Dict:
+    """Объявление (ListingRow, dict или ORM-объект) → словарь значений для UPSERT"""
+    if hasattr(listing, '_asdict'):
+        return listing._asdict()
+    if isinstance(listing, dict):
+        return {column: listing.get(column) for column in UPSERT_COLUMNS}
+    return {column: getattr(listing, column) for column in UPSERT_COLUMNS}
+
+
+def _normalize(value) -> Optional[str]:
+    """Значение колонки в виде строки для сравнения, хэша и listing_history"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        # SQLite хранит DateTime без часового пояса
+        return value.replace(tzinfo=None).isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def content_hash(row: Dict) -> str:
+    """Хэш содержимого лота: совпал — строку можно не переписывать"""
+    values = [_normalize(row.get(column)) for column in TRACKED_COLUMNS]
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class ListingWriter:
+    """
+    Копит объявления и пишет их в listings пакетами:
+    один INSERT ... ON CONFLICT (executemany) на пакет, один COMMIT на commit_every пакетов.
+
+    before_commit(conn) вызывается перед каждым COMMIT на том же соединении —
+    так контрольная точка обхода фиксируется в одной транзакции с данными.
+
+    generation — номер запуска парсера: записанные лоты помечаются им и снова
+    становятся активными (см. deactivate_stale_listings).
+
+    Перед записью пакет сверяется с БД одним SELECT: лоты с тем же content_hash
+    не переписываются (и не меняют updated_at), для изменившихся изменения
+    по полям пакетно пишутся в listing_history. Хэш и история считаются по тексту,
+    в listings назначение, вид и форма торгов и статус пишутся id справочников.
+    Лоты без content_hash (записанные до его появления) сравниваются по полям.
+    Если карточка лота не загрузилась, HTML_COLUMNS берутся из сохранённой версии.
+    """
+
+    def __init__(self, engine=None, batch_size: Optional[int] = None,
+                 commit_every: Optional[int] = None,
+                 before_commit: Optional[Callable] = None,
+                 generation: Optional[int] = None,
+                 telemetry=None):
+        if engine is None:
+            from src.database.session import engine
+        self.engine = engine
+        self.stamp = {} if generation is None else {'crawl_generation': generation, 'is_active': True}
+        # Пакет сверяется с БД одним IN (...) по registry_number: параметр на строку
+        self.batch_size = min(batch_size or settings.INGEST_BATCH_SIZE, SQLITE_MAX_VARIABLES)
+        self.commit_every = commit_every or settings.INGEST_COMMIT_EVERY
+        self.before_commit = before_commit
+        self.telemetry = telemetry
+        self.written = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.history_records = 0
+        self._pending: List[Dict] = []
+        self._lookups = LookupCache()
+        self._uncommitted_batches = 0
+        self._conn = None
+        self._upsert = self._upsert_statement()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = self.engine.connect()
+        return self._conn
+
+    def _upsert_statement(self):
+        """
+        INSERT ... ON CONFLICT с параметрами вместо значений: строится и компилируется
+        один раз, пакет уходит executemany, как обновления и история
+        """
+        columns = WRITE_COLUMNS + list(DERIVED_COLUMNS) + list(self.stamp) + ['content_hash', 'updated_at']
+        values = {column: bindparam(column) for column in columns}
+        # created_at — из того же параметра, что updated_at, и только при вставке
+        values['created_at'] = bindparam('updated_at')
+        stmt = sqlite_insert(Listing.__table__).values(values)
+        excluded = stmt.excluded
+        updates = {column: excluded[column] for column in columns if column != 'id'}
+        return stmt.on_conflict_do_update(index_elements=['registry_number'], set_=updates)
+
+    def write(self, listings: Iterable) -> int:
+        """Добавить объявления в буфер; полные пакеты сразу уходят в БД"""
+        count = 0
+        for listing in listings:
+            row = listing_to_row(listing)
+            row.update(self.stamp)
+            self._pending.append(row)
+            count += 1
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+        return count
+
+    def _load_stored(self, conn, rows: List[Dict]) -> Dict[str, Dict]:
+        """Сохранённые версии лотов пакета: registry_number → строка БД"""
+        table = Listing.__table__
+        # Текст справочников — подзапросом по id, как в атрибутах модели
+        columns = [getattr(Listing, column).label(column) for column in TRACKED_COLUMNS]
+        stmt = select(
+            table.c.id, table.c.content_hash, table.c.count_views,
+            table.c.crawl_generation, table.c.is_active, *columns,
+        ).where(table.c.registry_number.in_([row['registry_number'] for row in rows]))
+        return {stored['registry_number']: dict(stored) for stored in conn.execute(stmt).mappings()}
+
+    def _touch_statement(self):
+        """Обновление служебных колонок неизменившихся лотов (без updated_at)"""
+        table = Listing.__table__
+        values = {
+            'count_views': bindparam('b_count_views'),
+            'content_hash': bindparam('b_content_hash'),
+            'updated_at': table.c.updated_at,
+        }
+        values.update({column: bindparam(f'b_{column}') for column in self.stamp})
+        return update(table).where(table.c.id == bindparam('b_id')).values(values)
+
+    def flush(self):
+        """Записать накопленные строки: один SELECT и не больше трёх пакетных запросов"""
+        if not self._pending:
+            return
+        # Повтор лота в пакете (лента сдвинулась) — пишется последняя версия, один раз
+        rows = list({row['registry_number']: row for row in self._pending}.values())
+        self._pending = []
+        started = time.perf_counter()
+        conn = self._connection()
+        stored_rows = self._load_stored(conn, rows)
+        now = datetime.utcnow()
+
+        changed, touched, history = [], [], []
+        for row in rows:
+            stored = stored_rows.get(row['registry_number'])
+            if stored is None:
+                row['content_hash'] = content_hash(row)
+                changed.append(row)
+                self.inserted += 1
+                continue
+
+            if not row['direct_url'] and stored['direct_url']:
+                row.update({column: stored[column] for column in HTML_COLUMNS})
+            row['content_hash'] = content_hash(row)
+            if stored['content_hash'] is None:
+                same = all(_normalize(stored[column]) == _normalize(row[column]) for column in TRACKED_COLUMNS)
+            else:
+                same = stored['content_hash'] == row['content_hash']
+
+            if same:
+                self.unchanged += 1
+                # Лот без хэша заодно получает его, чтобы дальше сравниваться по хэшу
+                stale = stored['content_hash'] is None or any(
+                    stored[column] != value for column, value in self.stamp.items()
+                )
+                if stale or stored['count_views'] != row['count_views']:
+                    touch = {'b_id': stored['id'], 'b_count_views': row['count_views'],
+                             'b_content_hash': row['content_hash']}
+                    touch.update({f'b_{column}': value for column, value in self.stamp.items()})
+                    touched.append(touch)
+                continue
+
+            changed.append(row)
+            self.updated += 1
+            for column in TRACKED_COLUMNS:
+                old_value, new_value = _normalize(stored[column]), _normalize(row[column])
+                if old_value != new_value:
+                    history.append({
+                        'listing_id': stored['id'],
+                        'field_name': column,
+                        'old_value': old_value,
+                        'new_value': new_value,
+                        'changed_at': now,
+                    })
+
+        if changed:
+            # Теневые колонки зависят только от полей под content_hash:
+            # у неизменившихся лотов пересчитывать нечего
+            for row in changed:
+                row.update(derive_columns(row))
+                row['updated_at'] = now
+            self._lookups.encode(conn, changed, LOOKUP_COLUMNS)
+            conn.execute(self._upsert, changed)
+        if touched:
+            conn.execute(self._touch_statement(), touched)
+        if history:
+            conn.execute(insert(ListingHistory.__table__), history)
+            self.history_records += len(history)
+
+        self.written += len(rows)
+        if self.telemetry is not None:
+            self.telemetry.add('db_write', 'time', time.perf_counter() - started)
+            self.telemetry.add('db_write', 'rows', len(rows))
+        self._uncommitted_batches += 1
+        if self._uncommitted_batches >= self.commit_every:
+            self.commit()
+
+    def keep(self, ids: Iterable[int]) -> None:
+        """
+        Пометить поколением лоты, которые есть в ленте, но не разобрались:
+        иначе deactivate_stale_listings снимет их, хотя они не исчезли.
+        Записывается в той же транзакции, что и пакеты.
+        """
+        ids = list(ids)
+        if not ids or 'crawl_generation' not in self.stamp:
+            return
+        table = Listing.__table__
+        self._connection().execute(
+            update(table).where(table.c.id.in_(ids))
+            .values(crawl_generation=self.stamp['crawl_generation'])
+        )
+
+    def commit(self):
+        started = time.perf_counter()
+        if self.before_commit is not None:
+            self.before_commit(self._connection())
+        if self._conn is not None:
+            self._conn.commit()
+        if self.telemetry is not None:
+            self.telemetry.add('db_commit', 'time', time.perf_counter() - started)
+        self._uncommitted_batches = 0
+
+    def close(self):
+        """Дописать остаток, зафиксировать транзакцию и вернуть соединение в пул"""
+        try:
+            self.flush()
+            self.commit()
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def abort(self):
+        """Откатить незафиксированные пакеты"""
+        self._pending = []
+        self._uncommitted_batches = 0
+        self._lookups.clear()
+        if self._conn is not None:
+            self._conn.rollback()
+            self._conn.close()
+            self._conn = None
+
+
+def deactivate_stale_listings(generation: int, engine=None) -> int:
+    """
+    Снять с публикации лоты, которых не было в полном обходе generation:
+    один UPDATE по индексу (is_active, crawl_generation) вместо проверки каждого лота.
+    Вызывать только после полностью завершённого обхода всей ленты.
+    """
+    if engine is None:
+        from src.database.session import engine
+    stmt = (
+        update(Listing.__table__)
+        .where(
+            Listing.is_active == True,
+            or_(Listing.crawl_generation.is_(None), Listing.crawl_generation < generation),
+        )
+        .values(is_active=False, updated_at=datetime.utcnow())
+    )
+    with engine.begin() as conn:
+        return conn.execute(stmt).rowcount
@@ -0,0 +1,156 @@
+# src/database/counters.py
+# Счётчики для статистики: сколько лотов по состоянию, районам, назначению и типу сделки
+# и сколько пользователей — без COUNT(*) по всей таблице
+#
+# Строка stats_counters — (измерение, значение, is_active) → число лотов. Счётчики
+# меняют триггеры на listings и telegram_users, поэтому они обновляются в той же
+# транзакции, что и upsert ListingWriter, снятие лотов с публикации, правки через ORM
+# и регистрация пользователя. Чтение — выборка нескольких строк по первичному ключу.
+
+from typing import Dict, Optional
+
+COUNTERS_TABLE = "stats_counters"
+
+# Измерение → (значение для строки {row} лота, колонки, от которых оно зависит).
+# NULL хранится пустой строкой: значение входит в первичный ключ.
+#
+# 'purpose' — основная категория (purpose_category): у лота она одна, и сумма по
+# измерению равна числу лотов. Поиск фильтрует по purpose_mask — всем категориям
+# из текста ВРИ, — поэтому многоцелевой лот «ИЖС; ЛПХ; магазины» учтён здесь только
+# в ИЖС, а поиском находится и по «Магазины»: число найденных по категории может
+# быть больше счётчика.
+LISTING_DIMENSIONS = {
+    'listings': ("''", ()),
+    'district': ("{row}.district_code", ('district_code',)),
+    'purpose': ("{row}.purpose_category", ('purpose_category',)),       # normalize.PURPOSE_CATEGORIES
+    'land_use': ("{row}.land_allowed_use_id", ('land_allowed_use_id',)),
+    'deal': ("{row}.deal_type", ('deal_type',)),                         # normalize.DEAL_SALE / DEAL_RENT
+    'priced': ("{row}.start_price > 0", ('start_price',)),
+}
+
+USERS = 'users'
+
+
+def _key(expression: str, row: str) -> str:
+    return f"coalesce(CAST({expression.format(row=row)} AS TEXT), '')"
+
+
+def _state(row: str) -> str:
+    return f"coalesce({row}.is_active, 0)"
+
+
+def _increment(dimension: str, key: str, state: str) -> str:
+    return (f"INSERT INTO {COUNTERS_TABLE}(dimension, key, is_active, total) "
+            f"VALUES ('{dimension}', {key}, {state}, 1) "
+            f"ON CONFLICT(dimension, key, is_active) DO UPDATE SET total = total + 1;")
+
+
+def _decrement(dimension: str, key: str, state: str) -> str:
+    return (f"UPDATE {COUNTERS_TABLE} SET total = total - 1 "
+            f"WHERE dimension = '{dimension}' AND key = {key} AND is_active = {state};")
+
+
+def _listing_statements(action, row: str) -> str:
+    return "\n        ".join(
+        action(dimension, _key(expression, row), _state(row))
+        for dimension, (expression, _) in LISTING_DIMENSIONS.items()
+    )
+
+
+def _update_trigger(dimension: str) -> str:
+    """
+    Отдельный триггер на измерение: ON CONFLICT DO UPDATE в ListingWriter переписывает
+    все колонки, и WHEN пропускает лоты, у которых значение измерения не изменилось.
+    """
+    expression, columns = LISTING_DIMENSIONS[dimension]
+    old_key, new_key = _key(expression, "old"), _key(expression, "new")
+    return f"""CREATE TRIGGER IF NOT EXISTS stats_listings_au_{dimension}
+        AFTER UPDATE OF {', '.join(('is_active',) + columns)} ON listings
+        WHEN {_state('old')} IS NOT {_state('new')} OR {old_key} IS NOT {new_key} BEGIN
+        {_decrement(dimension, old_key, _state('old'))}
+        {_increment(dimension, new_key, _state('new'))}
+    END"""
+
+
+CREATE_STATEMENTS = [
+    f"""CREATE TABLE IF NOT EXISTS {COUNTERS_TABLE} (
+        dimension VARCHAR(20) NOT NULL,
+        key VARCHAR(100) NOT NULL,
+        is_active BOOLEAN NOT NULL,
+        total INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimension, key, is_active)
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS stats_listings_ai AFTER INSERT ON listings BEGIN
+        {_listing_statements(_increment, "new")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stats_listings_ad AFTER DELETE ON listings BEGIN
+        {_listing_statements(_decrement, "old")}
+    END""",
+    *(_update_trigger(dimension) for dimension in LISTING_DIMENSIONS),
+    f"""CREATE TRIGGER IF NOT EXISTS stats_users_ai AFTER INSERT ON telegram_users BEGIN
+        {_increment(USERS, "''", "1")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS stats_users_ad AFTER DELETE ON telegram_users BEGIN
+        {_decrement(USERS, "''", "1")}
+    END""",
+]
+
+TRIGGER_NAMES = (
+    ["stats_listings_ai", "stats_listings_ad"]
+    + [f"stats_listings_au_{dimension}" for dimension in LISTING_DIMENSIONS]
+    + ["stats_users_ai", "stats_users_ad"]
+)
+
+REBUILD_STATEMENTS = [
+    f"DELETE FROM {COUNTERS_TABLE}",
+    *(f"""INSERT INTO {COUNTERS_TABLE}(dimension, key, is_active, total)
+        SELECT '{dimension}', {_key(expression, "listings")}, {_state("listings")}, count(*)
+        FROM listings GROUP BY 2, 3""" for dimension, (expression, _) in LISTING_DIMENSIONS.items()),
+    f"""INSERT INTO {COUNTERS_TABLE}(dimension, key, is_active, total)
+        SELECT '{USERS}', '', 1, count(*) FROM telegram_users""",
+]
+
+DROP_STATEMENTS = [f"DROP TRIGGER IF EXISTS {name}" for name in TRIGGER_NAMES] + [
+    f"DROP TABLE IF EXISTS {COUNTERS_TABLE}",
+]
+
+
+def ensure_stats_counters(conn) -> bool:
+    """
+    Создать таблицу и триггеры, если их нет (БД, созданная до счётчиков), и пересчитать
+    счётчики по текущим данным. conn — соединение SQLAlchemy; True, если пересчитывали.
+    """
+    if conn.dialect.name != "sqlite":
+        return False
+    existing = {row[0] for row in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+    )}
+    # create_all(tables=[...]) телеметрии и чекпоинтов может идти по БД без этих таблиц
+    if not {'listings', 'telegram_users'}.issubset(existing):
+        return False
+    for statement in CREATE_STATEMENTS:
+        conn.exec_driver_sql(statement)
+    if existing.issuperset(TRIGGER_NAMES):
+        return False
+    for statement in REBUILD_STATEMENTS:
+        conn.exec_driver_sql(statement)
+    return True
+
+
+def read_counters(conn, dimension: str, is_active: Optional[bool] = True) -> Dict[str, int]:
+    """
+    {значение: число} по измерению; is_active=None — лоты в любом состоянии.
+    Пустая строка — лоты без значения (NULL).
+    """
+    sql = f"SELECT key, sum(total) FROM {COUNTERS_TABLE} WHERE dimension = ?"
+    params = (dimension,)
+    if is_active is not None:
+        sql += " AND is_active = ?"
+        params += (int(is_active),)
+    rows = conn.exec_driver_sql(sql + " GROUP BY key", params)
+    return {key: total for key, total in rows if total}
+
+
+def read_total(conn, dimension: str, is_active: Optional[bool] = True, key: str = '') -> int:
+    """Одно значение счётчика (по умолчанию — все активные лоты: read_total(conn, 'listings'))"""
+    return read_counters(conn, dimension, is_active).get(key, 0)
@@ -0,0 +1,156 @@
+# src/database/fts.py
+# Полнотекстовый индекс лотов (SQLite FTS5): название, адреса и назначение
+#
+# unicode61 приводит к нижнему регистру и кириллицу (в отличие от lower() в SQLite),
+# «ё» сводится к «е» при записи и в запросе. Русского стеммера в SQLite нет, поэтому
+# слова ищутся по префиксу: «мытищ» находит «Мытищи», «Мытищинский».
+# Индекс хранит свою копию текста и обновляется триггерами на listings, так что
+# его поддерживают и ListingWriter, и ORM, и ручные правки БД. Назначение в listings
+# хранится id справочника land_uses — триггеры берут текст оттуда.
+
+import re
+from typing import Iterable, Optional, Sequence
+
+from sqlalchemy import column, literal_column, select, table
+
+FTS_TABLE = "listings_fts"
+FTS_COLUMNS = ("name", "address_description", "full_address", "land_allowed_use_name")
+ADDRESS_COLUMNS = ("address_description", "full_address")
+
+
+def _fold_sql(expression: str) -> str:
+    return f"replace(replace({expression}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+# Источник колонки индекса в listings: колонка или подзапрос к справочнику
+_LOOKUP_SOURCES = {
+    "land_allowed_use_name": ("land_allowed_use_id", "(SELECT name FROM land_uses WHERE id = {row}.land_allowed_use_id)"),
+}
+
+
+def _source_columns(lookups: bool) -> str:
+    return ", ".join(_LOOKUP_SOURCES[name][0] if lookups and name in _LOOKUP_SOURCES else name
+                     for name in FTS_COLUMNS)
+
+
+def _values(row: str, lookups: bool) -> str:
+    return ", ".join(
+        _fold_sql(_LOOKUP_SOURCES[name][1].format(row=row) if lookups and name in _LOOKUP_SOURCES
+                  else f"{row}.{name}")
+        for name in FTS_COLUMNS
+    )
+
+
+_COLUMNS = ", ".join(FTS_COLUMNS)
+
+
+def create_statements(lookups: bool = True) -> list:
+    """
+    Таблица и триггеры. lookups=False — для схемы до справочников, когда
+    назначение лежало в listings текстом (миграция 005).
+    """
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            {_COLUMNS},
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3 4'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS listings_fts_ai AFTER INSERT ON listings BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_values('new', lookups)});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS listings_fts_ad AFTER DELETE ON listings BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS listings_fts_au AFTER UPDATE OF id, {_source_columns(lookups)} ON listings BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+            INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_values('new', lookups)});
+        END""",
+    ]
+
+
+def rebuild_statements(lookups: bool = True) -> list:
+    return [
+        f"DELETE FROM {FTS_TABLE}",
+        f"""INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS})
+            SELECT id, {_values('listings', lookups)} FROM listings""",
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')",
+    ]
+
+
+CREATE_STATEMENTS = create_statements()
+REBUILD_STATEMENTS = rebuild_statements()
+
+TRIGGER_NAMES = ["listings_fts_ai", "listings_fts_ad", "listings_fts_au"]
+
+DROP_TRIGGER_STATEMENTS = [f"DROP TRIGGER IF EXISTS {name}" for name in TRIGGER_NAMES]
+DROP_STATEMENTS = DROP_TRIGGER_STATEMENTS + [f"DROP TABLE IF EXISTS {FTS_TABLE}"]
+
+
+def ensure_listings_fts(conn) -> bool:
+    """
+    Создать индекс и триггеры, если их нет (БД, созданная до FTS), и заполнить его.
+    conn — соединение SQLAlchemy; True, если индекс строился заново.
+    """
+    if conn.dialect.name != "sqlite":
+        return False
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).first() is not None
+    for statement in CREATE_STATEMENTS:
+        conn.exec_driver_sql(statement)
+    if exists:
+        return False
+    for statement in REBUILD_STATEMENTS:
+        conn.exec_driver_sql(statement)
+    return True
+
+
+# === Построение запросов MATCH ===
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def fold(text: str) -> str:
+    return text.lower().replace("ё", "е")
+
+
+def phrase(text: str, prefix: bool = True) -> Optional[str]:
+    """
+    Фраза FTS5 из произвольного текста: слова подряд, последнее — по префиксу.
+    Кавычки и операторы пользователя в запрос не попадают.
+    """
+    tokens = _TOKEN.findall(fold(text))
+    if not tokens:
+        return None
+    expression = " + ".join(f'"{token}"' for token in tokens)
+    return expression + "*" if prefix else expression
+
+
+def match_any(texts: Iterable[str], columns: Sequence[str] = None, prefix: bool = True) -> Optional[str]:
+    """Хотя бы одна из фраз — в любой из колонок (по умолчанию во всех)"""
+    phrases = list(dict.fromkeys(p for p in (phrase(text, prefix) for text in texts) if p))
+    if not phrases:
+        return None
+    expression = phrases[0] if len(phrases) == 1 else "(" + " OR ".join(phrases) + ")"
+    if columns:
+        expression = "{" + " ".join(columns) + "} : " + expression
+    return expression
+
+
+def match_all(expressions: Iterable[Optional[str]]) -> Optional[str]:
+    expressions = [e for e in expressions if e]
+    if not expressions:
+        return None
+    return " AND ".join(f"({e})" for e in expressions)
+
+
+_fts = table(FTS_TABLE, column("rowid"))
+
+
+def matching_ids(expression: str):
+    """
+    Подзапрос id лотов под выражение MATCH: Listing.id.in_(matching_ids(...)).
+    Именно IN, а не JOIN: при JOIN планировщик SQLite может перебирать listings
+    и вычислять MATCH заново для каждой строки.
+    """
+    return select(_fts.c.rowid).where(literal_column(FTS_TABLE).op("MATCH")(expression))
@@ -0,0 +1,51 @@
+# src/database/lookups.py
+# Справочники повторяющихся строк лота: текст → целочисленный id
+#
+# Назначение, вид и форма торгов, статус повторяются в десятках тысяч лотов;
+# в listings хранятся только id (модели и LOOKUP_COLUMNS — в src/database/models.py).
+
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+
+class LookupCache:
+    """
+    id значений справочников, уже известных этому писателю.
+    Незнакомые значения добавляются INSERT ... ON CONFLICT DO NOTHING на том же
+    соединении, поэтому попадают в БД в одной транзакции с лотами.
+    После отката транзакции кэш нужно сбросить (clear): новые id откатились вместе с ней.
+    """
+
+    def __init__(self):
+        self._ids: Dict[Tuple[str, str], int] = {}
+
+    def clear(self):
+        self._ids.clear()
+
+    def resolve(self, conn, table, values: Iterable[str]) -> None:
+        missing = sorted({value for value in values if value is not None and (table.name, value) not in self._ids})
+        if not missing:
+            return
+        conn.execute(
+            sqlite_insert(table).values([{'name': value} for value in missing])
+            .on_conflict_do_nothing(index_elements=['name'])
+        )
+        stmt = select(table.c.id, table.c.name).where(table.c.name.in_(missing))
+        for lookup_id, name in conn.execute(stmt):
+            self._ids[(table.name, name)] = lookup_id
+
+    def encode(self, conn, rows: List[Dict], lookups: Mapping) -> List[Dict]:
+        """
+        Заменить в строках текст на id: lookups — {атрибут: (колонка id, таблица)}.
+        Атрибуты, которых нет в строке, не трогаются. NULL остаётся NULL, а пустая
+        строка — обычное значение справочника: лот читается с тем же '', что и записан.
+        """
+        for name, (id_column, table) in lookups.items():
+            self.resolve(conn, table, (row[name] for row in rows if name in row))
+            for row in rows:
+                if name in row:
+                    value = row.pop(name)
+                    row[id_column] = None if value is None else self._ids[(table.name, value)]
+        return rows
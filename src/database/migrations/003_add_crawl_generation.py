@@ -0,0 +1,63 @@
+"""
+Миграция 003: Поколение обхода для снятия исчезнувших лотов
+
+Дата: 2026-10-17
+Автор: Система
+Описание: Добавляет поле crawl_generation в таблицу listings и индекс
+          (is_active, crawl_generation) для массового снятия лотов,
+          не встреченных последним полным обходом
+"""
+
+def upgrade(connection):
+    """Применить миграцию - добавить поле crawl_generation"""
+    cursor = connection.cursor()
+    
+    print("▶️ Применяем миграцию 003: add_crawl_generation")
+    
+    try:
+        cursor.execute("PRAGMA table_info(listings)")
+        columns = {col[1] for col in cursor.fetchall()}
+        
+        if 'crawl_generation' not in columns:
+            print("   Добавляем поле crawl_generation...")
+            cursor.execute("""
+                ALTER TABLE listings 
+                ADD COLUMN crawl_generation INTEGER
+            """)
+            print("✅ Поле добавлено")
+        else:
+            print("   ⏭️ Поле crawl_generation уже существует")
+        
+        print("   Создаём индекс idx_active_generation...")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_active_generation 
+            ON listings(is_active, crawl_generation)
+        """)
+        
+        connection.commit()
+        print("✅ Миграция 003 успешно применена!\n")
+        
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка применения миграции: {e}\n")
+        raise
+
+
+def downgrade(connection):
+    """Откатить миграцию - удалить индекс и поле crawl_generation"""
+    cursor = connection.cursor()
+    
+    print("⚠️  ОТКАТ миграции 003: add_crawl_generation")
+    
+    try:
+        cursor.execute("DROP INDEX IF EXISTS idx_active_generation")
+        # DROP COLUMN поддерживается с SQLite 3.35
+        cursor.execute("ALTER TABLE listings DROP COLUMN crawl_generation")
+        
+        connection.commit()
+        print("✅ Откат миграции 003 выполнен\n")
+        
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка отката миграции: {e}\n")
+        raise
@@ -0,0 +1,57 @@
+"""
+Миграция 004: Хэш содержимого лота
+
+Дата: 2026-10-17
+Автор: Система
+Описание: Добавляет поле content_hash в таблицу listings. По нему парсер
+          пропускает неизменившиеся лоты и пишет изменения в listing_history.
+          У старых записей хэш пустой: они один раз перезапишутся при
+          ближайшем обходе.
+"""
+
+def upgrade(connection):
+    """Применить миграцию - добавить поле content_hash"""
+    cursor = connection.cursor()
+    
+    print("▶️ Применяем миграцию 004: add_content_hash")
+    
+    try:
+        cursor.execute("PRAGMA table_info(listings)")
+        columns = {col[1] for col in cursor.fetchall()}
+        
+        if 'content_hash' not in columns:
+            print("   Добавляем поле content_hash...")
+            cursor.execute("""
+                ALTER TABLE listings 
+                ADD COLUMN content_hash VARCHAR(40)
+            """)
+            print("✅ Поле добавлено")
+        else:
+            print("   ⏭️ Поле content_hash уже существует")
+        
+        connection.commit()
+        print("✅ Миграция 004 успешно применена!\n")
+        
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка применения миграции: {e}\n")
+        raise
+
+
+def downgrade(connection):
+    """Откатить миграцию - удалить поле content_hash"""
+    cursor = connection.cursor()
+    
+    print("⚠️  ОТКАТ миграции 004: add_content_hash")
+    
+    try:
+        # DROP COLUMN поддерживается с SQLite 3.35
+        cursor.execute("ALTER TABLE listings DROP COLUMN content_hash")
+        
+        connection.commit()
+        print("✅ Откат миграции 004 выполнен\n")
+        
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка отката миграции: {e}\n")
+        raise
@@ -0,0 +1,72 @@
+"""
+Миграция 005: Полнотекстовый индекс лотов
+
+Дата: 2026-10-17
+Автор: Система
+Описание: Создаёт виртуальную таблицу FTS5 listings_fts (название, адреса,
+          назначение) с триггерами на listings и заполняет её текущими лотами.
+          Поиск по городу и назначению идёт через MATCH вместо LIKE '%...%'.
+          Определения таблицы и триггеров — в src/database/fts.py.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from src.database.fts import DROP_STATEMENTS, FTS_TABLE, create_statements, rebuild_statements
+
+# Схема на момент миграции: назначение в listings ещё текстом (справочники — миграция 007)
+CREATE_STATEMENTS = create_statements(lookups=False)
+REBUILD_STATEMENTS = rebuild_statements(lookups=False)
+
+
+def upgrade(connection):
+    """Применить миграцию - создать listings_fts и заполнить её"""
+    cursor = connection.cursor()
+    
+    print("▶️ Применяем миграцию 005: add_listings_fts")
+    
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,))
+        exists = cursor.fetchone() is not None
+        
+        print("   Создаём таблицу и триггеры...")
+        for statement in CREATE_STATEMENTS:
+            cursor.execute(statement)
+        
+        if not exists:
+            print("   Индексируем лоты...")
+            for statement in REBUILD_STATEMENTS:
+                cursor.execute(statement)
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+            print(f"✅ Проиндексировано лотов: {cursor.fetchone()[0]}")
+        else:
+            print(f"   ⏭️ Таблица {FTS_TABLE} уже существует")
+        
+        connection.commit()
+        print("✅ Миграция 005 успешно применена!\n")
+        
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка применения миграции: {e}\n")
+        raise
+
+
+def downgrade(connection):
+    """Откатить миграцию - удалить listings_fts и триггеры"""
+    cursor = connection.cursor()
+    
+    print("⚠️  ОТКАТ миграции 005: add_listings_fts")
+    
+    try:
+        for statement in DROP_STATEMENTS:
+            cursor.execute(statement)
+        
+        connection.commit()
+        print("✅ Откат миграции 005 выполнен\n")
+        
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка отката миграции: {e}\n")
+        raise
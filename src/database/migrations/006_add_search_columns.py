@@ -0,0 +1,108 @@
+"""
+Миграция 006: Нормализованные колонки для поиска
+
+Дата: 2026-10-17
+Автор: Система
+Описание: Добавляет в listings теневые колонки municipality (ключ городского
+          округа), purpose_category (категория назначения) и deal_type
+          (продажа/аренда), заполняет их для существующих лотов и создаёт
+          составные индексы idx_search_city и idx_search_purpose.
+          Правила вычисления — в src/database/normalize.py.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from src.database.normalize import SOURCE_COLUMNS, derive_columns
+
+NEW_COLUMNS = {
+    'municipality': 'VARCHAR(100)',
+    'purpose_category': 'INTEGER',
+    'deal_type': 'INTEGER',
+}
+
+INDEXES = {
+    'idx_search_city': '(is_active, municipality, purpose_category, deal_type, start_price)',
+    'idx_search_purpose': '(is_active, purpose_category, deal_type, start_price)',
+}
+
+BATCH_SIZE = 5000
+
+
+def _backfill(connection, cursor):
+    """Вычислить колонки для существующих лотов пакетами по BATCH_SIZE"""
+    print("   Заполняем колонки для существующих лотов...")
+    select_cursor = connection.cursor()
+    select_cursor.execute(f"SELECT id, {', '.join(SOURCE_COLUMNS)} FROM listings")
+    assignments = ", ".join(f"{column} = ?" for column in NEW_COLUMNS)
+    updated = 0
+    while True:
+        rows = select_cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            derived = derive_columns(dict(zip(SOURCE_COLUMNS, row[1:])))
+            params.append([derived[column] for column in NEW_COLUMNS] + [row[0]])
+        cursor.executemany(f"UPDATE listings SET {assignments} WHERE id = ?", params)
+        updated += len(rows)
+    print(f"   Обработано лотов: {updated}")
+
+
+def upgrade(connection):
+    """Применить миграцию - добавить и заполнить колонки поиска"""
+    cursor = connection.cursor()
+
+    print("▶️ Применяем миграцию 006: add_search_columns")
+
+    try:
+        cursor.execute("PRAGMA table_info(listings)")
+        columns = {col[1] for col in cursor.fetchall()}
+
+        added = [column for column in NEW_COLUMNS if column not in columns]
+        for column, column_type in NEW_COLUMNS.items():
+            if column in added:
+                print(f"   Добавляем поле {column}...")
+                cursor.execute(f"ALTER TABLE listings ADD COLUMN {column} {column_type}")
+            else:
+                print(f"   ⏭️ Поле {column} уже существует")
+
+        # Если колонки уже были, их заполняет ListingWriter
+        if added:
+            _backfill(connection, cursor)
+
+        for name, definition in INDEXES.items():
+            print(f"   Создаём индекс {name}...")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON listings {definition}")
+
+        connection.commit()
+        print("✅ Миграция 006 успешно применена!\n")
+
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка применения миграции: {e}\n")
+        raise
+
+
+def downgrade(connection):
+    """Откатить миграцию - удалить индексы и колонки поиска"""
+    cursor = connection.cursor()
+
+    print("⚠️  ОТКАТ миграции 006: add_search_columns")
+
+    try:
+        for name in INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+        # DROP COLUMN поддерживается с SQLite 3.35
+        for column in NEW_COLUMNS:
+            cursor.execute(f"ALTER TABLE listings DROP COLUMN {column}")
+
+        connection.commit()
+        print("✅ Откат миграции 006 выполнен\n")
+
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка отката миграции: {e}\n")
+        raise
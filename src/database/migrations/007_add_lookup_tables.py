@@ -0,0 +1,155 @@
+"""
+Миграция 007: Справочники повторяющихся строк лота
+
+Дата: 2026-10-17
+Автор: Система
+Описание: Выносит назначение (land_allowed_use_name), вид и форму торгов
+          (purchase_kind_name, purchase_form_name) и статус (stage_state_name)
+          в справочники land_uses, purchase_kinds, purchase_forms, stage_states.
+          В listings остаются целочисленные *_id; индексы idx_district_purpose
+          и idx_stage_state перестраиваются по ним, триггеры listings_fts
+          берут назначение из справочника. Пустая строка — тоже значение
+          справочника, NULL остаётся NULL. В конце — VACUUM, чтобы файл БД
+          действительно уменьшился.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from src.database.fts import DROP_TRIGGER_STATEMENTS, create_statements
+
+# текстовая колонка → (колонка id, таблица справочника)
+LOOKUPS = {
+    'purchase_kind_name': ('purchase_kind_id', 'purchase_kinds'),
+    'purchase_form_name': ('purchase_form_id', 'purchase_forms'),
+    'stage_state_name': ('stage_state_id', 'stage_states'),
+    'land_allowed_use_name': ('land_allowed_use_id', 'land_uses'),
+}
+
+TEXT_TYPES = {
+    'purchase_kind_name': 'VARCHAR(200)',
+    'purchase_form_name': 'VARCHAR(200)',
+    'stage_state_name': 'VARCHAR(200)',
+    'land_allowed_use_name': 'VARCHAR(500)',
+}
+
+OLD_INDEXES = {
+    'idx_district_purpose': '(district_code, land_allowed_use_name)',
+    'idx_stage_state': '(stage_state_name)',
+    'ix_listings_stage_state_name': '(stage_state_name)',
+    'ix_listings_land_allowed_use_name': '(land_allowed_use_name)',
+}
+
+NEW_INDEXES = {
+    'idx_district_purpose': '(district_code, land_allowed_use_id)',
+    'idx_stage_state': '(stage_state_id)',
+}
+
+
+def _create_lookup_tables(cursor):
+    for _, table in LOOKUPS.values():
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER NOT NULL PRIMARY KEY,
+                name VARCHAR(500) NOT NULL UNIQUE
+            )
+        """)
+
+
+def upgrade(connection):
+    """Применить миграцию - перенести текст в справочники"""
+    cursor = connection.cursor()
+
+    print("▶️ Применяем миграцию 007: add_lookup_tables")
+
+    try:
+        _create_lookup_tables(cursor)
+
+        cursor.execute("PRAGMA table_info(listings)")
+        columns = {col[1] for col in cursor.fetchall()}
+
+        if 'land_allowed_use_name' not in columns:
+            print("   ⏭️ listings уже ссылается на справочники")
+            connection.commit()
+            print("✅ Миграция 007 успешно применена!\n")
+            return
+
+        # Триггеры listings_fts читают land_allowed_use_name: с ними колонку не удалить
+        for statement in DROP_TRIGGER_STATEMENTS:
+            cursor.execute(statement)
+        for name in OLD_INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+        for text_column, (id_column, table) in LOOKUPS.items():
+            print(f"   {text_column} → {table}...")
+            cursor.execute(f"""
+                INSERT OR IGNORE INTO {table} (name)
+                SELECT DISTINCT {text_column} FROM listings
+                WHERE {text_column} IS NOT NULL
+                ORDER BY {text_column}
+            """)
+            if id_column not in columns:
+                cursor.execute(f"ALTER TABLE listings ADD COLUMN {id_column} INTEGER REFERENCES {table}(id)")
+            cursor.execute(f"""
+                UPDATE listings SET {id_column} = (
+                    SELECT id FROM {table} WHERE name = listings.{text_column}
+                )
+            """)
+            # DROP COLUMN поддерживается с SQLite 3.35
+            cursor.execute(f"ALTER TABLE listings DROP COLUMN {text_column}")
+            cursor.execute(f"SELECT count(*) FROM {table}")
+            print(f"      значений: {cursor.fetchone()[0]}")
+
+        for name, definition in NEW_INDEXES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON listings {definition}")
+        for statement in create_statements():
+            cursor.execute(statement)
+
+        connection.commit()
+
+        print("   Сжимаем файл БД (VACUUM)...")
+        connection.execute("VACUUM")
+        print("✅ Миграция 007 успешно применена!\n")
+
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка применения миграции: {e}\n")
+        raise
+
+
+def downgrade(connection):
+    """Откатить миграцию - вернуть текст в listings"""
+    cursor = connection.cursor()
+
+    print("⚠️  ОТКАТ миграции 007: add_lookup_tables")
+
+    try:
+        for statement in DROP_TRIGGER_STATEMENTS:
+            cursor.execute(statement)
+        for name in NEW_INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+        for text_column, (id_column, table) in LOOKUPS.items():
+            cursor.execute(f"ALTER TABLE listings ADD COLUMN {text_column} {TEXT_TYPES[text_column]}")
+            cursor.execute(f"""
+                UPDATE listings SET {text_column} = (
+                    SELECT name FROM {table} WHERE id = listings.{id_column}
+                )
+            """)
+            cursor.execute(f"ALTER TABLE listings DROP COLUMN {id_column}")
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+        for name in ('idx_district_purpose', 'idx_stage_state'):
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON listings {OLD_INDEXES[name]}")
+        for statement in create_statements(lookups=False):
+            cursor.execute(statement)
+
+        connection.commit()
+        print("✅ Откат миграции 007 выполнен\n")
+
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка отката миграции: {e}\n")
+        raise
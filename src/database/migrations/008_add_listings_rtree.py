@@ -0,0 +1,68 @@
+"""
+Миграция 008: Пространственный индекс лотов
+
+Дата: 2026-10-17
+Автор: Система
+Описание: Создаёт виртуальную таблицу R*Tree listings_rtree по координатам
+          лотов с триггерами на listings и заполняет её текущими лотами.
+          По ней SearchService ищет лоты в радиусе и ближайшие к точке.
+          Определения таблицы и триггеров — в src/database/spatial.py.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from src.database.spatial import CREATE_STATEMENTS, DROP_STATEMENTS, REBUILD_STATEMENTS, RTREE_TABLE
+
+
+def upgrade(connection):
+    """Применить миграцию - создать listings_rtree и заполнить её"""
+    cursor = connection.cursor()
+    
+    print("▶️ Применяем миграцию 008: add_listings_rtree")
+    
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (RTREE_TABLE,))
+        exists = cursor.fetchone() is not None
+        
+        print("   Создаём таблицу и триггеры...")
+        for statement in CREATE_STATEMENTS:
+            cursor.execute(statement)
+        
+        if not exists:
+            print("   Индексируем координаты лотов...")
+            for statement in REBUILD_STATEMENTS:
+                cursor.execute(statement)
+            cursor.execute(f"SELECT count(*) FROM {RTREE_TABLE}")
+            print(f"✅ Проиндексировано лотов: {cursor.fetchone()[0]}")
+        else:
+            print(f"   ⏭️ Таблица {RTREE_TABLE} уже существует")
+        
+        connection.commit()
+        print("✅ Миграция 008 успешно применена!\n")
+        
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка применения миграции: {e}\n")
+        raise
+
+
+def downgrade(connection):
+    """Откатить миграцию - удалить listings_rtree и триггеры"""
+    cursor = connection.cursor()
+    
+    print("⚠️  ОТКАТ миграции 008: add_listings_rtree")
+    
+    try:
+        for statement in DROP_STATEMENTS:
+            cursor.execute(statement)
+        
+        connection.commit()
+        print("✅ Откат миграции 008 выполнен\n")
+        
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка отката миграции: {e}\n")
+        raise
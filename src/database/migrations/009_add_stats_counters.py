@@ -0,0 +1,72 @@
+"""
+Миграция 009: Счётчики статистики
+
+Дата: 2026-10-17
+Автор: Система
+Описание: Создаёт таблицу stats_counters с числом лотов по состоянию, районам,
+          назначению и типу сделки и числом пользователей, триггеры на
+          listings и telegram_users, которые поддерживают её в той же
+          транзакции, и заполняет счётчики по текущим данным. Добавляет
+          индекс по telegram_users.last_active_at для активности за 7 дней.
+          Определения таблицы и триггеров — в src/database/counters.py.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from src.database.counters import COUNTERS_TABLE, CREATE_STATEMENTS, DROP_STATEMENTS, REBUILD_STATEMENTS
+
+ACTIVITY_INDEX = 'ix_telegram_users_last_active_at'
+
+
+def upgrade(connection):
+    """Применить миграцию - создать stats_counters и заполнить её"""
+    cursor = connection.cursor()
+
+    print("▶️ Применяем миграцию 009: add_stats_counters")
+
+    try:
+        print("   Создаём таблицу и триггеры...")
+        for statement in CREATE_STATEMENTS:
+            cursor.execute(statement)
+
+        # Пересчёт по текущим данным в той же транзакции, что и триггеры:
+        # повторный запуск просто получит те же числа
+        print("   Считаем лоты и пользователей...")
+        for statement in REBUILD_STATEMENTS:
+            cursor.execute(statement)
+        cursor.execute(f"SELECT count(*) FROM {COUNTERS_TABLE}")
+        print(f"   Счётчиков: {cursor.fetchone()[0]}")
+
+        print(f"   Создаём индекс {ACTIVITY_INDEX}...")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {ACTIVITY_INDEX} ON telegram_users (last_active_at)")
+
+        connection.commit()
+        print("✅ Миграция 009 успешно применена!\n")
+
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка применения миграции: {e}\n")
+        raise
+
+
+def downgrade(connection):
+    """Откатить миграцию - удалить stats_counters, триггеры и индекс"""
+    cursor = connection.cursor()
+
+    print("⚠️  ОТКАТ миграции 009: add_stats_counters")
+
+    try:
+        for statement in DROP_STATEMENTS:
+            cursor.execute(statement)
+        cursor.execute(f"DROP INDEX IF EXISTS {ACTIVITY_INDEX}")
+
+        connection.commit()
+        print("✅ Откат миграции 009 выполнен\n")
+
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка отката миграции: {e}\n")
+        raise
@@ -0,0 +1,106 @@
+"""
+Миграция 010: Все категории назначения лота
+
+Дата: 2026-10-17
+Автор: Система
+Описание: Добавляет в listings колонку purpose_mask — битовую маску всех
+          категорий, которые встречаются в тексте ВРИ (purpose_category
+          хранит одну, основную, и многоцелевые лоты вроде «ИЖС; ЛПХ;
+          магазины» находились только по ней). Заполняет её для существующих
+          лотов и пересоздаёт idx_search_city и idx_search_purpose по
+          purpose_mask вместо purpose_category.
+          Правила вычисления — в src/database/normalize.py.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from src.database.normalize import purpose_mask
+
+INDEXES = {
+    'idx_search_city': '(is_active, municipality, purpose_mask, deal_type, start_price)',
+    'idx_search_purpose': '(is_active, purpose_mask, deal_type, start_price)',
+}
+
+OLD_INDEXES = {
+    'idx_search_city': '(is_active, municipality, purpose_category, deal_type, start_price)',
+    'idx_search_purpose': '(is_active, purpose_category, deal_type, start_price)',
+}
+
+BATCH_SIZE = 5000
+
+
+def _backfill(connection, cursor):
+    """Вычислить маску для существующих лотов пакетами по BATCH_SIZE"""
+    print("   Заполняем purpose_mask для существующих лотов...")
+    select_cursor = connection.cursor()
+    select_cursor.execute(
+        "SELECT l.id, u.name FROM listings l JOIN land_uses u ON u.id = l.land_allowed_use_id"
+    )
+    updated = 0
+    while True:
+        rows = select_cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            break
+        cursor.executemany(
+            "UPDATE listings SET purpose_mask = ? WHERE id = ?",
+            [(purpose_mask(name), listing_id) for listing_id, name in rows],
+        )
+        updated += len(rows)
+    print(f"   Обработано лотов: {updated}")
+
+
+def upgrade(connection):
+    """Применить миграцию - добавить и заполнить purpose_mask"""
+    cursor = connection.cursor()
+
+    print("▶️ Применяем миграцию 010: add_purpose_mask")
+
+    try:
+        cursor.execute("PRAGMA table_info(listings)")
+        columns = {col[1] for col in cursor.fetchall()}
+
+        # Если колонка уже была, её заполняет ListingWriter
+        if 'purpose_mask' not in columns:
+            print("   Добавляем поле purpose_mask...")
+            cursor.execute("ALTER TABLE listings ADD COLUMN purpose_mask INTEGER")
+            _backfill(connection, cursor)
+        else:
+            print("   ⏭️ Поле purpose_mask уже существует")
+
+        for name, definition in INDEXES.items():
+            print(f"   Пересоздаём индекс {name}...")
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+            cursor.execute(f"CREATE INDEX {name} ON listings {definition}")
+
+        connection.commit()
+        print("✅ Миграция 010 успешно применена!\n")
+
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка применения миграции: {e}\n")
+        raise
+
+
+def downgrade(connection):
+    """Откатить миграцию - вернуть индексы по purpose_category и удалить purpose_mask"""
+    cursor = connection.cursor()
+
+    print("⚠️  ОТКАТ миграции 010: add_purpose_mask")
+
+    try:
+        for name, definition in OLD_INDEXES.items():
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+            cursor.execute(f"CREATE INDEX {name} ON listings {definition}")
+        # DROP COLUMN поддерживается с SQLite 3.35
+        cursor.execute("ALTER TABLE listings DROP COLUMN purpose_mask")
+
+        connection.commit()
+        print("✅ Откат миграции 010 выполнен\n")
+
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка отката миграции: {e}\n")
+        raise
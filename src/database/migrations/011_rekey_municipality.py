@@ -0,0 +1,62 @@
+"""
+Миграция 011: Пересчёт ключей муниципалитета
+
+Дата: 2026-10-17
+Автор: Система
+Описание: Пересчитывает listings.municipality по новым правилам
+          municipality_key: прилагательные с суффиксами -инск-, -енск-,
+          -ецк- («Мытищинский», «Коломенский», «Люберецкий») теперь дают
+          тот же ключ, что и название («Мытищи», «Коломна», «Люберцы»).
+          Без пересчёта лоты со старыми ключами не находятся по городу,
+          пока ListingWriter не перепишет их (content_hash не меняется).
+          Правила вычисления — в src/database/normalize.py.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+
+from src.database.normalize import municipality
+
+BATCH_SIZE = 5000
+
+
+def upgrade(connection):
+    """Применить миграцию - пересчитать municipality для существующих лотов"""
+    cursor = connection.cursor()
+
+    print("▶️ Применяем миграцию 011: rekey_municipality")
+
+    try:
+        print("   Пересчитываем municipality для существующих лотов...")
+        select_cursor = connection.cursor()
+        select_cursor.execute("SELECT id, municipality, address_description, full_address FROM listings")
+        updated = 0
+        while True:
+            rows = select_cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            # Обновляем только изменившиеся ключи: каждое UPDATE дёргает триггеры счётчиков
+            params = []
+            for listing_id, old_key, address_description, full_address in rows:
+                key = municipality(address_description, full_address)
+                if key != old_key:
+                    params.append((key, listing_id))
+            cursor.executemany("UPDATE listings SET municipality = ? WHERE id = ?", params)
+            updated += len(params)
+        print(f"   Изменено ключей: {updated}")
+
+        connection.commit()
+        print("✅ Миграция 011 успешно применена!\n")
+
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Ошибка применения миграции: {e}\n")
+        raise
+
+
+def downgrade(connection):
+    """Откатить миграцию - ключи остаются: прежние правила в коде не сохранились"""
+    print("⚠️  ОТКАТ миграции 011: rekey_municipality")
+    print("   ⏭️ Пересчитанные ключи не откатываются\n")
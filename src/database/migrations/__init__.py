@@ -17,5 +17,14 @@ __version__ = "1.0.0"
 # Список всех миграций в порядке применения
 MIGRATIONS = [
     '001_add_html_fields',
+    '003_add_crawl_generation',
+    '004_add_content_hash',
+    '005_add_listings_fts',
+    '006_add_search_columns',
+    '007_add_lookup_tables',
+    '008_add_listings_rtree',
+    '009_add_stats_counters',
+    '010_add_purpose_mask',
+    '011_rekey_municipality',
     # Добавляйте новые миграции сюда
 ]
\ No newline at end of file
@@ -1,11 +1,47 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, Index, UniqueConstraint, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, Index, UniqueConstraint, ForeignKey, DDL, event, select
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import column_property
+from src.database import counters, fts, normalize, spatial
+from src.database.lookups import LookupCache
 from datetime import datetime
+from typing import List
 import json
 
 Base = declarative_base()
 
 
+# ===== СПРАВОЧНИКИ ПОВТОРЯЮЩИХСЯ СТРОК ЛОТА (назначение, вид и форма торгов, статус) =====
+class LookupMixin:
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(500), nullable=False, unique=True)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.id}: {self.name[:50]}>"
+
+
+class LandUse(LookupMixin, Base):
+    __tablename__ = 'land_uses'
+
+
+class PurchaseKind(LookupMixin, Base):
+    __tablename__ = 'purchase_kinds'
+
+
+class PurchaseForm(LookupMixin, Base):
+    __tablename__ = 'purchase_forms'
+
+
+class StageState(LookupMixin, Base):
+    __tablename__ = 'stage_states'
+
+
+def _lookup_name(model, id_column):
+    """Текст из справочника как атрибут лота: читается в том же SELECT, годится в фильтры"""
+    return column_property(
+        select(model.name).where(model.id == id_column).correlate_except(model).scalar_subquery()
+    )
+
+
 class Listing(Base):
     __tablename__ = 'listings'
     
@@ -22,15 +58,27 @@ class Listing(Base):
     district_code = Column(String(100), index=True)
     right_term_use_year = Column(Integer)
     right_term_use_month = Column(Integer)
-    purchase_kind_name = Column(String(200))
-    purchase_form_name = Column(String(200))
-    stage_state_name = Column(String(200), index=True)
-    land_allowed_use_name = Column(String(500), index=True)
+    # В listings — id из справочников, текст доступен под прежними именами атрибутов
+    purchase_kind_id = Column(Integer, ForeignKey('purchase_kinds.id'))
+    purchase_form_id = Column(Integer, ForeignKey('purchase_forms.id'))
+    stage_state_id = Column(Integer, ForeignKey('stage_states.id'))
+    land_allowed_use_id = Column(Integer, ForeignKey('land_uses.id'))
+    purchase_kind_name = _lookup_name(PurchaseKind, purchase_kind_id)
+    purchase_form_name = _lookup_name(PurchaseForm, purchase_form_id)
+    stage_state_name = _lookup_name(StageState, stage_state_id)
+    land_allowed_use_name = _lookup_name(LandUse, land_allowed_use_id)
     accept_plan_end_date = Column(DateTime)
     review_plan_end_date = Column(DateTime)
     count_views = Column(Integer, default=0)
     photos_json = Column(Text)
     is_active = Column(Boolean, default=True, index=True)
+    crawl_generation = Column(Integer)                      # id запуска парсера, последним видевшего лот
+    content_hash = Column(String(40))                       # хэш полей лота, см. src/database/bulk.py
+    # Теневые колонки для поиска, вычисляются при записи (src/database/normalize.py)
+    municipality = Column(String(100))                      # ключ городского округа: «мытищ», «одинцов»
+    purpose_category = Column(Integer)                      # основная из normalize.PURPOSE_CATEGORIES
+    purpose_mask = Column(Integer)                          # все категории текста: бит 1 << id
+    deal_type = Column(Integer)                             # normalize.DEAL_SALE / DEAL_RENT
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -43,10 +91,15 @@ class Listing(Base):
 
     __table_args__ = (
         Index("idx_price_area", "start_price", "total_square"),
-        Index("idx_district_purpose", "district_code", "land_allowed_use_name"),
-        Index("idx_stage_state", "stage_state_name"),
+        Index("idx_district_purpose", "district_code", "land_allowed_use_id"),
+        Index("idx_stage_state", "stage_state_id"),
         Index("idx_coordinates", "latitude", "longitude"),
         Index("idx_cadastral", "cadastral_number"),
+        Index("idx_active_generation", "is_active", "crawl_generation"),
+        # Порядок колонок — порядок фильтров SearchService: город, назначение, сделка, цена
+        # purpose_mask & маска проверяется по записям индекса, без чтения строк таблицы
+        Index("idx_search_city", "is_active", "municipality", "purpose_mask", "deal_type", "start_price"),
+        Index("idx_search_purpose", "is_active", "purpose_mask", "deal_type", "start_price"),
         UniqueConstraint("registry_number", name="uq_registry_number"),
     )
 
@@ -90,6 +143,34 @@ class Listing(Base):
         }
 
 
+# Полнотекстовый (src/database/fts.py) и пространственный (src/database/spatial.py)
+# индексы и их триггеры создаются вместе с таблицей
+for _statement in fts.CREATE_STATEMENTS + spatial.CREATE_STATEMENTS:
+    event.listen(Listing.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+for _statement in fts.DROP_STATEMENTS + spatial.DROP_STATEMENTS:
+    event.listen(Listing.__table__, "before_drop", DDL(_statement).execute_if(dialect="sqlite"))
+
+
+# Атрибут с текстом → колонка с id и таблица справочника
+LOOKUP_COLUMNS = {
+    'purchase_kind_name': ('purchase_kind_id', PurchaseKind.__table__),
+    'purchase_form_name': ('purchase_form_id', PurchaseForm.__table__),
+    'stage_state_name': ('stage_state_id', StageState.__table__),
+    'land_allowed_use_name': ('land_allowed_use_id', LandUse.__table__),
+}
+
+
+@event.listens_for(Listing, "before_insert")
+@event.listens_for(Listing, "before_update")
+def _derive_search_columns(mapper, connection, target):
+    """Теневые колонки и id справочников при записи через ORM (ListingWriter делает это сам)"""
+    for name, value in normalize.derive_columns(target).items():
+        setattr(target, name, value)
+    values = {name: target.__dict__[name] for name in LOOKUP_COLUMNS if name in target.__dict__}
+    for name, value in LookupCache().encode(connection, [values], LOOKUP_COLUMNS)[0].items():
+        setattr(target, name, value)
+
+
 class ListingHistory(Base):
     __tablename__ = 'listing_history'
     
@@ -115,12 +196,41 @@ class TelegramUser(Base):
     notify_new_listings = Column(Boolean, default=False)
     notify_price_changes = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    last_active_at = Column(DateTime, default=datetime.utcnow)
+    last_active_at = Column(DateTime, default=datetime.utcnow, index=True)
 
     def __repr__(self):
         return f"<User {self.telegram_id}: {self.username}>"
 
 
+# Счётчики статистики (src/database/counters.py) ссылаются на listings и telegram_users,
+# поэтому создаются после всех таблиц — и только если create_all создал listings сейчас.
+# На существующей БД их создаёт миграция 009: пересчёт по схеме до миграций упал бы
+@event.listens_for(Listing.__table__, "after_create")
+def _listings_created(target, connection, **kw):
+    connection.info['listings_created'] = True
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_stats_counters(target, connection, **kw):
+    if connection.info.pop('listings_created', False):
+        counters.ensure_stats_counters(connection)
+
+
+def missing_listing_columns(connection) -> List[str]:
+    """Колонки модели Listing, которых нет в таблице: миграции к БД ещё не применены"""
+    existing = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(listings)")}
+    if not existing:
+        return []
+    return [column.name for column in Listing.__table__.columns if column.name not in existing]
+
+
+@event.listens_for(Base.metadata, "after_drop")
+def _drop_stats_counters(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        for statement in counters.DROP_STATEMENTS:
+            connection.exec_driver_sql(statement)
+
+
 # ===== НОВАЯ МОДЕЛЬ: ИЗБРАННОЕ =====
 class Favorite(Base):
     __tablename__ = 'favorites'
@@ -136,4 +246,107 @@ class Favorite(Base):
     )
 
     def __repr__(self):
-        return f"<Favorite user={self.telegram_id} listing={self.listing_id}>"
\ No newline at end of file
+        return f"<Favorite user={self.telegram_id} listing={self.listing_id}>"
+
+# ===== КЭШ ФОТО: URL ЕАСУЗ → file_id TELEGRAM =====
+class PhotoCache(Base):
+    __tablename__ = 'photo_cache'
+
+    url = Column(String(1000), primary_key=True)
+    file_id = Column(String(255))                           # NULL, пока фото ни разу не отправилось
+    is_bad = Column(Boolean, default=False, nullable=False) # Telegram не смог загрузить фото по URL
+    failures = Column(Integer, default=0)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<PhotoCache {self.url[:50]} {'bad' if self.is_bad else self.file_id}>"
+
+
+# ===== ЖУРНАЛ ЗАПУСКОВ ПАРСЕРА (для продолжения после сбоя) =====
+class CrawlRun(Base):
+    __tablename__ = 'crawl_runs'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    mode = Column(String(20), nullable=False)               # full / incremental
+    status = Column(String(20), nullable=False, default='running', index=True)
+    high_water_mark = Column(Integer, default=0)            # для инкрементального режима
+    cursor_id = Column(Integer)                             # все лоты с Id >= cursor_id сохранены
+    page = Column(Integer, default=0)                       # последняя полностью сохранённая страница
+    lots_processed = Column(Integer, default=0)
+    pages_processed = Column(Integer, default=0)
+    error = Column(Text)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<CrawlRun {self.id}: {self.mode} {self.status}>"
+
+
+class CrawlRunPage(Base):
+    __tablename__ = 'crawl_run_pages'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(Integer, ForeignKey('crawl_runs.id', ondelete='CASCADE'), nullable=False)
+    page = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False)             # committed
+    first_id = Column(Integer)
+    last_id = Column(Integer)
+    lots = Column(Integer, default=0)
+    committed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("run_id", "page", name="uq_run_page"),
+    )
+
+    def __repr__(self):
+        return f"<CrawlRunPage run={self.run_id} page={self.page} {self.status}>"
+
+
+class CrawlMetric(Base):
+    __tablename__ = 'crawl_metrics'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(Integer, ForeignKey('crawl_runs.id', ondelete='CASCADE'), nullable=False, index=True)
+    stage = Column(String(50), nullable=False)              # api / html / html_parse / db_write / ...
+    name = Column(String(100), nullable=False)              # time / bytes / status_200 / error_Timeout / ...
+    count = Column(Integer, default=0)
+    total = Column(Float, default=0)                        # секунды или байты, в зависимости от name
+    max_value = Column(Float, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("run_id", "stage", "name", name="uq_run_metric"),
+    )
+
+    def __repr__(self):
+        return f"<CrawlMetric run={self.run_id} {self.stage}.{self.name}={self.total}>"
+
+
+# ===== РАСПРЕДЕЛЁННЫЙ ОБХОД: АРЕНДА ШАРДОВ ЛЕНТЫ =====
+class CrawlShard(Base):
+    __tablename__ = 'crawl_shards'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(Integer, ForeignKey('crawl_runs.id', ondelete='CASCADE'), nullable=False)
+    shard_no = Column(Integer, nullable=False)
+    page_from = Column(Integer, nullable=False)
+    page_to = Column(Integer)                               # NULL — до конца ленты
+    status = Column(String(20), nullable=False, default='pending')   # pending / leased / done / failed
+    owner = Column(String(200))                             # хост:pid воркера
+    lease_expires_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    attempts = Column(Integer, default=0)
+    lots = Column(Integer, default=0)
+    error = Column(Text)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("idx_shard_claim", "run_id", "status", "lease_expires_at"),
+        UniqueConstraint("run_id", "shard_no", name="uq_run_shard"),
+    )
+
+    def __repr__(self):
+        return f"<CrawlShard run={self.run_id} #{self.shard_no} {self.status}>"
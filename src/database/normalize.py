@@ -0,0 +1,208 @@
+# src/database/normalize.py
+# Нормализованные теневые колонки лота: муниципалитет, категории назначения, тип сделки
+#
+# Вычисляются при записи (ListingWriter и события ORM в models.py) из исходных
+# текстовых полей. Поиск сравнивает их по составным индексам
+# idx_search_city / idx_search_purpose вместо LIKE и MATCH по тексту.
+#
+# municipality — не название округа, а ключ для сравнения (первое слово без
+# окончания): так «Одинцово», «Одинцовский г.о.» и «Одинцовский район» совпадают.
+
+import re
+from typing import Dict, Iterable, Mapping, Optional, Set
+
+DERIVED_COLUMNS = ('municipality', 'purpose_category', 'purpose_mask', 'deal_type')
+
+# Колонки, из которых они вычисляются
+SOURCE_COLUMNS = ('address_description', 'full_address', 'land_allowed_use_name', 'purchase_kind_name')
+
+
+# === Муниципалитет ===
+
+# Части адреса ЕАСУЗ: «Московская обл, Мытищи г.о., Ларево д», «г.о. Химки»,
+# «Волоколамский городской округ», «г. Коломна»
+_DISTRICT_MARKERS = re.compile(
+    r"(^|\s)(г\.\s*о\.?|м\.\s*о\.?|м\.\s*р\.?|р-н|городской округ|муниципальный округ|"
+    r"муниципальный район|район)(\s|$)"
+)
+_CITY_MARKERS = re.compile(r"(^|\s)(г\.?|город)(\s|$)")
+
+_ADJECTIVE_ENDINGS = ("ого", "ий", "ый", "ой", "ая", "ое", "ые")
+# Суффиксы прилагательного от названия: «Коломна» → «Коломенский», «Лобня» → «Лобненский»,
+# «Люберцы» → «Люберецкий»; порядок важен — длинные раньше
+_ADJECTIVE_SUFFIXES = (("ненск", "н"), ("енск", "н"), ("ецк", "ц"), ("цк", "ц"), ("ск", ""))
+# Прилагательные, которые правилами не сводятся к названию: ключ прилагательного → ключ названия
+_KEY_ALIASES = {"котельников": "котельник", "ивантеев": "ивантеевк"}
+_MIN_KEY_LENGTH = 3
+
+
+def fold(text: str) -> str:
+    return text.lower().replace("ё", "е").strip()
+
+
+def _strip(word: str, ending: str) -> str:
+    if word.endswith(ending) and len(word) - len(ending) >= _MIN_KEY_LENGTH:
+        return word[:-len(ending)]
+    return word
+
+
+def municipality_key(name: Optional[str]) -> Optional[str]:
+    """
+    Ключ муниципалитета: первое слово названия в нижнем регистре без окончания и суффиксов.
+    «Одинцово» и «Одинцовский», «Мытищи» и «Мытищинский», «Коломна» и «Коломенский»,
+    «Сергиев Посад» и «Сергиево-Посадский» дают один ключ.
+    """
+    if not name:
+        return None
+    words = re.findall(r"\w+", fold(name))
+    if not words:
+        return None
+    key = words[0]
+    for ending in _ADJECTIVE_ENDINGS:
+        if key.endswith(ending):
+            key = _strip(key, ending)
+            break
+    for suffix, replacement in _ADJECTIVE_SUFFIXES:
+        if key.endswith(suffix) and len(key) - len(suffix) + len(replacement) >= _MIN_KEY_LENGTH:
+            key = key[:-len(suffix)] + replacement
+            break
+    if key[-1] in "аеиоуыьяй":
+        key = _strip(key, key[-1])
+    # «Мытищ-ин-ский», «Пушк-ин-о»: -ин- снимается и у названия, и у прилагательного
+    key = _strip(key, "ин")
+    return _KEY_ALIASES.get(key, key)
+
+
+def municipality_name(address: Optional[str]) -> Optional[str]:
+    """Название городского округа (района, города) из адреса; None — не найдено"""
+    if not address:
+        return None
+    parts = [fold(part) for part in address.split(",")]
+    for markers in (_DISTRICT_MARKERS, _CITY_MARKERS):
+        for part in parts:
+            if markers.search(part):
+                name = markers.sub(" ", part).strip(" .")
+                if name:
+                    return name
+    return None
+
+
+def municipality(*addresses: Optional[str]) -> Optional[str]:
+    """
+    Ключ муниципалитета (municipality_key) по первому адресу, где он нашёлся.
+    Хранится ключ, а не само название: поиск приводит к нему и запрос пользователя.
+    """
+    for address in addresses:
+        name = municipality_name(address)
+        if name:
+            return municipality_key(name)
+    return None
+
+
+# === Категория назначения ===
+
+# id хранятся в listings.purpose_category и битами в listings.purpose_mask:
+# только дописывать, не переставлять (не больше 62 — маска в INTEGER SQLite)
+PURPOSE_CATEGORIES = {
+    1: "Для индивидуального жилищного строительства",
+    2: "Для ведения личного подсобного хозяйства",
+    3: "Ведение садоводства",
+    4: "Растениеводство",
+    5: "Скотоводство",
+    6: "Сельскохозяйственное использование",
+    7: "Магазины",
+    8: "Объекты торговли",
+    9: "Рынки",
+    10: "Деловое управление",
+    11: "Бытовое обслуживание",
+    12: "Коммунальное обслуживание",
+    13: "Производственная деятельность",
+    14: "Строительная промышленность",
+    15: "Склад",
+    16: "Складские площадки",
+    17: "Хранение автотранспорта",
+    18: "Служебные гаражи",
+}
+
+_FOLDED_CATEGORIES = [(category_id, fold(name)) for category_id, name in PURPOSE_CATEGORIES.items()]
+
+
+def purpose_category(land_use: Optional[str]) -> Optional[int]:
+    """
+    Основная категория вида разрешённого использования (для статистики): та, что
+    встречается в тексте раньше (при равенстве — более длинная: «Складские площадки»,
+    а не «Склад»). Для поиска — purpose_mask со всеми категориями текста.
+    """
+    if not land_use:
+        return None
+    text = fold(land_use)
+    best = None
+    for category_id, name in _FOLDED_CATEGORIES:
+        position = text.find(name)
+        if position < 0:
+            continue
+        rank = (position, -len(name))
+        if best is None or rank < best[0]:
+            best = (rank, category_id)
+    return best[1] if best else None
+
+
+def category_mask(category_ids: Iterable[int]) -> int:
+    """Битовая маска набора категорий: бит category_id на каждую"""
+    mask = 0
+    for category_id in category_ids:
+        mask |= 1 << category_id
+    return mask
+
+
+def purpose_mask(land_use: Optional[str]) -> Optional[int]:
+    """
+    Все категории, названия которых встречаются в тексте, — как находил их прежний
+    LIKE '%...%': «ИЖС; ведение ЛПХ; магазины» попадает в поиск по каждой из трёх
+    """
+    if not land_use:
+        return None
+    text = fold(land_use)
+    mask = category_mask(category_id for category_id, name in _FOLDED_CATEGORIES if name in text)
+    return mask or None
+
+
+def purpose_category_ids(names: Iterable[str]) -> Optional[Set[int]]:
+    """Категории для списка назначений; None — хотя бы одно вне справочника"""
+    ids = set()
+    for name in names:
+        category_id = purpose_category(name)
+        if category_id is None:
+            return None
+        ids.add(category_id)
+    return ids
+
+
+# === Тип сделки ===
+
+DEAL_SALE = 1
+DEAL_RENT = 2
+
+
+def deal_type(purchase_kind: Optional[str]) -> Optional[int]:
+    """«Аренда земельных участков» → DEAL_RENT, «Продажа имущества» → DEAL_SALE"""
+    if not purchase_kind:
+        return None
+    text = fold(purchase_kind)
+    # «Торги по продаже прав на заключение договоров аренды» — это аренда
+    if "аренд" in text:
+        return DEAL_RENT
+    if "продаж" in text or "купл" in text:
+        return DEAL_SALE
+    return None
+
+
+def derive_columns(row: Mapping) -> Dict:
+    """Значения теневых колонок для строки лота (dict или ORM-объект через getattr)"""
+    get = row.get if isinstance(row, Mapping) else lambda name: getattr(row, name, None)
+    return {
+        'municipality': municipality(get('address_description'), get('full_address')),
+        'purpose_category': purpose_category(get('land_allowed_use_name')),
+        'purpose_mask': purpose_mask(get('land_allowed_use_name')),
+        'deal_type': deal_type(get('purchase_kind_name')),
+    }
@@ -1,10 +1,79 @@
 # src/database/session.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
 from config.settings import settings  # ✅ исправлено
 
-engine = create_engine(settings.DATABASE_URL)
+
+def is_memory_database(url) -> bool:
+    return url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+
+
+def sqlite_pragmas() -> dict:
+    """
+    PRAGMA для каждого нового соединения с SQLite.
+    Бот и краулер пишут в один файл на /data: в WAL читатели не ждут писателя,
+    а busy_timeout превращает «database is locked» в короткое ожидание.
+    """
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -settings.SQLITE_CACHE_SIZE_MB * 1024,  # отрицательное значение — в КБ
+        "mmap_size": settings.SQLITE_MMAP_SIZE_MB * 1024 * 1024,
+    }
+
+
+def engine_options(url, **kwargs) -> dict:
+    """
+    Параметры create_engine для профиля: размеры пула из настроек,
+    а для файловой SQLite — ещё таймаут блокировки и общий доступ из потоков.
+    """
+    if url.get_backend_name() == "sqlite" and is_memory_database(url):
+        return kwargs
+    kwargs.setdefault("pool_size", settings.DB_POOL_SIZE)
+    kwargs.setdefault("max_overflow", settings.DB_MAX_OVERFLOW)
+    kwargs.setdefault("pool_timeout", settings.DB_POOL_TIMEOUT)
+    if url.get_backend_name() == "sqlite":
+        # Файловая БД: пул по числу одновременных обработчиков бота и потоков синхронизации
+        connect_args = kwargs.setdefault("connect_args", {})
+        connect_args.setdefault("check_same_thread", False)
+        connect_args.setdefault("timeout", settings.SQLITE_BUSY_TIMEOUT_MS / 1000)
+    return kwargs
+
+
+def install_pragmas(engine: Engine, pragmas: dict = None):
+    """
+    Выполнять PRAGMA на каждом новом соединении с SQLite.
+    pragmas=None — sqlite_pragmas(), {} — оставить настройки SQLite по умолчанию.
+    """
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+    if not pragmas or engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def make_engine(url: str = None, pragmas: dict = None, **kwargs) -> Engine:
+    """
+    Движок SQLAlchemy с производственным профилем для SQLite
+    (для остальных СУБД — только размеры пула из настроек).
+    """
+    url = make_url(url or settings.DATABASE_URL)
+    engine = create_engine(url, **engine_options(url, **kwargs))
+    install_pragmas(engine, pragmas)
+    return engine
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -12,4 +81,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
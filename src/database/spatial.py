@@ -0,0 +1,110 @@
+# src/database/spatial.py
+# Пространственный индекс лотов (SQLite R*Tree) по latitude/longitude
+#
+# Точка лота хранится вырожденным прямоугольником (min = max). Индекс обновляется
+# триггерами на listings, так что его поддерживают и ListingWriter, и ORM.
+# R*Tree хранит 32-битные float и округляет границы наружу, поэтому выборка по
+# прямоугольнику — только грубый фильтр; точное расстояние считает haversine.
+
+from math import asin, cos, radians, sin, sqrt
+from typing import List, Tuple
+
+RTREE_TABLE = "listings_rtree"
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.195         # длина градуса меридиана
+
+_HAS_POINT = "new.latitude IS NOT NULL AND new.longitude IS NOT NULL"
+_INSERT = (f"INSERT OR REPLACE INTO {RTREE_TABLE}(id, min_lat, max_lat, min_lon, max_lon) "
+           f"VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);")
+
+CREATE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree(
+        id, min_lat, max_lat, min_lon, max_lon
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS listings_rtree_ai AFTER INSERT ON listings
+        WHEN {_HAS_POINT} BEGIN
+        {_INSERT}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS listings_rtree_ad AFTER DELETE ON listings BEGIN
+        DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS listings_rtree_au AFTER UPDATE OF id, latitude, longitude ON listings BEGIN
+        DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+        INSERT INTO {RTREE_TABLE}(id, min_lat, max_lat, min_lon, max_lon)
+            SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude WHERE {_HAS_POINT};
+    END""",
+]
+
+REBUILD_STATEMENTS = [
+    f"DELETE FROM {RTREE_TABLE}",
+    f"""INSERT INTO {RTREE_TABLE}(id, min_lat, max_lat, min_lon, max_lon)
+        SELECT id, latitude, latitude, longitude, longitude FROM listings
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL""",
+]
+
+DROP_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS listings_rtree_ai",
+    "DROP TRIGGER IF EXISTS listings_rtree_ad",
+    "DROP TRIGGER IF EXISTS listings_rtree_au",
+    f"DROP TABLE IF EXISTS {RTREE_TABLE}",
+]
+
+
+def ensure_listings_rtree(conn) -> bool:
+    """
+    Создать индекс и триггеры, если их нет (БД, созданная до R*Tree), и заполнить его.
+    conn — соединение SQLAlchemy; True, если индекс строился заново.
+    """
+    if conn.dialect.name != "sqlite":
+        return False
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (RTREE_TABLE,)
+    ).first() is not None
+    for statement in CREATE_STATEMENTS:
+        conn.exec_driver_sql(statement)
+    if exists:
+        return False
+    for statement in REBUILD_STATEMENTS:
+        conn.exec_driver_sql(statement)
+    return True
+
+
+# === Геометрия ===
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Расстояние между двумя точками на Земле (формула Haversine), км"""
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    (min_lat, max_lat, min_lon, max_lon), заведомо содержащий круг radius_km:
+    градус долготы берётся по самой дальней от экватора широте круга.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    far_lat = min(abs(lat) + dlat, 89.9)
+    dlon = min(radius_km / (KM_PER_DEGREE * cos(radians(far_lat))), 180.0)
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+# Кандидаты в прямоугольнике: сначала R*Tree, затем лоты по rowid.
+# Именно IN, а не JOIN: при JOIN планировщик SQLite может начать с индекса по is_active
+# и искать каждый лот в R*Tree по id.
+NEARBY_SQL = f"""SELECT id, latitude, longitude FROM listings
+    WHERE id IN (
+        SELECT id FROM {RTREE_TABLE}
+        WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?
+    )
+    AND is_active = 1"""
+
+
+def points_in_box(conn, lat: float, lon: float, radius_km: float) -> List[Tuple[int, float, float]]:
+    """
+    (id, широта, долгота) активных лотов в прямоугольнике вокруг круга radius_km.
+    Готовый SQL, а не выражение SQLAlchemy: сборка и компиляция выражения на каждый
+    вызов дороже самого запроса к R*Tree.
+    """
+    return conn.exec_driver_sql(NEARBY_SQL, bounding_box(lat, lon, radius_km)).all()
@@ -1,4 +1,4 @@
 from .scraper import EasuzParser
-from .models import LandListing
+from .models import LandListing, ListingRow
 
-__all__ = ['EasuzParser', 'LandListing']
\ No newline at end of file
+__all__ = ['EasuzParser', 'LandListing', 'ListingRow']
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Архив сырых ответов ЕАСУЗ: сжатые gzip JSONL-сегменты по датам
+
+    {root}/2025-11-17/api-101500-4242-0001.jsonl.gz   ← ответы GetPurchasePage
+    {root}/2025-11-17/html-101500-4242-0001.jsonl.gz  ← HTML-карточки лотов
+
+По архиву можно пересобрать таблицу listings без обращения к сайту
+(см. src/parser/replay.py).
+"""
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+from config.settings import settings
+
+KINDS = ('api', 'html')
+
+
+class RawArchive:
+    """Потокобезопасная запись сырых ответов в сегменты JSONL.gz"""
+
+    def __init__(self, root: str, segment_records: int = 500):
+        self.root = root
+        self.segment_records = segment_records
+        self._lock = threading.Lock()
+        self._segments: Dict[str, dict] = {}
+        self._seq = 0
+        atexit.register(self.close)
+
+    @classmethod
+    def from_settings(cls) -> Optional['RawArchive']:
+        if not settings.RAW_ARCHIVE_DIR:
+            return None
+        return cls(settings.RAW_ARCHIVE_DIR, settings.RAW_ARCHIVE_SEGMENT_RECORDS)
+
+    def _open_segment(self, kind: str, day: str) -> dict:
+        directory = os.path.join(self.root, day)
+        os.makedirs(directory, exist_ok=True)
+        self._seq += 1
+        name = f"{kind}-{datetime.now():%H%M%S}-{os.getpid()}-{self._seq:04d}.jsonl.gz"
+        return {
+            'day': day,
+            'count': 0,
+            'file': gzip.open(os.path.join(directory, name), 'wt', encoding='utf-8'),
+        }
+
+    def _write(self, kind: str, record: Dict):
+        record['kind'] = kind
+        record['ts'] = time.time()
+        line = json.dumps(record, ensure_ascii=False)
+        day = datetime.now().strftime('%Y-%m-%d')
+        with self._lock:
+            segment = self._segments.get(kind)
+            if segment and (segment['day'] != day or segment['count'] >= self.segment_records):
+                segment['file'].close()
+                segment = None
+            if segment is None:
+                segment = self._open_segment(kind, day)
+                self._segments[kind] = segment
+            segment['file'].write(line + '\n')
+            segment['count'] += 1
+
+    def record_api(self, payload: Dict, response: Dict):
+        """Ответ GetPurchasePage вместе с запросом"""
+        self._write('api', {'payload': payload, 'response': response})
+
+    def record_html(self, lot_id: int, category_code: str, district_code: str,
+                    url: str, status: int, html: str):
+        """HTML-карточка лота (и итоговый URL после редиректов)"""
+        self._write('html', {
+            'lot_id': lot_id,
+            'category_code': category_code,
+            'district_code': district_code,
+            'url': url,
+            'status': status,
+            'html': html,
+        })
+
+    def close(self):
+        """Закрыть открытые сегменты (gzip дописывает хвост только при закрытии)"""
+        with self._lock:
+            for segment in self._segments.values():
+                segment['file'].close()
+            self._segments = {}
+
+
+def iter_records(root: str, kind: str, date_from: Optional[str] = None,
+                 date_to: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Записи архива одного вида в хронологическом порядке.
+    date_from/date_to — границы партиций в формате YYYY-MM-DD (включительно).
+    """
+    if not os.path.isdir(root):
+        return
+    for day in sorted(os.listdir(root)):
+        if date_from and day < date_from or date_to and day > date_to:
+            continue
+        directory = os.path.join(root, day)
+        segments = sorted(
+            name for name in os.listdir(directory)
+            if name.startswith(f"{kind}-") and name.endswith('.jsonl.gz')
+        )
+        for name in segments:
+            try:
+                with gzip.open(os.path.join(directory, name), 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        yield json.loads(line)
+            except (EOFError, OSError, json.JSONDecodeError) as e:
+                # Сегмент процесса, упавшего до закрытия файла: читаем, сколько удалось
+                print(f"⚠️ Сегмент {name} повреждён или не дописан: {e}")
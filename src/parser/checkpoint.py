@@ -0,0 +1,149 @@
+"""
+Контрольные точки обхода ЕАСУЗ (таблицы crawl_runs / crawl_run_pages)
+
+Страница считается сохранённой, только когда её лоты зафиксированы в БД:
+контрольная точка пишется в той же транзакции, что и пакет объявлений
+(через ListingWriter.before_commit). После сбоя или перезапуска обход
+продолжается с курсора последней зафиксированной страницы.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, update
+
+from src.database.models import Base, CrawlMetric, CrawlRun, CrawlRunPage
+from src.database.session import SessionLocal, engine
+
+UNFINISHED_STATUSES = ('running', 'interrupted', 'failed')
+
+# Запуск в другом процессе считается живым, пока его контрольные точки не старше этого
+FOREIGN_RUN_MAX_IDLE = timedelta(minutes=15)
+
+
+class CrawlRunTracker:
+    """Журнал одного запуска парсера"""
+
+    def __init__(self, run: CrawlRun):
+        self.run_id = run.id
+        self.mode = run.mode
+        self.high_water_mark = run.high_water_mark or 0
+        self.cursor_id = run.cursor_id
+        self.page = run.page or 0
+        self.lots_processed = run.lots_processed or 0
+        self.pages_processed = run.pages_processed or 0
+        self._pending_pages: List[Dict] = []
+
+    @staticmethod
+    def ensure_tables():
+        Base.metadata.create_all(
+            engine, tables=[CrawlRun.__table__, CrawlRunPage.__table__, CrawlMetric.__table__]
+        )
+
+    @classmethod
+    def start(cls, mode: str, high_water_mark: int = 0) -> 'CrawlRunTracker':
+        """Зарегистрировать новый запуск"""
+        cls.ensure_tables()
+        with SessionLocal() as db:
+            run = CrawlRun(mode=mode, status='running', high_water_mark=high_water_mark)
+            db.add(run)
+            db.commit()
+            db.refresh(run)
+            return cls(run)
+
+    @classmethod
+    def resume(cls, mode: Optional[str] = None) -> Optional['CrawlRunTracker']:
+        """Продолжить последний незавершённый запуск (или None, если такого нет)"""
+        cls.ensure_tables()
+        with SessionLocal() as db:
+            query = db.query(CrawlRun).filter(CrawlRun.status.in_(UNFINISHED_STATUSES))
+            if mode:
+                query = query.filter(CrawlRun.mode == mode)
+            run = query.order_by(CrawlRun.id.desc()).first()
+            if run is None:
+                return None
+            run.status = 'running'
+            run.error = None
+            db.commit()
+            db.refresh(run)
+            return cls(run)
+
+    @classmethod
+    def find_active(cls, max_idle: timedelta) -> Optional[int]:
+        """
+        Id запуска, который сейчас идёт в другом процессе: статус running и контрольная
+        точка не старше max_idle (запуски упавших процессов остаются running навсегда).
+        """
+        cls.ensure_tables()
+        with SessionLocal() as db:
+            run = (
+                db.query(CrawlRun)
+                .filter(CrawlRun.status == 'running', CrawlRun.updated_at >= datetime.utcnow() - max_idle)
+                .order_by(CrawlRun.id.desc())
+                .first()
+            )
+            return run.id if run else None
+
+    def page_done(self, page: int, objects: List[Dict], lots: int):
+        """Страница целиком передана в ListingWriter; в БД попадёт при ближайшем COMMIT"""
+        self._pending_pages.append({
+            'run_id': self.run_id,
+            'page': page,
+            'status': 'committed',
+            'first_id': objects[0]['id'] if objects else None,
+            'last_id': objects[-1]['id'] if objects else None,
+            'lots': lots,
+            'committed_at': datetime.utcnow(),
+        })
+
+    def checkpoint(self, conn):
+        """Записать контрольную точку на соединении ListingWriter (до его COMMIT)"""
+        if not self._pending_pages:
+            return
+        pages, self._pending_pages = self._pending_pages, []
+        conn.execute(insert(CrawlRunPage.__table__).prefix_with('OR REPLACE'), pages)
+
+        last = pages[-1]
+        self.page = last['page']
+        if last['last_id'] is not None:
+            self.cursor_id = last['last_id']
+        self.pages_processed += len(pages)
+        self.lots_processed += sum(page['lots'] for page in pages)
+        conn.execute(
+            update(CrawlRun.__table__)
+            .where(CrawlRun.id == self.run_id)
+            .values(
+                cursor_id=self.cursor_id,
+                page=self.page,
+                pages_processed=self.pages_processed,
+                lots_processed=self.lots_processed,
+                updated_at=datetime.utcnow(),
+            )
+        )
+
+    def finish(self, status: str, error: Optional[str] = None):
+        """Отметить итог запуска: completed / interrupted / failed"""
+        with SessionLocal() as db:
+            run = db.get(CrawlRun, self.run_id)
+            run.status = status
+            run.error = error
+            if status == 'completed':
+                run.finished_at = datetime.utcnow()
+            db.commit()
+
+
+def concurrent_runs(run_id: int) -> List[int]:
+    """
+    Другие запуски, шедшие одновременно с run_id: начатые или писавшие контрольные точки
+    после его старта. После такого обхода снимать лоты по поколению нельзя — лоты,
+    переписанные параллельным запуском, несут его номер, а не run_id.
+    """
+    CrawlRunTracker.ensure_tables()
+    with SessionLocal() as db:
+        started_at = db.query(CrawlRun.started_at).filter(CrawlRun.id == run_id).scalar()
+        if started_at is None:
+            return []
+        return [
+            other_id for (other_id,) in db.query(CrawlRun.id)
+            .filter(CrawlRun.id != run_id, CrawlRun.updated_at >= started_at)
+            .order_by(CrawlRun.id)
+        ]
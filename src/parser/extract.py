@@ -0,0 +1,136 @@
+"""
+Быстрое извлечение данных из HTML-карточки лота (/torgi/.../info)
+
+Страница весит ~340 КБ (см. correct_lot.html), а нужны только пары
+«подпись — значение» из списка <li class="leftCol-list-li">. Вместо разбора
+всего документа в дерево BeautifulSoup находим нужные <li> регулярным
+выражением и токенизируем только их.
+"""
+import re
+from html.parser import HTMLParser
+from typing import List, Tuple
+
+LEFT_COL_CLASS = 'leftCol-list-li'
+LABEL_CLASS = 'grayColor'
+VALUE_CLASS = 'blackColor'
+
+_LI_TAG_RE = re.compile(r'<(/?)li\b([^>]*)>', re.IGNORECASE)
+_CLASS_ATTR_RE = re.compile(r'\bclass\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.IGNORECASE)
+
+
+def _has_class(attrs: str, class_name: str) -> bool:
+    match = _CLASS_ATTR_RE.search(attrs)
+    if not match:
+        return False
+    value = next(group for group in match.groups() if group is not None)
+    return class_name in value.split()
+
+
+class _SpanTextParser(HTMLParser):
+    """
+    Разбирает один <li> и запоминает текст первого <span class="grayColor">
+    и первого <span class="blackColor"> (как li.find('span', class_=...).get_text(strip=True))
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.texts = {}
+        self._active = []  # [(класс, глубина вложенных span)]
+        self._parts = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'span':
+            return
+        for entry in self._active:
+            entry[1] += 1
+        classes = (dict(attrs).get('class') or '').split()
+        for class_name in (LABEL_CLASS, VALUE_CLASS):
+            if class_name in classes and class_name not in self.texts and class_name not in self._parts:
+                self._parts[class_name] = []
+                self._active.append([class_name, 0])
+
+    def handle_endtag(self, tag):
+        if tag != 'span':
+            return
+        still_active = []
+        for entry in self._active:
+            if entry[1] == 0:
+                self.texts[entry[0]] = ''.join(self._parts.pop(entry[0]))
+            else:
+                entry[1] -= 1
+                still_active.append(entry)
+        self._active = still_active
+
+    def handle_data(self, data):
+        text = data.strip()
+        if text:
+            for class_name, _ in self._active:
+                self._parts[class_name].append(text)
+
+    def close(self):
+        super().close()
+        # Незакрытые span (обрезанная разметка) — берём то, что успели собрать
+        for class_name, _ in self._active:
+            self.texts[class_name] = ''.join(self._parts.pop(class_name))
+        self._active = []
+
+
+def _iter_left_col_items(html: str):
+    """Фрагменты разметки внутри <li class="leftCol-list-li"> с учётом вложенных <li>"""
+    pos = 0
+    while True:
+        match = _LI_TAG_RE.search(html, pos)
+        if not match:
+            return
+        pos = match.end()
+        if match.group(1) or not _has_class(match.group(2), LEFT_COL_CLASS):
+            continue
+
+        depth = 1
+        end = len(html)
+        inner = _LI_TAG_RE.search(html, pos)
+        while inner:
+            depth += -1 if inner.group(1) else 1
+            if depth == 0:
+                end = inner.start()
+                break
+            inner = _LI_TAG_RE.search(html, inner.end())
+        yield html[pos:end]
+
+
+def extract_left_col_pairs(html: str) -> List[Tuple[str, str]]:
+    """Все пары (подпись, значение) из <li class="leftCol-list-li"> в порядке документа"""
+    pairs = []
+    for fragment in _iter_left_col_items(html):
+        parser = _SpanTextParser()
+        parser.feed(fragment)
+        parser.close()
+        if LABEL_CLASS in parser.texts and VALUE_CLASS in parser.texts:
+            pairs.append((parser.texts[LABEL_CLASS], parser.texts[VALUE_CLASS]))
+    return pairs
+
+
+def extract_left_col_pairs_soup(html: str) -> List[Tuple[str, str]]:
+    """Эталонная реализация на BeautifulSoup (полный разбор страницы) — для сверки и бенчмарка"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    pairs = []
+    for li in soup.find_all('li', class_=LEFT_COL_CLASS):
+        gray_span = li.find('span', class_=LABEL_CLASS)
+        black_span = li.find('span', class_=VALUE_CLASS)
+        if gray_span and black_span:
+            pairs.append((gray_span.get_text(strip=True), black_span.get_text(strip=True)))
+    return pairs
+
+
+def parse_lot_details(html: str) -> Tuple[str, str]:
+    """Из карточки лота: (full_address, cadastral_number)"""
+    full_address = ""
+    cadastral_number = ""
+    for label, value in extract_left_col_pairs(html):
+        if 'Адрес' in label:
+            full_address = value
+        elif 'Кадастровый номер' in label:
+            cadastral_number = value
+    return full_address, cadastral_number
@@ -1,108 +1,167 @@
 """
 Полный перепарсинг всех данных с ЕАСУЗ с извлечением кадастровых номеров
 """
-import sys
-import time
-import json
-from datetime import datetime
+import argparse
+from typing import Callable, Optional
+from src.parser.checkpoint import CrawlRunTracker, concurrent_runs
+from src.parser.replay import replay_archive
 from src.parser.scraper import EasuzParser
+from src.database.bulk import ListingWriter, deactivate_stale_listings
 from src.database.session import get_db
 from src.database.models import Listing
+from sqlalchemy import func
+
+
+def get_high_water_mark(db) -> int:
+    """Наибольший Id лота, уже сохранённый в БД (Id в БД совпадает с Id ЕАСУЗ)"""
+    return db.query(func.max(Listing.id)).scalar() or 0
 
-def parse_datetime(date_str):
-    """Конвертирует ISO строку в datetime объект"""
-    if not date_str:
-        return None
-    try:
-        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-    except:
-        return None
 
-def main():
-    print("🚀 Запуск полного перепарсинга данных с ЕАСУЗ...")
+def main(incremental: bool = False, max_pages: Optional[int] = 320, resume: bool = False,
+         progress: Optional[Callable[[int, int], None]] = None) -> dict:
+    """
+    Полный обход ленты ЕАСУЗ или инкрементальная синхронизация.
+
+    В инкрементальном режиме лента (отсортированная по убыванию Id) читается
+    только до наибольшего уже сохранённого Id, и HTML грузится только для новых лотов.
+    resume=True продолжает последний незавершённый запуск с его контрольной точки.
+    progress(page, lots) вызывается после каждой страницы (для планировщика в боте).
+    Возвращает итог запуска: статус, число записанных, новых, изменённых и снятых лотов.
+    """
+    mode = "incremental" if incremental else "full"
+    mode_name = "инкрементальной синхронизации" if incremental else "полного перепарсинга"
+    print(f"🚀 Запуск {mode_name} данных с ЕАСУЗ...")
     print()
-    
+
     parser = EasuzParser()
     db = next(get_db())
-    
+
+    tracker = CrawlRunTracker.resume(mode) if resume else None
+    if tracker:
+        print(f"⏯️ Продолжаю запуск #{tracker.run_id}: страница {tracker.page}, "
+              f"Id < {tracker.cursor_id}, уже обработано {tracker.lots_processed} лотов")
+    else:
+        if resume:
+            print("ℹ️ Незавершённых запусков нет, начинаю заново")
+        high_water_mark = get_high_water_mark(db) if incremental else 0
+        tracker = CrawlRunTracker.start(mode, high_water_mark)
+
+    def before_commit(conn):
+        tracker.checkpoint(conn)
+        parser.telemetry.flush(conn, tracker.run_id)
+
+    # Контрольная точка и метрики фиксируются в одной транзакции с пакетом объявлений;
+    # номер запуска служит поколением обхода для снятия исчезнувших лотов
+    writer = ListingWriter(before_commit=before_commit, generation=tracker.run_id,
+                           telemetry=parser.telemetry)
+    high_water_mark = tracker.high_water_mark
     total_saved = 0
-    page = 1
-    max_pages = 320  # Примерно 3200 записей / 10 = 320 страниц
-    
+    deactivated = 0
+    status = 'failed'
+    error = None
+
     try:
-        while page <= max_pages:
-            print(f"📄 Загрузка страницы {page}/{max_pages} из ЕАСУЗ...")
-            
-            # Получаем данные с HTML-парсингом
-            listings, pagination = parser.get_page(page=page, per_page=10, fetch_html=True)
-            
-            if not listings:
-                print("✅ Больше нет данных для загрузки")
-                break
-            
+        if incremental:
+            print(f"🔖 Последний известный Id: {high_water_mark}")
+
+        # Курсор по Id вместо смещений: лоты не теряются и не дублируются,
+        # если лента меняется во время обхода. Следующие страницы (с HTML только
+        # для новых лотов) готовятся в фоне, пока текущая пишется в БД.
+        pages = parser.iter_pages(
+            per_page=10, max_pages=max_pages, fetch_html=True,
+            start_page=max(1, tracker.page), cursor=tracker.cursor_id,
+            stop_at_id=high_water_mark if incremental else None,
+        )
+        for feed_page in pages:
+            page, objects, listings = feed_page
+            print(f"📄 Страница {page}, Id {objects[0]['id']}…{objects[-1]['id']}")
             print(f"  → Получено {len(listings)} записей")
-            
-            # Сохраняем каждую запись
-            for listing in listings:
-                try:
-                    # Проверяем существование записи
-                    existing = db.query(Listing).filter(
-                        Listing.registry_number == listing.registry_number
-                    ).first()
-                    
-                    if existing:
-                        # UPDATE существующей записи
-                        existing.name = listing.name
-                        existing.start_price = listing.start_price
-                        existing.deposit_amount = listing.deposit_amount
-                        existing.start_step_amount = listing.start_step_amount
-                        existing.total_square = listing.total_square
-                        existing.address_description = listing.address_description
-                        existing.latitude = listing.latitude
-                        existing.longitude = listing.longitude
-                        existing.district_code = listing.district_code
-                        existing.right_term_use_year = listing.right_term_use_year
-                        existing.right_term_use_month = listing.right_term_use_month
-                        existing.purchase_kind_name = listing.purchase_kind_name
-                        existing.purchase_form_name = listing.purchase_form_name
-                        existing.stage_state_name = listing.stage_state_name
-                        existing.land_allowed_use_name = listing.land_allowed_use_name
-                        existing.accept_plan_end_date = parse_datetime(listing.accept_plan_end_date)
-                        existing.review_plan_end_date = parse_datetime(listing.review_plan_end_date)
-                        existing.count_views = listing.count_views
-                        existing.photos_json = json.dumps(listing.photos) if listing.photos else None
-                        existing.full_address = listing.full_address
-                        existing.direct_url = listing.direct_url
-                        existing.object_type = listing.object_type
-                        existing.cadastral_number = listing.cadastral_number
-                    else:
-                        # INSERT новой записи
-                        db.add(listing)
-                    
-                    db.commit()
-                    total_saved += 1
-                    
-                except Exception as e:
-                    print(f"  ⚠️ Ошибка: {str(e)[:100]}")
-                    db.rollback()
-                    continue
-            
-            print(f"  ✅ Сохранено {len(listings)} записей (всего: {total_saved})")
-            
-            page += 1
-            print("⏳ Пауза 2 сек...")
-            time.sleep(2)
-    
+
+            # Пишем пакетами через UPSERT, без SELECT и COMMIT на каждую запись
+            total_saved += writer.write(listings)
+            if not incremental:
+                writer.keep(feed_page.unparsed_ids())
+            tracker.page_done(page, objects, len(listings))
+            print(f"  ✅ Передано на запись {len(listings)} записей (всего: {total_saved})")
+            if progress is not None:
+                progress(page, total_saved)
+
+        print("✅ Обход ленты завершён")
+
+        writer.close()
+        status = 'completed'
+        print(f"🆕 Новых: {writer.inserted}, ✏️ изменилось: {writer.updated}, "
+              f"без изменений: {writer.unchanged}, записей истории: {writer.history_records}")
+
+        # Пометка-и-очистка: после полного обхода всей ленты лоты старших поколений
+        # в ней уже не встречаются — снимаем их одним UPDATE. Конец ленты определяет
+        # сам обход (пустая/неполная страница или countTotal), а не сравнение с max_pages:
+        # по умолчанию лимит примерно равен длине ленты
+        others = concurrent_runs(tracker.run_id) if not incremental else []
+        if others:
+            print(f"ℹ️ Одновременно шли запуски {others} — снятие исчезнувших лотов пропущено")
+        elif not incremental and parser.feed_exhausted and tracker.lots_processed:
+            deactivated = deactivate_stale_listings(tracker.run_id)
+            print(f"🧹 Снято с публикации исчезнувших лотов: {deactivated}")
+        elif not incremental:
+            print("ℹ️ Лента пройдена не полностью — снятие исчезнувших лотов пропущено")
+
     except KeyboardInterrupt:
         print("\n⚠️ Прервано пользователем")
+        status = 'interrupted'
     except Exception as e:
         print(f"\n❌ Критическая ошибка: {e}")
+        print("💡 Продолжить с места остановки: python -m src.parser.full_reparse --resume")
+        error = str(e)
         import traceback
         traceback.print_exc()
     finally:
+        if status != 'completed':
+            # Сохраняем то, что успели: следующий --resume продолжит с этого места
+            try:
+                writer.close()
+            except Exception as e:
+                print(f"⚠️ Не удалось сохранить остаток: {e}")
+        tracker.finish(status, error)
+        try:
+            parser.telemetry.save(tracker.run_id)
+        except Exception as e:
+            print(f"⚠️ Не удалось сохранить метрики: {e}")
+        parser.close()
         db.close()
         print(f"\n📊 Итого обработано записей: {total_saved}")
         print("✅ Готово!")
 
+    return {
+        'run_id': tracker.run_id,
+        'mode': mode,
+        'status': status,
+        'error': error,
+        'saved': total_saved,
+        'inserted': writer.inserted,
+        'updated': writer.updated,
+        'deactivated': deactivated,
+    }
+
+
+def parse_args(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Перепарсинг данных ЕАСУЗ")
+    arg_parser.add_argument("--incremental", action="store_true",
+                            help="загрузить только лоты новее последнего сохранённого Id")
+    arg_parser.add_argument("--max-pages", type=int, default=320,
+                            help="ограничение на число страниц (по 10 лотов)")
+    arg_parser.add_argument("--resume", action="store_true",
+                            help="продолжить последний незавершённый запуск с контрольной точки")
+    arg_parser.add_argument("--replay", action="store_true",
+                            help="пересобрать listings из архива сырых ответов, без обращения к сайту")
+    arg_parser.add_argument("--from", dest="date_from", help="--replay: первая дата архива (YYYY-MM-DD)")
+    arg_parser.add_argument("--to", dest="date_to", help="--replay: последняя дата архива (YYYY-MM-DD)")
+    return arg_parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.replay:
+        replay_archive(date_from=args.date_from, date_to=args.date_to)
+    else:
+        main(incremental=args.incremental, max_pages=args.max_pages, resume=args.resume)
@@ -0,0 +1,139 @@
+"""
+Постоянный кэш HTML-данных карточек лотов (SQLite)
+
+Ключ — id лота + категория + район. У записей есть срок жизни (TTL),
+неудачные загрузки хранятся как негативные записи с более коротким сроком,
+а при превышении max_entries вытесняются давно не читавшиеся записи (LRU).
+
+Чтение ничего не пишет в БД: время обращения копится в памяти и сохраняется
+пакетом вместе с очередной вставкой, перед вытеснением и при закрытии.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from config.settings import settings
+
+Details = Tuple[str, str, str]  # (direct_url, full_address, cadastral_number)
+
+
+class HtmlDetailCache:
+    """Кэш (direct_url, full_address, cadastral_number) по ключу лота"""
+
+    # Проверять переполнение не на каждой записи, а раз в N вставок
+    EVICT_CHECK_EVERY = 100
+    # Сохранять накопленные времена обращения, даже если вставок нет (одни попадания)
+    ACCESS_FLUSH_EVERY = 1000
+
+    def __init__(self, path: str, ttl: float, negative_ttl: float, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self._accessed: Dict[str, float] = {}
+
+        directory = os.path.dirname(path)
+        if path != ':memory:' and directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS html_details (
+                cache_key TEXT PRIMARY KEY,
+                direct_url TEXT NOT NULL DEFAULT '',
+                full_address TEXT NOT NULL DEFAULT '',
+                cadastral_number TEXT NOT NULL DEFAULT '',
+                is_negative INTEGER NOT NULL DEFAULT 0,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_html_details_accessed ON html_details(accessed_at)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_settings(cls) -> 'HtmlDetailCache':
+        return cls(
+            path=settings.HTML_CACHE_PATH or ':memory:',
+            ttl=settings.HTML_CACHE_TTL_HOURS * 3600,
+            negative_ttl=settings.HTML_CACHE_NEGATIVE_TTL_MINUTES * 60,
+            max_entries=settings.HTML_CACHE_MAX_ENTRIES,
+        )
+
+    @staticmethod
+    def make_key(lot_id: int, category_code: str, district_code: str) -> str:
+        return f"{lot_id}_{category_code}_{district_code}"
+
+    def get(self, key: str) -> Optional[Details]:
+        """Вернуть данные из кэша или None, если записи нет или она устарела"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT direct_url, full_address, cadastral_number, expires_at "
+                "FROM html_details WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+            # Устаревшую запись заменит set или удалит _evict
+            if row is None or row[3] <= now:
+                return None
+            self._accessed[key] = now
+            if len(self._accessed) >= self.ACCESS_FLUSH_EVERY:
+                self._flush_accessed()
+                self._conn.commit()
+        return row[0], row[1], row[2]
+
+    def _flush_accessed(self):
+        """Записать накопленные времена обращения одним executemany (вызывать под _lock)"""
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE html_details SET accessed_at = ? WHERE cache_key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def set(self, key: str, details: Details, negative: bool = False):
+        """Сохранить данные; negative=True — неудачная загрузка с коротким сроком жизни"""
+        now = time.time()
+        expires_at = now + (self.negative_ttl if negative else self.ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO html_details "
+                "(cache_key, direct_url, full_address, cadastral_number, is_negative, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, details[0], details[1], details[2], int(negative), expires_at, now),
+            )
+            self._accessed.pop(key, None)
+            self._flush_accessed()
+            self._inserts += 1
+            if self._inserts % self.EVICT_CHECK_EVERY == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Удалить устаревшие записи и самые давно читавшиеся сверх max_entries"""
+        self._conn.execute("DELETE FROM html_details WHERE expires_at <= ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM html_details").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM html_details WHERE cache_key IN ("
+                "SELECT cache_key FROM html_details ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM html_details").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+            self._conn.close()
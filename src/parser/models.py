@@ -1,7 +1,50 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+
+class ListingRow(NamedTuple):
+    """
+    Разобранный лот в конвейере парсера: кортеж из простых типов Python.
+    Поля совпадают с колонками UPSERT_COLUMNS (src/database/bulk.py) —
+    в строку БД он превращается только при пакетной записи.
+    """
+    id: int
+    name: str
+    registry_number: str
+    start_price: float
+    deposit_amount: float
+    start_step_amount: float
+    total_square: float
+    address_description: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    district_code: Optional[str]
+    right_term_use_year: Optional[int]
+    right_term_use_month: Optional[int]
+    purchase_kind_name: str
+    purchase_form_name: str
+    stage_state_name: str
+    land_allowed_use_name: str
+    accept_plan_end_date: Optional[datetime]
+    review_plan_end_date: Optional[datetime]
+    count_views: int
+    photos_json: Optional[str]
+    full_address: str
+    direct_url: str
+    object_type: str
+    cadastral_number: str
+
 
 class LandListing:
     """Модель объявления о продаже земли/недвижимости с ЕАСУЗ"""
+
+    __slots__ = (
+        'id', 'name', 'registry_number', 'start_price', 'deposit_amount', 'start_step_amount',
+        'total_square', 'address_description', 'full_address', 'direct_url', 'object_type',
+        'cadastral_number', 'latitude', 'longitude', 'district_code', 'right_term_use_year',
+        'right_term_use_month', 'purchase_kind_name', 'purchase_form_name', 'stage_state_name',
+        'land_allowed_use_name', 'accept_plan_end_date', 'review_plan_end_date', 'count_views', 'photos',
+    )
     
     def __init__(self,
                  id: int,
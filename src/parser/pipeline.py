@@ -0,0 +1,76 @@
+"""
+Потоковая обработка ленты ЕАСУЗ: источник читается в фоновом потоке
+на depth элементов вперёд через ограниченную очередь (backpressure)
+"""
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def prefetch(source: Iterable[T], depth: int) -> Iterator[T]:
+    """
+    Отдаёт элементы source, заранее вычисляя не больше depth следующих.
+    Если потребитель медленнее, фоновый поток ждёт на заполненной очереди;
+    если потребитель прекратил итерацию, фоновый поток останавливается и закрывает
+    source, если это генератор.
+    depth <= 0 — без фонового потока.
+    """
+    if depth <= 0:
+        yield from source
+        return
+
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(source)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            # Генератор закрывается в своём потоке: его finally (сессии, соединения) выполнится здесь
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    worker = threading.Thread(target=produce, name='feed-prefetch', daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        # Сначала флаг, потом очистка очереди: put, ждущий места, сразу увидит stop
+        stop.set()
+        while True:
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                break
+        worker.join(timeout=5)
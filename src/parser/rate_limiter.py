@@ -0,0 +1,84 @@
+"""
+Ограничение частоты запросов к ЕАСУЗ (token bucket на каждый хост)
+"""
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Потокобезопасный token bucket: rate токенов в секунду, не больше capacity подряд"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate должен быть больше нуля")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float, capacity: Optional[float] = None):
+        """Изменить скорость (и, если задан, запас токенов) на лету"""
+        with self._lock:
+            now = time.monotonic()
+            if capacity is not None:
+                self.capacity = float(capacity)
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = max(float(rate), 1e-3)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Резервирует токены и при необходимости ждёт их появления.
+        Возвращает время ожидания в секундах.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Резервируем сразу: следующий поток встанет в очередь за нами
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class HostRateLimiter:
+    """Набор token bucket'ов по хостам: каждый хост ограничивается отдельно"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 per_host: Optional[Dict[str, float]] = None):
+        self.rate = rate
+        self.burst = burst
+        self.per_host = per_host or {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate = self.per_host.get(host, self.rate)
+                bucket = TokenBucket(rate, self.burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def limit(self, rate: float):
+        """
+        Новый потолок частоты для всех хостов. Текущая скорость и запас токенов
+        только уменьшаются: если потолок вырос, скорость поднимет AdaptiveRate.
+        """
+        with self._lock:
+            self.rate = rate
+            self.burst = max(1.0, rate)
+            buckets = list(self._buckets.values())
+        for bucket in buckets:
+            bucket.set_rate(min(bucket.rate, rate), min(bucket.capacity, self.burst))
+
+    def acquire(self, url: str) -> float:
+        """Дождаться разрешения на запрос к хосту из url"""
+        return self.bucket(urlparse(url).netloc).acquire()
@@ -0,0 +1,62 @@
+"""
+Пересборка таблицы listings из архива сырых ответов (без обращения к сайту)
+
+Используется после изменения _parse_listing или схемы БД: вместо повторного
+обхода ЕАСУЗ все объявления строятся заново из сохранённых ответов API
+и HTML-карточек (см. src/parser/archive.py).
+"""
+import time
+from typing import Dict, Optional, Tuple
+
+from config.settings import settings
+from src.database.bulk import ListingWriter
+from src.parser.archive import iter_records
+from src.parser.extract import parse_lot_details
+from src.parser.html_cache import HtmlDetailCache
+from src.parser.scraper import EasuzParser
+
+
+def load_archived_details(root: str, date_from: Optional[str] = None,
+                          date_to: Optional[str] = None) -> Dict[str, Tuple[str, str, str]]:
+    """HTML-данные лотов из архива: ключ кэша → (direct_url, full_address, cadastral_number)"""
+    details = {}
+    for record in iter_records(root, 'html', date_from, date_to):
+        if record.get('status') != 200:
+            continue
+        key = HtmlDetailCache.make_key(record['lot_id'], record['category_code'], record['district_code'])
+        full_address, cadastral_number = parse_lot_details(record['html'])
+        details[key] = (record['url'], full_address, cadastral_number)
+    return details
+
+
+def replay_archive(root: Optional[str] = None, date_from: Optional[str] = None,
+                   date_to: Optional[str] = None) -> int:
+    """Перестроить listings по архиву; возвращает число записанных объявлений"""
+    root = root or settings.RAW_ARCHIVE_DIR
+    started = time.time()
+    print(f"📦 Воспроизведение архива {root} ({date_from or '…'} — {date_to or '…'})")
+
+    details = load_archived_details(root, date_from, date_to)
+    print(f"  → HTML-карточек в архиве: {len(details)}")
+
+    # Парсер нужен только для разбора объектов: сеть и дисковый кэш не используются
+    parser = EasuzParser(html_cache=HtmlDetailCache(':memory:', ttl=1, negative_ttl=1, max_entries=1))
+    written = 0
+    with ListingWriter() as writer:
+        for record in iter_records(root, 'api', date_from, date_to):
+            listings = []
+            for obj in record.get('response', {}).get('objects', []):
+                key = HtmlDetailCache.make_key(
+                    obj.get('id'), obj.get('categoryCode', 'land'), obj.get('districtCode', '')
+                )
+                try:
+                    if key in details:
+                        listings.append(parser._parse_listing(obj, fetch_html=True, details=details[key]))
+                    else:
+                        listings.append(parser._parse_listing(obj, fetch_html=False))
+                except Exception as e:
+                    print(f"❌ Ошибка парсинга лота {obj.get('id')}: {e}")
+            written += writer.write(listings)
+
+    print(f"✅ Записано {written} объявлений за {time.time() - started:.1f} сек")
+    return written
@@ -0,0 +1,137 @@
+"""
+Устойчивость HTTP-запросов к ЕАСУЗ: повторы с backoff, Retry-After,
+circuit breaker и адаптивная частота запросов
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+from src.parser.rate_limiter import TokenBucket
+
+# Ответы, после которых имеет смысл повторить запрос
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class PortalUnavailableError(Exception):
+    """Портал не ответил даже после всех повторов"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Заголовок Retry-After (секунды или HTTP-дата) → секунды ожидания"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Экспоненциальный backoff с полным джиттером"""
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Пауза перед попыткой attempt+1; Retry-After от сервера имеет приоритет"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    После failure_threshold ошибок подряд «размыкается» и приостанавливает все
+    запросы на cooldown секунд; затем пропускает один пробный запрос.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Блокирует поток, пока портал считается недоступным"""
+        while True:
+            with self._lock:
+                if self.state == 'closed':
+                    return
+                now = time.monotonic()
+                if self.state == 'open' and now - self._opened_at >= self.cooldown:
+                    self.state = 'half_open'
+                    self._probe_in_flight = False
+                if self.state == 'half_open' and not self._probe_in_flight:
+                    self._probe_in_flight = True
+                    return
+                remaining = max(self._opened_at + self.cooldown - now, 0.5)
+            time.sleep(min(remaining, 5.0))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                print("🟢 Портал снова отвечает, продолжаю обход")
+            self.state = 'closed'
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half_open' or (
+                self.state == 'closed' and self._failures >= self.failure_threshold
+            ):
+                if self.state == 'closed':
+                    print(f"🔴 Портал не отвечает ({self._failures} ошибок подряд), "
+                          f"пауза {self.cooldown:.0f} сек")
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class AdaptiveRate:
+    """
+    Управление частотой запросов по задержке ответов (AIMD):
+    рост задержки выше target_latency или ошибка — скорость умножается на 0.7,
+    быстрые ответы — скорость плавно растёт обратно до max_rate.
+    """
+
+    DECREASE_FACTOR = 0.7
+    INCREASE_STEP = 0.05     # доля max_rate на каждый быстрый ответ
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, bucket: TokenBucket, min_rate: float, max_rate: float, target_latency: float):
+        self.bucket = bucket
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.target_latency = target_latency
+        self.latency = None
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, latency: float, ok: bool = True):
+        with self._lock:
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.EWMA_ALPHA * (latency - self.latency)
+
+            rate = self.bucket.rate
+            now = time.monotonic()
+            if not ok or self.latency > self.target_latency:
+                # Не чаще раза в секунду, иначе параллельные ответы обвалят скорость до минимума
+                if now - self._last_decrease >= 1.0:
+                    self._last_decrease = now
+                    self.bucket.set_rate(max(self.min_rate, rate * self.DECREASE_FACTOR))
+            elif rate < self.max_rate:
+                self.bucket.set_rate(min(self.max_rate, rate + self.max_rate * self.INCREASE_STEP))
@@ -1,11 +1,25 @@
 import requests
-import time
 import json
-from typing import List, Dict, Optional, Tuple
-from bs4 import BeautifulSoup
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Dict, NamedTuple, Optional, Tuple
 from datetime import datetime
+from urllib.parse import urlparse
 import re
 
+from config.settings import settings
+from src.parser.archive import RawArchive
+from src.parser.extract import parse_lot_details
+from src.parser.html_cache import HtmlDetailCache
+from src.parser.models import ListingRow
+from src.parser.pipeline import prefetch
+from src.parser.rate_limiter import HostRateLimiter
+from src.parser.telemetry import CrawlTelemetry
+from src.parser.resilience import (
+    RETRY_STATUSES, AdaptiveRate, CircuitBreaker, PortalUnavailableError, RetryPolicy, parse_retry_after,
+)
+
 def parse_datetime(date_str):
     """Конвертирует ISO строку в datetime объект"""
     if not date_str:
@@ -15,28 +29,149 @@ def parse_datetime(date_str):
     except:
         return None
 
+class FeedPage(NamedTuple):
+    """Страница ленты: номер, сырые объекты API и разобранные объявления"""
+    page: int
+    objects: List[Dict]
+    listings: List[ListingRow]
+
+    def unparsed_ids(self) -> List[int]:
+        """Id лотов страницы, которые есть в ленте, но не разобрались (parse_objects их пропускает)"""
+        parsed = {listing.id for listing in self.listings}
+        return [obj['id'] for obj in self.objects if obj['id'] not in parsed]
+
+
 class EasuzParser:
     """Парсер ЕАСУЗ с правильной структурой URL и парсингом HTML"""
 
     BASE_URL = "https://easuz.mosreg.ru"
-    API_URL = f"{BASE_URL}/api/v1-web/Purchase/GetPurchasePage"
+    API_PATH = "/api/v1-web/Purchase/GetPurchasePage"
+    API_URL = f"{BASE_URL}{API_PATH}"
 
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None,
+                 rate_limit: Optional[float] = None,
+                 rate_burst: Optional[float] = None,
+                 html_cache: Optional[HtmlDetailCache] = None,
+                 archive: Optional[RawArchive] = None,
+                 base_url: Optional[str] = None,
+                 telemetry: Optional[CrawlTelemetry] = None):
+        # base_url — адрес портала; для бенчмарков подставляется локальный сервер (scripts/fake_easuz.py)
+        self.base_url = (base_url or settings.EASUZ_BASE_URL).rstrip('/')
+        self.api_url = f"{self.base_url}{self.API_PATH}"
+        self.max_workers = max_workers or settings.PARSER_MAX_WORKERS
         self.session = requests.Session()
         self.session.headers.update({
             'Content-Type': 'application/json',
             'Accept': 'application/json',
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
-        self._html_cache = {}
+        # Пул соединений под число потоков, иначе лишние соединения закрываются
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.rate_limiter = HostRateLimiter(
+            rate_limit or settings.PARSER_RATE_LIMIT,
+            rate_burst or settings.PARSER_RATE_BURST,
+        )
+        self.retry_policy = RetryPolicy(
+            settings.PARSER_MAX_ATTEMPTS, settings.PARSER_BACKOFF_BASE, settings.PARSER_BACKOFF_MAX
+        )
+        self.circuit_breaker = CircuitBreaker(
+            settings.PARSER_BREAKER_THRESHOLD, settings.PARSER_BREAKER_COOLDOWN
+        )
+        self._adaptive = {}
+        self._adaptive_lock = threading.Lock()
+        self.html_cache = html_cache if html_cache is not None else HtmlDetailCache.from_settings()
+        self.archive = archive if archive is not None else RawArchive.from_settings()
+        # Время, объём и статусы по этапам; сохраняются в crawl_metrics (см. telemetry.py)
+        self.telemetry = telemetry if telemetry is not None else CrawlTelemetry()
+        # Последний iter_keyset_pages дошёл до конца ленты, а не до max_pages
+        self.feed_exhausted = False
+
+    def close(self):
+        """Закрыть сегменты архива и соединение кэша"""
+        if self.archive is not None:
+            self.archive.close()
+        self.html_cache.close()
+
+    def set_rate_limit(self, rate: float):
+        """Изменить потолок частоты запросов на ходу (доля общего лимита распределённого обхода)"""
+        self.rate_limiter.limit(rate)
+        with self._adaptive_lock:
+            for adaptive in self._adaptive.values():
+                adaptive.max_rate = rate
+                adaptive.min_rate = min(adaptive.min_rate, rate)
+
+    def _adaptive_rate(self, host: str) -> AdaptiveRate:
+        with self._adaptive_lock:
+            adaptive = self._adaptive.get(host)
+            if adaptive is None:
+                bucket = self.rate_limiter.bucket(host)
+                adaptive = AdaptiveRate(
+                    bucket, min(settings.PARSER_MIN_RATE, bucket.rate), bucket.rate,
+                    settings.PARSER_TARGET_LATENCY,
+                )
+                self._adaptive[host] = adaptive
+            return adaptive
+
+    def _request(self, method: str, url: str, stage: str = 'http', **kwargs) -> Optional[requests.Response]:
+        """
+        HTTP-запрос к порталу с повторами (backoff с джиттером, Retry-After),
+        circuit breaker'ом и адаптивной частотой. None — портал так и не ответил.
+        Ответы 4xx (кроме 408/425/429) считаются окончательными и не повторяются.
+        stage — этап телеметрии (api / html), к которому относятся статусы и объём ответов.
+        """
+        adaptive = self._adaptive_rate(urlparse(url).netloc)
+        telemetry = self.telemetry
+        attempts = self.retry_policy.max_attempts
+        for attempt in range(attempts):
+            waited = time.monotonic()
+            self.circuit_breaker.wait()
+            waited = time.monotonic() - waited
+            if waited > 0.001:
+                telemetry.add('http', 'breaker_wait', waited)
+            telemetry.add('http', 'rate_wait', self.rate_limiter.acquire(url))
+            started = time.monotonic()
+            retry_after = None
+            try:
+                response = self.session.request(method, url, timeout=30, **kwargs)
+            except requests.RequestException as e:
+                reason = f"{type(e).__name__}: {e}"
+                telemetry.add(stage, f"error_{type(e).__name__}")
+            else:
+                telemetry.add(stage, f"status_{response.status_code}")
+                telemetry.add(stage, 'bytes', len(response.content))
+                if response.status_code not in RETRY_STATUSES:
+                    self.circuit_breaker.record_success()
+                    adaptive.observe(time.monotonic() - started)
+                    return response
+                reason = f"HTTP {response.status_code}"
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+            self.circuit_breaker.record_failure()
+            adaptive.observe(time.monotonic() - started, ok=False)
+            if attempt + 1 < attempts:
+                delay = self.retry_policy.delay(attempt, retry_after)
+                telemetry.add('http', 'backoff', delay)
+                print(f"  ⚠️ {reason}, повтор через {delay:.1f} сек ({attempt + 1}/{attempts})")
+                time.sleep(delay)
+
+        print(f"❌ Запрос не удался после {attempts} попыток: {url}")
+        return None
 
     def _make_request(self, payload: Dict) -> Optional[Dict]:
+        with self.telemetry.timer('api'):
+            response = self._request('POST', self.api_url, stage='api', json=payload)
+        if response is None or response.status_code != 200:
+            return None
         try:
-            response = self.session.post(self.API_URL, json=payload, timeout=30)
-            return response.json() if response.status_code == 200 else None
-        except Exception as e:
+            data = response.json()
+        except ValueError as e:
             print(f"❌ API ошибка: {e}")
             return None
+        if self.archive is not None:
+            self.archive.record_api(payload, data)
+        return data
 
     def _fetch_html_details(self, lot_id: int, category_code: str, district_code: str) -> Tuple[str, str, str]:
         """
@@ -44,51 +179,73 @@ class EasuzParser:
         URL: /torgi/{category}/{district_code}/{lot_id}/info
         Возвращает: (direct_url, full_address, cadastral_number)
         """
-        cache_key = f"{lot_id}_{category_code}_{district_code}"
-        if cache_key in self._html_cache:
-            return self._html_cache[cache_key]
+        cache_key = HtmlDetailCache.make_key(lot_id, category_code, district_code)
+        cached = self.html_cache.get(cache_key)
+        if cached is not None:
+            self.telemetry.add('html_cache', 'hit')
+            return cached
+        self.telemetry.add('html_cache', 'miss')
 
         try:
             category = "land" if category_code == "land" else "buildings"
-            view_url = f"{self.BASE_URL}/torgi/{category}/{district_code}/{lot_id}/info"
-            
-            response = self.session.get(view_url, timeout=30, allow_redirects=True)
+            view_url = f"{self.base_url}/torgi/{category}/{district_code}/{lot_id}/info"
+
+            with self.telemetry.timer('html'):
+                response = self._request('GET', view_url, stage='html', allow_redirects=True)
+            if response is None:
+                result = ("", "", "")
+                self.html_cache.set(cache_key, result, negative=True)
+                return result
+            if self.archive is not None:
+                self.archive.record_html(lot_id, category_code, district_code,
+                                         response.url, response.status_code, response.text)
 
             if response.status_code != 200:
                 result = ("", "", "")
-                self._html_cache[cache_key] = result
+                self.html_cache.set(cache_key, result, negative=True)
                 return result
 
-            soup = BeautifulSoup(response.text, 'html.parser')
             direct_url = response.url
-            full_address = ""
-            cadastral_number = ""
-
-            # Парсим список <li class="leftCol-list-li">
-            for li in soup.find_all('li', class_='leftCol-list-li'):
-                gray_span = li.find('span', class_='grayColor')
-                black_span = li.find('span', class_='blackColor')
-                
-                if gray_span and black_span:
-                    label = gray_span.get_text(strip=True)
-                    value = black_span.get_text(strip=True)
-                    
-                    if 'Адрес' in label:
-                        full_address = value
-                    elif 'Кадастровый номер' in label:
-                        cadastral_number = value
+            # Разбираем только список <li class="leftCol-list-li">, без дерева всей страницы
+            with self.telemetry.timer('html_parse'):
+                full_address, cadastral_number = parse_lot_details(response.text)
 
             result = (direct_url, full_address, cadastral_number)
-            self._html_cache[cache_key] = result
+            self.html_cache.set(cache_key, result)
             return result
 
         except Exception as e:
             print(f"  ❌ Ошибка HTML: {e}")
+            self.telemetry.add('html', f"error_{type(e).__name__}")
             result = ("", "", "")
-            self._html_cache[cache_key] = result
+            self.html_cache.set(cache_key, result, negative=True)
             return result
 
-    def _parse_listing(self, obj: Dict, fetch_html: bool = True) -> 'LandListing':
+    def enrich_details(self, objects: Iterable[Dict]) -> Iterator[Tuple[Dict, Tuple[str, str, str]]]:
+        """
+        Параллельно загружает HTML-карточки лотов.
+        Отдаёт пары (obj, (direct_url, full_address, cadastral_number)) по мере готовности;
+        частота запросов ограничивается rate_limiter'ом, а не паузами.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {}
+            for obj in objects:
+                lot_id = obj.get('id')
+                district_code = obj.get('districtCode', '')
+                if not (lot_id and district_code):
+                    # Без района карточку не построить — отдаём сразу
+                    yield obj, ("", "", "")
+                    continue
+                future = pool.submit(
+                    self._fetch_html_details, lot_id, obj.get('categoryCode', 'land'), district_code
+                )
+                futures[future] = obj
+
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def _parse_listing(self, obj: Dict, fetch_html: bool = True,
+                       details: Optional[Tuple[str, str, str]] = None) -> ListingRow:
         obj_purchase = obj.get('objectPurchases', [{}])[0]
         obj_char = obj_purchase.get('objectCharacteristics', [{}])[0]
         photos = [photo['url'] for photo in obj.get('photos', [])]
@@ -125,27 +282,26 @@ class EasuzParser:
             lot_id = obj.get('id')
             category_code = obj.get('categoryCode', 'land')
             district_code = obj.get('districtCode', '')
-            
-            if lot_id and district_code:
-                direct_url, full_address, cadastral = self._fetch_html_details(
-                    lot_id, category_code, district_code
-                )
+
+            if details is None and lot_id and district_code:
+                details = self._fetch_html_details(lot_id, category_code, district_code)
+            if details is not None and lot_id and district_code:
+                direct_url, full_address, cadastral = details
                 listing_data['direct_url'] = direct_url
                 listing_data['full_address'] = full_address or obj.get('addressDescription', '')
                 listing_data['object_type'] = category_code
                 listing_data['cadastral_number'] = cadastral
-            time.sleep(0.5)
         else:
             category = "land" if obj.get('categoryCode') == "land" else "buildings"
             district = obj.get('districtCode', '')
-            listing_data['direct_url'] = f"{self.BASE_URL}/torgi/{category}/{district}/{obj['id']}/info"
+            listing_data['direct_url'] = f"{self.base_url}/torgi/{category}/{district}/{obj['id']}/info"
             listing_data['full_address'] = obj.get('addressDescription', '')
             listing_data['object_type'] = obj.get('categoryCode', '')
 
-        from src.database.models import Listing
-        return Listing(**listing_data)
+        return ListingRow(**listing_data)
 
-    def get_page(self, page: int = 1, per_page: int = 10, fetch_html: bool = False) -> Tuple[List['LandListing'], Dict]:
+    def fetch_page(self, page: int = 1, per_page: int = 10) -> Tuple[List[Dict], Dict]:
+        """Сырые объекты одной страницы API (по убыванию Id) и пагинация"""
         payload = {
             "filter": {"purchaseStageState": [1000004]},
             "page": page,
@@ -154,21 +310,126 @@ class EasuzParser:
             "orderByDescending": True
         }
         data = self._make_request(payload)
-        if not data:
-            return [], {}
+        if data is None:
+            # Ошибка — это не конец ленты: пусть обход упадёт и продолжится с --resume
+            raise PortalUnavailableError(f"Не удалось загрузить страницу {page}")
+        return data.get('objects', []), data.get('pagination', {})
+
+    def iter_keyset_pages(self, per_page: int = 10, max_pages: Optional[int] = None,
+                          start_page: int = 1, cursor: Optional[int] = None) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Один проход по ленте с курсором по последнему увиденному Id.
+        Отдаёт пары (номер страницы, новые объекты страницы).
+
+        API не умеет фильтровать по Id, поэтому страницы запрашиваются по page/take,
+        а курсор отбрасывает всё, что не меньше последнего Id (лента идёт по убыванию Id):
+        - новые лоты в начале ленты сдвигают страницы вперёд → повторы отсекаются курсором;
+        - снятые лоты сдвигают страницы назад → countTotal уменьшается, и перед текущей
+          страницей перечитываются предыдущие, чтобы не пропустить лоты на стыке.
+
+        start_page/cursor — продолжение прерванного обхода с последней сохранённой страницы.
+        start_page лишь подсказка: если лента сдвинулась, обход отступает назад,
+        пока страница не начнётся с Id >= cursor, и тогда ничего не будет пропущено.
+
+        feed_exhausted становится True, когда лента действительно кончилась: пустая
+        или неполная страница либо страница, на которой набран countTotal.
+        Если обход остановил max_pages, флаг остаётся False.
+        """
+        self.feed_exhausted = False
+        last_total = None
+        page = max(1, start_page)
+        aligning = cursor is not None
+        while max_pages is None or page <= max_pages:
+            objects, pagination = self.fetch_page(page, per_page)
+            if aligning:
+                if page > 1 and (not objects or objects[0]['id'] < cursor):
+                    page -= 1
+                    continue
+                aligning = False
+            if not objects:
+                self.feed_exhausted = True
+                return
+
+            page_size = len(objects)
+            total = pagination.get('countTotal')
+            if last_total is not None and total is not None and total < last_total:
+                removed = last_total - total
+                overlap = -(-removed // per_page)
+                print(f"  ↩️ Лента сократилась на {removed}, перечитываю {overlap} стр.")
+                for prev_page in range(max(1, page - overlap), page):
+                    prev_objects, _ = self.fetch_page(prev_page, per_page)
+                    objects = prev_objects + objects
+            if total is not None:
+                last_total = total
+
+            fresh = [obj for obj in objects if cursor is None or obj['id'] < cursor]
+            fresh.sort(key=lambda obj: obj['id'], reverse=True)
+            last_page = page_size < per_page or (total is not None and page * per_page >= total)
+            if last_page:
+                self.feed_exhausted = True
+            if fresh:
+                cursor = fresh[-1]['id']
+                yield page, fresh
+            if last_page:
+                return
+            page += 1
+
+    def iter_pages(self, per_page: int = 10, max_pages: Optional[int] = None,
+                   fetch_html: bool = False, start_page: int = 1, cursor: Optional[int] = None,
+                   stop_at_id: Optional[int] = None, prefetch_pages: Optional[int] = None) -> Iterator[FeedPage]:
+        """
+        Ленивый обход ленты по страницам (курсор по Id, см. iter_keyset_pages).
+
+        Следующие prefetch_pages страниц загружаются и разбираются в фоне, пока
+        вызывающий код обрабатывает текущую; если он не успевает, фоновая загрузка
+        ждёт — в памяти не больше prefetch_pages + 1 страниц при любом размере ленты.
+
+        stop_at_id — граница инкрементальной синхронизации: лоты с Id <= stop_at_id
+        не разбираются, и обход заканчивается на странице, где они встретились.
+        """
+        def produce():
+            for page, objects in self.iter_keyset_pages(per_page, max_pages, start_page, cursor):
+                selected = objects
+                if stop_at_id is not None:
+                    selected = [obj for obj in objects if obj['id'] > stop_at_id]
+                with self.telemetry.timer('parse_page'):
+                    listings = self.parse_objects(selected, fetch_html)
+                yield FeedPage(page, objects, listings)
+                if len(selected) < len(objects):
+                    return
+
+        depth = settings.PARSER_PREFETCH_PAGES if prefetch_pages is None else prefetch_pages
+        yield from prefetch(produce(), depth)
+
+    def iter_listings(self, per_page: int = 10, max_pages: Optional[int] = None,
+                      fetch_html: bool = False, **kwargs) -> Iterator[ListingRow]:
+        """Ленивый поток объявлений по всей ленте (см. iter_pages)"""
+        for feed_page in self.iter_pages(per_page, max_pages, fetch_html, **kwargs):
+            yield from feed_page.listings
+
+    def get_page(self, page: int = 1, per_page: int = 10, fetch_html: bool = False) -> Tuple[List[ListingRow], Dict]:
+        objects, pagination = self.fetch_page(page, per_page)
+        return self.parse_objects(objects, fetch_html), pagination
+
+    def parse_objects(self, objects: List[Dict], fetch_html: bool = False) -> List[ListingRow]:
+        """Парсит объекты API в порядке выдачи; HTML-карточки грузятся параллельно"""
+        details = {}
+        if fetch_html:
+            for obj, result in self.enrich_details(objects):
+                details[id(obj)] = result
 
         listings = []
-        for obj in data.get('objects', []):
+        for obj in objects:
             try:
-                listings.append(self._parse_listing(obj, fetch_html))
+                listings.append(self._parse_listing(obj, fetch_html, details.get(id(obj))))
             except Exception as e:
                 print(f"❌ Ошибка парсинга лота {obj.get('id')}: {e}")
-        return listings, data.get('pagination', {})
+        return listings
 
     def search(self, query: Optional[str] = None,
                price_from: Optional[float] = None,
                price_to: Optional[float] = None,
-               fetch_html: bool = False) -> List['LandListing']:
+               fetch_html: bool = False) -> List[ListingRow]:
         payload = {
             "filter": {"purchaseStageState": [1000004]},
             "page": 1,
@@ -182,14 +443,10 @@ class EasuzParser:
             return []
 
         listings = []
-        for obj in data.get('objects', []):
-            try:
-                listing = self._parse_listing(obj, fetch_html)
-                if price_from and listing.start_price < price_from:
-                    continue
-                if price_to and listing.start_price > price_to:
-                    continue
-                listings.append(listing)
-            except Exception as e:
-                print(f"❌ Ошибка поиска: {e}")
+        for listing in self.parse_objects(data.get('objects', []), fetch_html):
+            if price_from and listing.start_price < price_from:
+                continue
+            if price_to and listing.start_price > price_to:
+                continue
+            listings.append(listing)
         return listings
\ No newline at end of file
@@ -0,0 +1,433 @@
+"""
+Распределённый обход ЕАСУЗ несколькими процессами (на одном или нескольких хостах с общим /data)
+
+Лента делится на шарды — диапазоны страниц. Шарды раздаются через таблицу
+аренды crawl_shards: воркер захватывает шард, продлевает аренду heartbeat'ом
+и отмечает шард выполненным. Если воркер умер, аренда истекает и шард
+достаётся другому. Последний воркер, не нашедший работы, завершает запуск
+и снимает с публикации исчезнувшие лоты (как полный обход full_reparse).
+
+Запуски не должны пересекаться по времени с другими обходами: plan отказывается,
+пока идёт другой обход, а finalize не снимает лоты, если параллельно шёл другой
+запуск (его поколение перемешано с нашим, см. checkpoint.concurrent_runs).
+
+Соседние шарды перекрываются на одну страницу, а последний читается до конца
+ленты — лоты, сдвинувшиеся на стыке за время обхода, не теряются
+(повторы безвредны: запись идёт через UPSERT).
+
+ИСПОЛЬЗОВАНИЕ:
+    python -m src.parser.sharding plan [--shard-pages 20]   # разбить ленту на шарды
+    python -m src.parser.sharding work [--processes 4]      # воркеры (на любом числе хостов)
+
+Общий лимит CRAWL_RATE_BUDGET делится на max(запланировано воркеров, активных воркеров):
+запланировано — max(--processes, CRAWL_WORKERS), при нескольких хостах CRAWL_WORKERS
+задаёт их общее число. Доля пересчитывается на каждом продлении аренды.
+    python -m src.parser.sharding status                    # прогресс запуска
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+
+from config.settings import settings
+from src.database.bulk import ListingWriter, deactivate_stale_listings
+from src.database.models import Base, CrawlMetric, CrawlRun, CrawlShard
+from src.database.session import engine
+from src.parser.checkpoint import FOREIGN_RUN_MAX_IDLE, CrawlRunTracker, concurrent_runs
+from src.parser.scraper import EasuzParser
+
+MODE = 'sharded'
+PER_PAGE = 10
+
+
+class LeaseLostError(Exception):
+    """Аренда шарда истекла или перехвачена другим воркером"""
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseHeartbeat(threading.Thread):
+    """
+    Фоновое продление аренды шарда; lost=True, если продлить не удалось.
+    on_renew вызывается после каждого продления (пересчёт доли лимита запросов).
+    """
+
+    def __init__(self, shard_id: int, owner: str, lease: timedelta,
+                 on_renew: Optional[Callable[[], None]] = None):
+        super().__init__(name=f"lease-{shard_id}", daemon=True)
+        self.shard_id = shard_id
+        self.owner = owner
+        self.lease = lease
+        self.on_renew = on_renew
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        table = CrawlShard.__table__
+        while not self._stop_event.wait(self.lease.total_seconds() / 3):
+            now = datetime.utcnow()
+            try:
+                with engine.begin() as conn:
+                    renewed = conn.execute(
+                        update(table)
+                        .where(table.c.id == self.shard_id, table.c.owner == self.owner,
+                               table.c.status == 'leased')
+                        .values(lease_expires_at=now + self.lease, heartbeat_at=now)
+                    ).rowcount
+            except Exception as e:
+                # БД занята — попробуем на следующем тике, аренда ещё не истекла
+                print(f"⚠️ Не удалось продлить аренду шарда {self.shard_id}: {e}")
+                continue
+            if not renewed:
+                self.lost = True
+                return
+            if self.on_renew is not None:
+                try:
+                    self.on_renew()
+                except Exception as e:
+                    print(f"⚠️ Не удалось пересчитать лимит запросов шарда {self.shard_id}: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class ShardCoordinator:
+    """Планирование шардов, аренда и завершение одного распределённого запуска"""
+
+    def __init__(self, run_id: int, lease_seconds: Optional[int] = None,
+                 max_attempts: Optional[int] = None):
+        self.run_id = run_id
+        self.lease = timedelta(seconds=lease_seconds or settings.CRAWL_LEASE_SECONDS)
+        self.max_attempts = max_attempts or settings.CRAWL_SHARD_MAX_ATTEMPTS
+
+    @staticmethod
+    def ensure_tables():
+        Base.metadata.create_all(
+            engine, tables=[CrawlRun.__table__, CrawlShard.__table__, CrawlMetric.__table__]
+        )
+
+    @classmethod
+    def plan(cls, parser: EasuzParser, shard_pages: Optional[int] = None) -> Optional['ShardCoordinator']:
+        """
+        Создать запуск и разбить текущую ленту на шарды по shard_pages страниц.
+        None — если уже идёт другой обход (распределённый или full_reparse / бот).
+        """
+        cls.ensure_tables()
+        unfinished = cls.latest()
+        if unfinished is not None:
+            print(f"⚠️ Распределённый запуск #{unfinished.run_id} не завершён — допишите его: work")
+            return None
+        active = CrawlRunTracker.find_active(FOREIGN_RUN_MAX_IDLE)
+        if active is not None:
+            print(f"⚠️ Идёт обход #{active} — дождитесь его завершения")
+            return None
+        shard_pages = shard_pages or settings.CRAWL_SHARD_PAGES
+        _, pagination = parser.fetch_page(1, PER_PAGE)
+        page_count = max(1, pagination.get('pageCount') or 1)
+
+        shards = []
+        for shard_no, page_from in enumerate(range(1, page_count + 1, shard_pages)):
+            last = page_from + shard_pages - 1 >= page_count
+            shards.append({
+                'shard_no': shard_no,
+                'page_from': page_from,
+                # +1 страница перекрытия; последний шард — до конца ленты
+                'page_to': None if last else page_from + shard_pages,
+                'status': 'pending',
+            })
+
+        with engine.begin() as conn:
+            run_id = conn.execute(
+                CrawlRun.__table__.insert().values(
+                    mode=MODE, status='running', high_water_mark=0,
+                    started_at=datetime.utcnow(), updated_at=datetime.utcnow(),
+                )
+            ).inserted_primary_key[0]
+            conn.execute(CrawlShard.__table__.insert(), [dict(shard, run_id=run_id) for shard in shards])
+
+        print(f"🗂️ Запуск #{run_id}: {page_count} стр. ({pagination.get('countTotal')} лотов) "
+              f"→ {len(shards)} шардов по {shard_pages} стр.")
+        return cls(run_id)
+
+    @classmethod
+    def latest(cls) -> Optional['ShardCoordinator']:
+        """Последний незавершённый распределённый запуск"""
+        cls.ensure_tables()
+        with engine.connect() as conn:
+            run_id = conn.execute(
+                select(CrawlRun.id)
+                .where(CrawlRun.mode == MODE, CrawlRun.status == 'running')
+                .order_by(CrawlRun.id.desc())
+                .limit(1)
+            ).scalar()
+        return cls(run_id) if run_id else None
+
+    def _claimable(self, now: datetime):
+        table = CrawlShard.__table__
+        return and_(
+            table.c.run_id == self.run_id,
+            or_(
+                table.c.status == 'pending',
+                and_(table.c.status == 'leased', table.c.lease_expires_at < now),
+            ),
+        )
+
+    def claim(self, owner: str) -> Optional[Dict]:
+        """
+        Захватить свободный шард или шард с истёкшей арендой.
+        Захват — условный UPDATE (compare-and-set): из двух воркеров,
+        выбравших один шард, его получит только один.
+        """
+        table = CrawlShard.__table__
+        while True:
+            now = datetime.utcnow()
+            with engine.connect() as conn:
+                candidates = conn.execute(
+                    select(table).where(self._claimable(now)).order_by(table.c.shard_no).limit(8)
+                ).mappings().all()
+            if not candidates:
+                return None
+
+            for shard in candidates:
+                exhausted = (shard['attempts'] or 0) >= self.max_attempts
+                with engine.begin() as conn:
+                    if exhausted:
+                        # Шард раз за разом «убивает» воркеры — дальше не раздаём
+                        conn.execute(
+                            update(table)
+                            .where(table.c.id == shard['id'], self._claimable(now))
+                            .values(status='failed', owner=None,
+                                    error=shard['error'] or 'аренда истекла слишком много раз')
+                        )
+                        continue
+                    claimed = conn.execute(
+                        update(table)
+                        .where(table.c.id == shard['id'], self._claimable(now))
+                        .values(status='leased', owner=owner, lease_expires_at=now + self.lease,
+                                heartbeat_at=now, attempts=table.c.attempts + 1)
+                    ).rowcount
+                if claimed:
+                    return dict(shard, owner=owner, attempts=(shard['attempts'] or 0) + 1)
+
+    def active_workers(self) -> int:
+        """Число воркеров с действующей арендой (для деления общего лимита запросов)"""
+        table = CrawlShard.__table__
+        with engine.connect() as conn:
+            return conn.execute(
+                select(func.count(func.distinct(table.c.owner))).where(
+                    table.c.run_id == self.run_id,
+                    table.c.status == 'leased',
+                    table.c.lease_expires_at >= datetime.utcnow(),
+                )
+            ).scalar() or 0
+
+    def rate_share(self, workers: int = 1) -> float:
+        """
+        Доля CRAWL_RATE_BUDGET одного воркера. Делим на запланированное число воркеров,
+        а не только на уже активных: стартующие одновременно воркеры видят 1, 2, 3…
+        активных, и первые из них забрали бы почти весь лимит.
+        """
+        return settings.CRAWL_RATE_BUDGET / max(1, workers, self.active_workers())
+
+    def complete(self, shard: Dict, lots: int):
+        table = CrawlShard.__table__
+        with engine.begin() as conn:
+            done = conn.execute(
+                update(table)
+                .where(table.c.id == shard['id'], table.c.owner == shard['owner'],
+                       table.c.status == 'leased')
+                .values(status='done', lots=lots, error=None, finished_at=datetime.utcnow())
+            ).rowcount
+            # Отметка активности запуска: по ней другие обходы видят, что он идёт
+            conn.execute(
+                update(CrawlRun.__table__).where(CrawlRun.id == self.run_id)
+                .values(updated_at=datetime.utcnow())
+            )
+        if not done:
+            raise LeaseLostError(f"шард {shard['shard_no']} перехвачен другим воркером")
+
+    def release(self, shard: Dict, error: str):
+        """Вернуть шард в очередь после ошибки (или снять, если попытки исчерпаны)"""
+        table = CrawlShard.__table__
+        status = 'failed' if shard['attempts'] >= self.max_attempts else 'pending'
+        with engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.id == shard['id'], table.c.owner == shard['owner'])
+                .values(status=status, owner=None, lease_expires_at=None, error=error[:1000])
+            )
+
+    def counts(self) -> Dict[str, int]:
+        table = CrawlShard.__table__
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(table.c.status, func.count(), func.coalesce(func.sum(table.c.lots), 0))
+                .where(table.c.run_id == self.run_id)
+                .group_by(table.c.status)
+            ).all()
+        counts = {status: count for status, count, _ in rows}
+        counts['lots'] = sum(lots for _, _, lots in rows)
+        return counts
+
+    def finalize(self) -> Optional[str]:
+        """
+        Завершить запуск, если все шарды обработаны. Статус меняется условным
+        UPDATE, поэтому снятие исчезнувших лотов выполнит ровно один воркер.
+        """
+        counts = self.counts()
+        if counts.get('pending') or counts.get('leased'):
+            return None
+        status = 'failed' if counts.get('failed') else 'completed'
+        run = CrawlRun.__table__
+        with engine.begin() as conn:
+            finished = conn.execute(
+                update(run)
+                .where(run.c.id == self.run_id, run.c.status == 'running')
+                .values(status=status, lots_processed=counts['lots'],
+                        pages_processed=counts.get('done', 0),
+                        error=f"шардов с ошибкой: {counts['failed']}" if status == 'failed' else None,
+                        finished_at=datetime.utcnow(), updated_at=datetime.utcnow())
+            ).rowcount
+        if not finished:
+            return None
+        print(f"🏁 Запуск #{self.run_id}: {status}, лотов {counts['lots']}")
+        others = concurrent_runs(self.run_id)
+        if others:
+            print(f"ℹ️ Одновременно шли запуски {others} — снятие исчезнувших лотов пропущено")
+        elif status == 'completed' and counts['lots']:
+            deactivated = deactivate_stale_listings(self.run_id)
+            print(f"🧹 Снято с публикации исчезнувших лотов: {deactivated}")
+        return status
+
+
+def crawl_shard(coordinator: ShardCoordinator, shard: Dict, parser: EasuzParser, workers: int = 1) -> int:
+    """
+    Загрузить страницы шарда, продлевая аренду; возвращает число записанных лотов.
+    При каждом продлении доля лимита запросов пересчитывается по числу воркеров.
+    """
+    heartbeat = LeaseHeartbeat(
+        shard['id'], shard['owner'], coordinator.lease,
+        on_renew=lambda: parser.set_rate_limit(coordinator.rate_share(workers)),
+    )
+    heartbeat.start()
+    writer = ListingWriter(
+        generation=coordinator.run_id, telemetry=parser.telemetry,
+        before_commit=lambda conn: parser.telemetry.flush(conn, coordinator.run_id),
+    )
+    try:
+        pages = parser.iter_pages(
+            per_page=PER_PAGE, max_pages=shard['page_to'], fetch_html=True, start_page=shard['page_from'],
+        )
+        for feed_page in pages:
+            if heartbeat.lost:
+                raise LeaseLostError(f"аренда шарда {shard['shard_no']} потеряна")
+            writer.write(feed_page.listings)
+            writer.keep(feed_page.unparsed_ids())
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        heartbeat.stop()
+    if heartbeat.lost:
+        raise LeaseLostError(f"аренда шарда {shard['shard_no']} потеряна")
+    return writer.written
+
+
+def work(run_id: Optional[int] = None, processes: int = 1) -> int:
+    """
+    Цикл воркера: захватывать шарды, пока они есть; возвращает число обработанных шардов.
+    processes — сколько воркеров запущено на этом хосте (work --processes).
+    """
+    coordinator = ShardCoordinator(run_id) if run_id else ShardCoordinator.latest()
+    if coordinator is None:
+        print("ℹ️ Нет незавершённых распределённых запусков — сначала выполните plan")
+        return 0
+
+    owner = worker_id()
+    workers = max(processes, settings.CRAWL_WORKERS)
+    processed = 0
+    while True:
+        shard = coordinator.claim(owner)
+        if shard is None:
+            coordinator.finalize()
+            break
+
+        # Общий лимит запросов к порталу делится между воркерами
+        rate = coordinator.rate_share(workers)
+        parser = EasuzParser(rate_limit=rate, rate_burst=max(1.0, rate))
+        print(f"🧩 [{owner}] шард #{shard['shard_no']}: стр. {shard['page_from']}…"
+              f"{shard['page_to'] or 'конец'}, {rate:.1f} запр/с")
+        started = time.time()
+        try:
+            lots = crawl_shard(coordinator, shard, parser, workers)
+            coordinator.complete(shard, lots)
+            processed += 1
+            print(f"  ✅ [{owner}] шард #{shard['shard_no']}: {lots} лотов за {time.time() - started:.0f} сек")
+        except LeaseLostError as e:
+            print(f"  ⚠️ [{owner}] {e}")
+        except KeyboardInterrupt:
+            coordinator.release(shard, 'воркер остановлен')
+            raise
+        except Exception as e:
+            print(f"  ❌ [{owner}] шард #{shard['shard_no']}: {e}")
+            coordinator.release(shard, str(e))
+        finally:
+            parser.close()
+    return processed
+
+
+def print_status(run_id: Optional[int] = None):
+    coordinator = ShardCoordinator(run_id) if run_id else ShardCoordinator.latest()
+    if coordinator is None:
+        print("ℹ️ Нет незавершённых распределённых запусков")
+        return
+    counts = coordinator.counts()
+    total = sum(v for k, v in counts.items() if k != 'lots')
+    print(f"📊 Запуск #{coordinator.run_id}: шардов {total}, готово {counts.get('done', 0)}, "
+          f"в работе {counts.get('leased', 0)}, в очереди {counts.get('pending', 0)}, "
+          f"с ошибкой {counts.get('failed', 0)}; лотов {counts['lots']}, "
+          f"воркеров {coordinator.active_workers()}")
+
+
+def parse_args(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Распределённый обход ЕАСУЗ")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+    plan_cmd = commands.add_parser("plan", help="разбить ленту на шарды и создать запуск")
+    plan_cmd.add_argument("--shard-pages", type=int, help="страниц в шарде")
+    work_cmd = commands.add_parser("work", help="обрабатывать шарды, пока они есть")
+    work_cmd.add_argument("--run-id", type=int)
+    work_cmd.add_argument("--processes", type=int, default=1, help="число воркеров на этом хосте")
+    status_cmd = commands.add_parser("status", help="прогресс запуска")
+    status_cmd.add_argument("--run-id", type=int)
+    return arg_parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "plan":
+        planner = EasuzParser()
+        try:
+            ShardCoordinator.plan(planner, args.shard_pages)
+        finally:
+            planner.close()
+    elif args.command == "work":
+        if args.processes > 1:
+            workers = [multiprocessing.Process(target=work, args=(args.run_id, args.processes))
+                       for _ in range(args.processes)]
+            for process in workers:
+                process.start()
+            for process in workers:
+                process.join()
+        else:
+            work(args.run_id)
+    else:
+        print_status(args.run_id)
@@ -0,0 +1,157 @@
+"""
+Телеметрия обхода ЕАСУЗ по этапам (таблица crawl_metrics)
+
+Каждая метрика — (этап, имя) → число событий, сумма и максимум:
+    api.time / html.time / html_parse.time / db_write.time / db_commit.time — секунды
+    api.bytes / html.bytes                                                  — байты ответов
+    api.status_200, html.status_503, html.error_ConnectTimeout             — статусы и ошибки
+    http.rate_wait / http.backoff / http.breaker_wait                       — ожидание, секунды
+    html_cache.hit / html_cache.miss                                        — попадания в кэш
+
+Метрики копятся в памяти и дописываются в БД приращениями (вместе с
+контрольной точкой обхода), поэтому несколько процессов одного запуска
+суммируются в одни и те же строки.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src.database.models import Base, CrawlMetric, CrawlRun
+
+TIME_METRICS = {'time', 'rate_wait', 'backoff', 'breaker_wait'}
+
+
+class CrawlTelemetry:
+    """Потокобезопасный сборщик метрик одного процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[Tuple[str, str], List[float]] = {}
+
+    def add(self, stage: str, name: str, value: float = 0.0, count: int = 1):
+        with self._lock:
+            metric = self._metrics.get((stage, name))
+            if metric is None:
+                self._metrics[(stage, name)] = [count, value, value]
+            else:
+                metric[0] += count
+                metric[1] += value
+                if value > metric[2]:
+                    metric[2] = value
+
+    @contextmanager
+    def timer(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, 'time', time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[Tuple[str, str], Tuple[int, float, float]]:
+        with self._lock:
+            return {key: tuple(value) for key, value in self._metrics.items()}
+
+    def flush(self, conn, run_id: int):
+        """Дописать накопленное с прошлого flush в crawl_metrics (на переданном соединении)"""
+        with self._lock:
+            metrics, self._metrics = self._metrics, {}
+        if not metrics:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {'run_id': run_id, 'stage': stage, 'name': name, 'count': int(count),
+             'total': total, 'max_value': max_value, 'updated_at': now}
+            for (stage, name), (count, total, max_value) in metrics.items()
+        ]
+        table = CrawlMetric.__table__
+        stmt = sqlite_insert(table).values(rows)
+        excluded = stmt.excluded
+        conn.execute(stmt.on_conflict_do_update(
+            index_elements=['run_id', 'stage', 'name'],
+            set_={
+                'count': table.c.count + excluded.count,
+                'total': table.c.total + excluded.total,
+                'max_value': func.max(table.c.max_value, excluded.max_value),
+                'updated_at': excluded.updated_at,
+            },
+        ))
+
+    def save(self, run_id: int, engine=None):
+        """flush в отдельной транзакции (в конце запуска)"""
+        if engine is None:
+            from src.database.session import engine
+        ensure_tables(engine)
+        with engine.begin() as conn:
+            self.flush(conn, run_id)
+
+
+def ensure_tables(engine=None):
+    if engine is None:
+        from src.database.session import engine
+    Base.metadata.create_all(engine, tables=[CrawlRun.__table__, CrawlMetric.__table__])
+
+
+def load_metrics(run_id: Optional[int] = None, engine=None) -> Tuple[Optional[Dict], List[Dict]]:
+    """Запуск (по умолчанию последний с метриками) и его метрики"""
+    if engine is None:
+        from src.database.session import engine
+    ensure_tables(engine)
+    with engine.connect() as conn:
+        if run_id is None:
+            run_id = conn.execute(select(func.max(CrawlMetric.run_id))).scalar()
+        if run_id is None:
+            return None, []
+        run = conn.execute(select(CrawlRun.__table__).where(CrawlRun.id == run_id)).mappings().first()
+        metrics = conn.execute(
+            select(CrawlMetric.__table__)
+            .where(CrawlMetric.run_id == run_id)
+            .order_by(CrawlMetric.stage, CrawlMetric.name)
+        ).mappings().all()
+    return (dict(run) if run else {'id': run_id}), [dict(metric) for metric in metrics]
+
+
+def format_summary(run: Optional[Dict], metrics: List[Dict]) -> str:
+    """Сводка по этапам: время, объём, статусы и ошибки"""
+    if run is None:
+        return "📭 Метрик обхода ещё нет"
+
+    lines = [f"📊 Запуск #{run['id']} ({run.get('mode', '?')}, {run.get('status', '?')}), "
+             f"лотов {run.get('lots_processed') or 0}"]
+    timings = [m for m in metrics if m['name'] in TIME_METRICS]
+    if timings:
+        lines.append("")
+        lines.append(f"{'этап':<24}{'раз':>8}{'всего, с':>11}{'сред, мс':>10}{'макс, мс':>10}")
+        for m in sorted(timings, key=lambda m: -m['total']):
+            label = m['stage'] if m['name'] == 'time' else f"{m['stage']}.{m['name']}"
+            avg = m['total'] / m['count'] * 1000 if m['count'] else 0
+            lines.append(f"{label:<24}{m['count']:>8}{m['total']:>11.1f}{avg:>10.1f}{m['max_value'] * 1000:>10.0f}")
+
+    volumes = [m for m in metrics if m['name'] == 'bytes']
+    if volumes:
+        lines.append("")
+        for m in volumes:
+            avg = m['total'] / m['count'] / 1024 if m['count'] else 0
+            lines.append(f"📦 {m['stage']}: {m['total'] / 1024 / 1024:.1f} МБ, {avg:.0f} КБ на ответ")
+
+    statuses = [m for m in metrics if m['name'].startswith('status_')]
+    if statuses:
+        lines.append("")
+        lines.append("🌐 Статусы: " + ", ".join(
+            f"{m['stage']} {m['name'][7:]}×{m['count']}" for m in statuses))
+
+    errors = [m for m in metrics if m['name'].startswith('error_')]
+    if errors:
+        lines.append("❌ Ошибки: " + ", ".join(
+            f"{m['stage']} {m['name'][6:]}×{m['count']}" for m in errors))
+
+    cache = {m['name']: m['count'] for m in metrics if m['stage'] == 'html_cache'}
+    if cache:
+        hits, misses = cache.get('hit', 0), cache.get('miss', 0)
+        lines.append(f"🗄️ Кэш HTML: {hits} попаданий, {misses} промахов "
+                     f"({hits / max(hits + misses, 1):.0%})")
+    return "\n".join(lines)
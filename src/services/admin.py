@@ -2,13 +2,16 @@
 
 import os
 from datetime import datetime, timedelta
+from typing import Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import func, text
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment
 from io import BytesIO
 
+from src.database.counters import USERS, read_counters, read_total
 from src.database.models import Listing, TelegramUser
+from src.database.normalize import DEAL_RENT, DEAL_SALE
 
 
 class AdminService:
@@ -16,24 +19,28 @@ class AdminService:
         self.db = db
 
     def get_usage_stats(self) -> dict:
-        """Возвращает статистику использования за последние 7 дней."""
+        """
+        Возвращает статистику использования за последние 7 дней.
+        Итоги по пользователям и лотам — из счётчиков stats_counters (src/database/counters.py),
+        по индексу считается только активность за неделю.
+        """
         week_ago = datetime.utcnow() - timedelta(days=7)
+        conn = self.db.connection()
 
-        total_users = self.db.query(TelegramUser).count()
+        total_users = read_total(conn, USERS)
         active_users = self.db.query(TelegramUser).filter(
             TelegramUser.last_active_at >= week_ago
         ).count()
 
-        total_listings = self.db.query(Listing).count()
-        active_listings = self.db.query(Listing).filter(
-            Listing.is_active == True
-        ).count()
+        deals = read_counters(conn, 'deal')
 
         return {
             "total_users": total_users,
             "active_users_7d": active_users,
-            "total_listings": total_listings,
-            "active_listings": active_listings,
+            "total_listings": read_total(conn, 'listings', is_active=None),
+            "active_listings": read_total(conn, 'listings'),
+            "sale_listings": deals.get(str(DEAL_SALE), 0),
+            "rent_listings": deals.get(str(DEAL_RENT), 0),
         }
 
     def get_popular_queries(self, limit: int = 5) -> list:
@@ -103,11 +110,24 @@ class AdminService:
         output.seek(0)
         return output
 
-    def trigger_db_update(self) -> str:
+    def trigger_db_update(self, mode: str = "incremental") -> str:
         """
-        ЗАГЛУШКА: запускает обновление данных.
-        В реальности — вызывает парсер.
+        Запускает синхронизацию с ЕАСУЗ в фоновом потоке (incremental / full).
+        Если синхронизация уже идёт — возвращает её прогресс.
         """
-        # Здесь будет: from src.parser.easuz_parser import run_full_update
-        # run_full_update()
-        return "✅ Запущено обновление базы данных из ЕАСУЗ. Это займёт несколько минут."
\ No newline at end of file
+        from src.services.ingest import MODE_NAMES, ingest_runner
+
+        if ingest_runner.start(mode) is None:
+            if ingest_runner.running:
+                return ingest_runner.describe()
+            return "⏳ Синхронизация уже идёт в другом процессе (full_reparse.py)"
+        return (
+            f"✅ Запущена {MODE_NAMES[mode]} синхронизация с ЕАСУЗ. "
+            "Прогресс — /update status, итог придёт сообщением."
+        )
+
+    def get_crawl_metrics(self, run_id: Optional[int] = None) -> str:
+        """Сводка телеметрии обхода ЕАСУЗ по этапам (последний запуск или run_id)."""
+        from src.parser.telemetry import format_summary, load_metrics
+
+        return format_summary(*load_metrics(run_id, engine=self.db.get_bind()))
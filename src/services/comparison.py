@@ -1,32 +1,11 @@
 # src/services/comparison.py
 from typing import List, Literal, Optional, Tuple
 from src.database.models import Listing
-from math import radians, cos, sin, asin, sqrt
+from src.database.spatial import haversine
 
 CompareType = Literal["price", "area", "price_per_sqm", "distance"]
 
 
-def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """
-    Расчет расстояния между двумя точками на Земле (формула Haversine)
-    Возвращает расстояние в километрах
-    """
-    # Переводим в радианы
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    
-    # Разница координат
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    
-    # Формула Haversine
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    
-    # Радиус Земли в километрах
-    km = 6371 * c
-    return km
-
-
 class ComparisonService:
     """Сервис для сравнения объявлений"""
 
@@ -1,7 +1,9 @@
 # src/services/favorites.py
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from src.database.models import Favorite, Listing
-from typing import List, Optional
+from typing import List, Optional, Set
 
 MAX_FAVORITES = 10
 
@@ -81,4 +83,86 @@ class FavoritesService:
         return self.db.query(Favorite).filter(
             Favorite.telegram_id == telegram_id,
             Favorite.listing_id == listing_id
-        ).first() is not None
\ No newline at end of file
+        ).first() is not None
+
+
+class AsyncFavoritesService:
+    """Избранное для обработчиков бота: те же операции, что FavoritesService, на AsyncSession"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add(self, telegram_id: int, listing_id: int) -> bool:
+        """Добавить объявление в избранное. Возвращает True если добавлено."""
+        if await self.count(telegram_id) >= MAX_FAVORITES:
+            return False
+
+        if await self.is_favorite(telegram_id, listing_id):
+            return False
+
+        self.db.add(Favorite(telegram_id=telegram_id, listing_id=listing_id))
+        await self.db.commit()
+        return True
+
+    async def remove(self, telegram_id: int, listing_id: int) -> bool:
+        """Удалить объявление из избранного."""
+        fav = await self.db.scalar(
+            select(Favorite).where(
+                Favorite.telegram_id == telegram_id,
+                Favorite.listing_id == listing_id
+            ).limit(1)
+        )
+
+        if fav:
+            await self.db.delete(fav)
+            await self.db.commit()
+            return True
+        return False
+
+    async def clear(self, telegram_id: int) -> int:
+        """Очистить всё избранное. Возвращает количество удалённых."""
+        result = await self.db.execute(
+            delete(Favorite).where(Favorite.telegram_id == telegram_id)
+        )
+        await self.db.commit()
+        return result.rowcount
+
+    async def get_all(self, telegram_id: int) -> List[Listing]:
+        """Получить все избранные объявления."""
+        result = await self.db.scalars(
+            select(Listing).join(
+                Favorite, Favorite.listing_id == Listing.id
+            ).where(
+                Favorite.telegram_id == telegram_id
+            ).order_by(
+                Favorite.added_at.desc()
+            )
+        )
+        return list(result)
+
+    async def count(self, telegram_id: int) -> int:
+        """Количество избранных объявлений."""
+        return await self.db.scalar(
+            select(func.count()).select_from(Favorite).where(Favorite.telegram_id == telegram_id)
+        )
+
+    async def is_favorite(self, telegram_id: int, listing_id: int) -> bool:
+        """Проверка, находится ли объявление в избранном."""
+        return await self.db.scalar(
+            select(Favorite.id).where(
+                Favorite.telegram_id == telegram_id,
+                Favorite.listing_id == listing_id
+            ).limit(1)
+        ) is not None
+
+    async def favorite_ids(self, telegram_id: int, listing_ids: List[int]) -> Set[int]:
+        """Какие из объявлений выдачи уже в избранном — одним запросом."""
+        if not listing_ids:
+            return set()
+        result = await self.db.scalars(
+            select(Favorite.listing_id).where(
+                Favorite.telegram_id == telegram_id,
+                Favorite.listing_id.in_(listing_ids)
+            )
+        )
+        return set(result)
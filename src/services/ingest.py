@@ -0,0 +1,170 @@
+# src/services/ingest.py
+# Синхронизация с ЕАСУЗ из процесса бота: фоновый поток и расписание на цикле aiogram
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MODE_NAMES = {"incremental": "инкрементальная", "full": "полная"}
+
+
+class IngestRunner:
+    """
+    Выполняет src.parser.full_reparse.main в отдельном потоке.
+    Одновременно идёт не больше одной синхронизации — и в этом процессе,
+    и с ручным запуском full_reparse.py (по таблице crawl_runs).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+        self._future: Optional[Future] = None
+        self.progress: Optional[Dict] = None
+        self.last_result: Optional[Dict] = None
+
+    @property
+    def future(self) -> Optional[Future]:
+        """Future последнего запуска (результат — итог из full_reparse.main)"""
+        return self._future
+
+    @property
+    def running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def start(self, mode: str = "incremental") -> Optional[Future]:
+        """Запустить синхронизацию; None, если она уже идёт"""
+        from src.parser.checkpoint import FOREIGN_RUN_MAX_IDLE, CrawlRunTracker
+
+        with self._lock:
+            if self.running:
+                return None
+            if CrawlRunTracker.find_active(FOREIGN_RUN_MAX_IDLE) is not None:
+                logger.info("⏭️ Синхронизация уже идёт в другом процессе")
+                return None
+            self.progress = {"mode": mode, "started_at": time.time(), "page": 0, "lots": 0}
+            self._future = self._executor.submit(self._run, mode)
+            return self._future
+
+    def _on_progress(self, page: int, lots: int):
+        self.progress.update(page=page, lots=lots)
+
+    def _run(self, mode: str) -> Dict:
+        from src.parser.full_reparse import main as run_sync
+
+        started = self.progress["started_at"]
+        if mode == "full":
+            max_pages = settings.INGEST_FULL_MAX_PAGES or None
+        else:
+            max_pages = 320
+        try:
+            result = run_sync(incremental=mode == "incremental", max_pages=max_pages,
+                              progress=self._on_progress)
+        except Exception as e:
+            logger.exception("❌ Ошибка синхронизации")
+            result = {"mode": mode, "status": "failed", "error": str(e), "saved": 0}
+        result["duration"] = time.time() - started
+        result["finished_at"] = datetime.now()
+        self.last_result = result
+        self.progress = None
+        return result
+
+    def describe(self) -> str:
+        """Состояние для команды /update"""
+        progress = self.progress
+        if progress is not None:
+            elapsed = time.time() - progress["started_at"]
+            return (
+                f"⏳ Идёт {MODE_NAMES[progress['mode']]} синхронизация: "
+                f"страница {progress['page']}, обработано {progress['lots']} лотов "
+                f"за {elapsed / 60:.0f} мин"
+            )
+        if self.last_result is None:
+            return "ℹ️ С момента запуска бота синхронизаций не было"
+        return format_result(self.last_result)
+
+
+def format_result(result: Dict) -> str:
+    """Итог синхронизации одной строкой для администратора"""
+    mode = MODE_NAMES.get(result.get("mode"), result.get("mode"))
+    finished = result.get("finished_at")
+    when = f" ({finished:%d.%m %H:%M})" if finished else ""
+    if result.get("status") != "completed":
+        return f"❌ {mode.capitalize()} синхронизация{when}: {result.get('status')} — {result.get('error') or 'прервана'}"
+    return (
+        f"✅ {mode.capitalize()} синхронизация{when} за {result.get('duration', 0) / 60:.1f} мин: "
+        f"обработано {result.get('saved', 0)}, новых {result.get('inserted', 0)}, "
+        f"изменилось {result.get('updated', 0)}, снято {result.get('deactivated', 0)}"
+    )
+
+
+# Один исполнитель на процесс: его делят планировщик, /update и AdminService
+ingest_runner = IngestRunner()
+
+
+class IngestScheduler:
+    """
+    Расписание синхронизаций на цикле событий aiogram: инкрементальная каждые
+    INGEST_INCREMENTAL_INTERVAL_MINUTES, полная каждые INGEST_FULL_INTERVAL_HOURS.
+    Сам обход идёт в потоке IngestRunner, поэтому polling не блокируется.
+    """
+
+    def __init__(self, runner: IngestRunner = ingest_runner,
+                 notify: Optional[Callable[[str], Awaitable]] = None,
+                 incremental_interval: Optional[timedelta] = None,
+                 full_interval: Optional[timedelta] = None):
+        self.runner = runner
+        self.notify = notify
+        self.incremental_interval = incremental_interval or timedelta(
+            minutes=settings.INGEST_INCREMENTAL_INTERVAL_MINUTES)
+        self.full_interval = full_interval or timedelta(hours=settings.INGEST_FULL_INTERVAL_HOURS)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        self._task = asyncio.create_task(self._loop(), name="ingest-scheduler")
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    async def run(self, mode: str) -> Optional[Dict]:
+        """Запустить синхронизацию и дождаться итога; None, если она уже идёт"""
+        # start() проверяет crawl_runs запросом к БД под блокировкой — не на цикле событий
+        future = await asyncio.to_thread(self.runner.start, mode)
+        if future is None:
+            return None
+        result = await asyncio.wrap_future(future)
+        # Пустые ежечасные синхронизации администратору не шлём
+        quiet = result.get("status") == "completed" and mode == "incremental" and not result.get("inserted")
+        if self.notify is not None and not quiet:
+            try:
+                await self.notify(format_result(result))
+            except Exception as e:
+                logger.warning(f"⚠️ Не удалось отправить итог синхронизации: {e}")
+        return result
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        next_incremental = loop.time() + self.incremental_interval.total_seconds()
+        next_full = loop.time() + self.full_interval.total_seconds()
+        logger.info(f"🗓️ Планировщик синхронизаций: инкрементальная каждые {self.incremental_interval}, "
+                    f"полная каждые {self.full_interval}")
+        while True:
+            await asyncio.sleep(max(0.0, min(next_incremental, next_full) - loop.time()))
+            now = loop.time()
+            # Полный обход заодно подтягивает и новые лоты
+            mode = "full" if now >= next_full else "incremental"
+            if mode == "full":
+                next_full = now + self.full_interval.total_seconds()
+            next_incremental = now + self.incremental_interval.total_seconds()
+            logger.info(f"🔄 Плановая синхронизация: {MODE_NAMES[mode]}")
+            if await self.run(mode) is None:
+                logger.info("⏭️ Предыдущая синхронизация ещё идёт, пропускаю")
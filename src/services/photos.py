@@ -0,0 +1,112 @@
+# src/services/photos.py
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from src.database.models import PhotoCache
+
+# Ответы Telegram, когда он не смог скачать или распознать содержимое по URL.
+# Остальные ошибки отправки (flood wait, сеть, длина подписи) к самому URL
+# отношения не имеют — по ним фото битым не помечаем
+BAD_URL_ERRORS = (
+    'failed to get http url content',
+    'wrong type of the web page content',
+    'wrong file identifier/http url specified',
+    'image_process_failed',
+    'photo_invalid_dimensions',
+)
+
+
+class PhotoCacheService:
+    """
+    Кэш фото объявлений для Telegram: после первой успешной отправки по URL
+    храним file_id и дальше отправляем по нему — без загрузки картинки с ЕАСУЗ.
+    URL, которые Telegram не смог загрузить, помечаются битыми и временно пропускаются.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, PhotoCache]:
+        """Записи кэша для набора URL одним запросом"""
+        urls = [url for url in set(urls) if url]
+        if not urls:
+            return {}
+        rows = self.db.query(PhotoCache).filter(PhotoCache.url.in_(urls)).all()
+        return {row.url: row for row in rows}
+
+    @staticmethod
+    def is_bad(entry: Optional[PhotoCache]) -> bool:
+        """URL недавно не загрузился — фото не отправляем"""
+        if entry is None or not entry.is_bad:
+            return False
+        retry_after = timedelta(hours=settings.PHOTO_BAD_URL_RETRY_HOURS)
+        return entry.updated_at is not None and datetime.utcnow() - entry.updated_at < retry_after
+
+    @staticmethod
+    def is_bad_url_error(error: str) -> bool:
+        """Ошибка отправки означает, что Telegram не смог загрузить фото по URL"""
+        error = error.lower()
+        return any(marker in error for marker in BAD_URL_ERRORS)
+
+    def _upsert(self, url: str, values: Dict, updates: Dict):
+        """
+        INSERT ... ON CONFLICT DO UPDATE: один и тот же URL могут впервые
+        отправить одновременно в нескольких чатах — обычный INSERT упал бы на ключе
+        """
+        now = datetime.utcnow()
+        stmt = sqlite_insert(PhotoCache.__table__).values(url=url, created_at=now, updated_at=now, **values)
+        self.db.execute(stmt.on_conflict_do_update(index_elements=['url'], set_=updates))
+        self.db.commit()
+
+    def remember(self, url: str, file_id: str):
+        """Фото отправлено по URL — сохранить file_id"""
+        self._upsert(
+            url,
+            dict(file_id=file_id, is_bad=False, failures=0),
+            dict(file_id=file_id, is_bad=False, last_error=None, updated_at=datetime.utcnow()),
+        )
+
+    def forget_file_id(self, url: str):
+        """file_id перестал приниматься Telegram — в следующий раз отправим по URL"""
+        entry = self.db.get(PhotoCache, url)
+        if entry is not None:
+            entry.file_id = None
+            self.db.commit()
+
+    def mark_bad(self, url: str, error: str):
+        """Telegram не смог загрузить фото по URL"""
+        self._upsert(
+            url,
+            dict(is_bad=True, failures=1, last_error=error[:500]),
+            dict(is_bad=True, failures=func.coalesce(PhotoCache.__table__.c.failures, 0) + 1,
+                 last_error=error[:500], updated_at=datetime.utcnow()),
+        )
+
+
+class AsyncPhotoCacheService:
+    """PhotoCacheService для обработчиков бота: те же операции через AsyncSession.run_sync"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    is_bad = staticmethod(PhotoCacheService.is_bad)
+    is_bad_url_error = staticmethod(PhotoCacheService.is_bad_url_error)
+
+    async def get_many(self, urls: Iterable[str]) -> Dict[str, PhotoCache]:
+        urls = list(urls)
+        return await self.db.run_sync(lambda session: PhotoCacheService(session).get_many(urls))
+
+    async def remember(self, url: str, file_id: str):
+        await self.db.run_sync(lambda session: PhotoCacheService(session).remember(url, file_id))
+
+    async def forget_file_id(self, url: str):
+        await self.db.run_sync(lambda session: PhotoCacheService(session).forget_file_id(url))
+
+    async def mark_bad(self, url: str, error: str):
+        await self.db.run_sync(lambda session: PhotoCacheService(session).mark_bad(url, error))
@@ -1,13 +1,21 @@
 # src/services/search.py
 # ИСПРАВЛЕННАЯ ВЕРСИЯ - умный поиск с поддержкой аренды/покупки/имущества
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
-from typing import List, Optional, Dict, Any
-from src.database.models import Listing
+from typing import List, Optional, Dict, Any, Tuple
+from src.database.counters import read_counters, read_total
+from src.database.fts import match_all, match_any, matching_ids
+from src.database.models import Listing, PurchaseKind, StageState
+from src.database.normalize import (
+    category_mask, deal_type, fold, municipality_key, municipality_name, purpose_category_ids,
+)
+from src.database.spatial import haversine, points_in_box
 from src.llm.prompt_engine import SearchPromptEngine
 from src.llm.vsegpt_client import VseGPTClient
 from config.settings import settings
+import asyncio
+import copy
 import logging
 import re
 
@@ -35,6 +43,13 @@ PURPOSE_MAPPING = {
     "гараж": ["Хранение автотранспорта", "Служебные гаражи"],
 }
 
+# Колонки listings_fts для назначений вне справочника категорий
+PURPOSE_COLUMNS = ("land_allowed_use_name",)
+
+# Поиск ближайших: начальный радиус, расширяемый до максимального, км
+NEAREST_START_RADIUS_KM = 1.0
+NEAREST_MAX_RADIUS_KM = 200.0
+
 # ✅ НОВОЕ: Маппинг типов сделок
 PURCHASE_KIND_MAPPING = {
     "аренда": ["Аренда", "аренда"],
@@ -46,7 +61,7 @@ PURCHASE_KIND_MAPPING = {
 class SearchService:
     """Сервис для умного поиска участков и имущества"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Optional[Session]):
         self.db = db
         try:
             self.llm_client = VseGPTClient(settings.VSE_GPT_API_KEY)
@@ -62,18 +77,26 @@ class SearchService:
         enable_fallback: bool = True
     ) -> List[Listing]:
         """Поиск участков по естественному языку"""
+        filters = self.extract_filters(user_query)
+        return self.search_with_filters(filters, user_query, enable_fallback)
+    
+    def extract_filters(self, user_query: str) -> Optional[Dict[str, Any]]:
+        """
+        Фильтры из запроса через LLM (без обращения к БД).
+        None — LLM недоступен или ответ не разобран, нужен умный fallback.
+        """
         logger.info("=" * 80)
         logger.info(f"🔍 Начат поиск по запросу: '{user_query}'")
         
         if not self.llm_enabled or self.llm_client is None:
             logger.warning("⚠️ LLM недоступен, используем прямой поиск")
-            return self._smart_fallback_search(user_query)
+            return None
         
         try:
             messages = SearchPromptEngine.build_llm_messages(user_query)
         except Exception as e:
             logger.error(f"❌ Ошибка при формировании промпта: {e}")
-            return self._smart_fallback_search(user_query)
+            return None
         
         try:
             llm_response = self.llm_client.ask(
@@ -83,11 +106,11 @@ class SearchService:
             )
         except Exception as e:
             logger.error(f"❌ Ошибка при обращении к LLM: {e}")
-            return self._smart_fallback_search(user_query)
+            return None
         
         if not llm_response:
             logger.error("❌ LLM не вернул ответ")
-            return self._smart_fallback_search(user_query)
+            return None
         
         logger.info(f"✅ Ответ LLM (первые 300 символов): {llm_response[:300]}")
         
@@ -98,16 +121,26 @@ class SearchService:
             )
         except Exception as e:
             logger.error(f"❌ Ошибка парсинга ответа LLM: {e}")
-            return self._smart_fallback_search(user_query)
+            return None
         
         if not filters:
             logger.warning("⚠️ Не удалось распарсить ответ LLM в фильтры")
-            return self._smart_fallback_search(user_query)
+            return None
         
         logger.info(f"📊 Извлеченные фильтры: {filters}")
         
         # ✅ НОВОЕ: Преобразуем фильтры
-        filters = self._convert_filters(filters, user_query)
+        return self._convert_filters(filters, user_query)
+    
+    def search_with_filters(
+        self,
+        filters: Optional[Dict[str, Any]],
+        user_query: str,
+        enable_fallback: bool = True
+    ) -> List[Listing]:
+        """Запросы к БД по фильтрам из extract_filters (None — сразу умный fallback)"""
+        if filters is None:
+            return self._smart_fallback_search(user_query)
         
         results = self._execute_search(filters)
         
@@ -179,38 +212,40 @@ class SearchService:
     
     def _execute_search(self, filters: Dict[str, Any]) -> List[Listing]:
         """Выполнение SQL-запроса с применением фильтров"""
+        # Фильтры идут в порядке колонок idx_search_city / idx_search_purpose:
+        # город, назначение, тип сделки, цена
         query = self.db.query(Listing).filter(Listing.is_active == True)
+        # Назначения вне справочника категорий ищутся через listings_fts
+        text_filters = []
         
         # Район
         if filters.get("district_code"):
             district = filters["district_code"]
-            query = query.filter(func.lower(Listing.address_description).like(f"%{district.lower()}%"))
+            query = query.filter(self._municipality_condition(district))
             logger.info(f"  📍 Фильтр по району: '{district}'")
         
         # Назначение (список)
         if filters.get("land_allowed_use_name_list"):
             purposes = filters["land_allowed_use_name_list"]
-            conditions = [func.lower(Listing.land_allowed_use_name).like(f"%{p.lower()}%") for p in purposes]
-            query = query.filter(or_(*conditions))
+            query = self._apply_purpose_filter(query, purposes, text_filters)
             logger.info(f"  🎯 Фильтр по назначениям: {purposes}")
         
         # Назначение (одиночное - для совместимости)
         elif filters.get("land_allowed_use_name"):
             use_name = filters["land_allowed_use_name"]
-            query = query.filter(func.lower(Listing.land_allowed_use_name).like(f"%{use_name.lower()}%"))
+            query = self._apply_purpose_filter(query, [use_name], text_filters)
             logger.info(f"  🎯 Фильтр по назначению: '{use_name}'")
         
         # ✅ НОВОЕ: Тип сделки (аренда/продажа)
         if filters.get("purchase_kind_list"):
             kinds = filters["purchase_kind_list"]
-            conditions = [func.lower(Listing.purchase_kind_name).like(f"%{k.lower()}%") for k in kinds]
-            query = query.filter(or_(*conditions))
+            query = self._apply_deal_filter(query, kinds)
             logger.info(f"  📋 Фильтр по типам сделок: {kinds}")
         
         # Тип сделки (одиночный - для совместимости)
         elif filters.get("purchase_kind_name"):
             kind = filters["purchase_kind_name"]
-            query = query.filter(func.lower(Listing.purchase_kind_name).like(f"%{kind.lower()}%"))
+            query = self._apply_deal_filter(query, [kind])
             logger.info(f"  📝 Фильтр по типу сделки: '{kind}'")
         
         # Цена
@@ -233,9 +268,10 @@ class SearchService:
         # Статус
         if filters.get("stage_state_name"):
             stage = filters["stage_state_name"]
-            query = query.filter(func.lower(Listing.stage_state_name).like(f"%{stage.lower()}%"))
+            query = query.filter(self._lookup_condition(Listing.stage_state_id, StageState, [stage]))
             logger.info(f"  ⏱️ Фильтр по статусу: '{stage}'")
         
+        query = self._apply_text_filters(query, text_filters)
         query = query.order_by(Listing.start_price.asc(), Listing.total_square.desc())
         
         logger.debug(f"SQL: {query.statement.compile(compile_kwargs={'literal_binds': True})}")
@@ -243,6 +279,53 @@ class SearchService:
         results = query.limit(10).all()
         return results
     
+    @staticmethod
+    def _municipality_condition(city: str):
+        """Город или округ в любой форме («Одинцово», «Одинцовский городской округ») → равенство по municipality"""
+        return Listing.municipality == municipality_key(municipality_name(city) or city)
+    
+    @staticmethod
+    def _purpose_condition(category_ids):
+        """Лот относится хотя бы к одной из категорий (у многоцелевых ВРИ их несколько)"""
+        return Listing.purpose_mask.op('&')(category_mask(category_ids)) != 0
+
+    @classmethod
+    def _apply_purpose_filter(cls, query, purposes: List[str], text_filters: List[str]):
+        """Назначения из справочника — по битам purpose_mask, остальные — в MATCH по listings_fts"""
+        category_ids = purpose_category_ids(purposes)
+        if category_ids:
+            return query.filter(cls._purpose_condition(category_ids))
+        text_filters.append(match_any(purposes, PURPOSE_COLUMNS))
+        return query
+    
+    def _apply_deal_filter(self, query, kinds: List[str]):
+        """Аренда/продажа — IN по deal_type; неизвестный вид торгов — по справочнику purchase_kinds"""
+        deal_types = {deal_type(kind) for kind in kinds}
+        if None not in deal_types:
+            return query.filter(Listing.deal_type.in_(sorted(deal_types)))
+        return query.filter(self._lookup_condition(Listing.purchase_kind_id, PurchaseKind, kinds))
+    
+    def _lookup_condition(self, id_column, model, texts: List[str]):
+        """
+        Подстрока в значении справочника → IN по id. Справочник — десятки строк:
+        сравниваем в Python (SQLite lower() не знает кириллицы), в listings — только целые.
+        """
+        needles = [fold(text) for text in texts]
+        ids = [
+            lookup_id for lookup_id, name in self.db.query(model.id, model.name)
+            if any(needle in fold(name) for needle in needles)
+        ]
+        return id_column.in_(ids)
+    
+    @staticmethod
+    def _apply_text_filters(query, text_filters: List[str]):
+        """Условия по названию, адресу и назначению — через полнотекстовый индекс listings_fts"""
+        expression = match_all(text_filters)
+        if expression is None:
+            return query
+        logger.debug(f"  🔎 FTS: {expression}")
+        return query.filter(Listing.id.in_(matching_ids(expression)))
+    
     def _normalize_city(self, city: str) -> str:
         """Нормализация названия города"""
         city_map = {
@@ -277,13 +360,13 @@ class SearchService:
         
         query_lower = user_query.lower()
         query = self.db.query(Listing).filter(Listing.is_active == True)
+        text_filters = []
         
         # 1️⃣ Назначение использования
         found_purpose = False
         for keyword, db_purposes in PURPOSE_MAPPING.items():
             if keyword in query_lower:
-                conditions = [func.lower(Listing.land_allowed_use_name).like(f"%{p.lower()}%") for p in db_purposes]
-                query = query.filter(or_(*conditions))
+                query = self._apply_purpose_filter(query, db_purposes, text_filters)
                 logger.info(f"  🎯 Фильтр по ключу '{keyword}': {db_purposes}")
                 found_purpose = True
                 break
@@ -292,8 +375,7 @@ class SearchService:
         found_purchase_kind = False
         for keyword, kinds in PURCHASE_KIND_MAPPING.items():
             if keyword in query_lower:
-                conditions = [func.lower(Listing.purchase_kind_name).like(f"%{k.lower()}%") for k in kinds]
-                query = query.filter(or_(*conditions))
+                query = self._apply_deal_filter(query, kinds)
                 logger.info(f"  📋 Фильтр по типу сделки '{keyword}': {kinds}")
                 found_purchase_kind = True
                 break
@@ -315,14 +397,7 @@ class SearchService:
         for city in cities:
             normalized = self._normalize_city(city)
             if normalized in query_lower or city in query_lower:
-                query = query.filter(
-                    or_(
-                        func.lower(Listing.address_description).like(f"%{city.lower()}%"),
-                        func.lower(Listing.address_description).like(f"%{normalized.lower()}%"),
-                        func.lower(Listing.name).like(f"%{city.lower()}%"),
-                        func.lower(Listing.name).like(f"%{normalized.lower()}%")
-                    )
-                )
+                query = query.filter(self._municipality_condition(normalized))
                 logger.info(f"  📍 Фильтр по городу: {city}")
                 found_city = True
                 break
@@ -353,6 +428,7 @@ class SearchService:
             logger.warning("  ⚠️ Не удалось определить параметры поиска - возвращаю пустой результат")
             return []
         
+        query = self._apply_text_filters(query, text_filters)
         query = query.order_by(Listing.start_price.asc())
         
         logger.debug(f"SQL: {query.statement.compile(compile_kwargs={'literal_binds': True})}")
@@ -440,19 +516,121 @@ class SearchService:
             logger.error(f"❌ Ошибка при проверке LLM: {e}")
             return False
     
+    # ===== ПОИСК ПО РАССТОЯНИЮ (listings_rtree) =====
+    
+    def _nearby(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[int, float]]:
+        """(id, км) активных лотов в радиусе по возрастанию расстояния: прямоугольник по R*Tree, затем haversine"""
+        found = []
+        for listing_id, listing_lat, listing_lon in points_in_box(self.db.connection(), latitude, longitude, radius_km):
+            distance = haversine(latitude, longitude, listing_lat, listing_lon)
+            if distance <= radius_km:
+                found.append((listing_id, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+    
+    def _with_listings(self, found: List[Tuple[int, float]]) -> List[Tuple[Listing, float]]:
+        if not found:
+            return []
+        listings = {listing.id: listing for listing in
+                    self.db.query(Listing).filter(Listing.id.in_([listing_id for listing_id, _ in found]))}
+        return [(listings[listing_id], distance) for listing_id, distance in found if listing_id in listings]
+    
+    def _nearest(self, latitude: float, longitude: float, k: int, max_radius_km: float) -> List[Tuple[int, float]]:
+        """
+        (id, км) k ближайших лотов не дальше max_radius_km. Радиус растёт, пока в круге не наберётся
+        k лотов: всё, что вне круга, дальше любого лота внутри, поэтому первые k из круга точны.
+        """
+        radius = min(NEAREST_START_RADIUS_KM, max_radius_km)
+        while True:
+            found = self._nearby(latitude, longitude, radius)
+            if len(found) >= k or radius >= max_radius_km:
+                return found[:k]
+            # Следующий радиус — по плотности уже найденного, но не меньше чем вдвое
+            radius = min(max_radius_km, radius * max(2.0, 1.2 * (k / max(len(found), 1)) ** 0.5))
+    
+    def find_within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        limit: Optional[int] = 10
+    ) -> List[Tuple[Listing, float]]:
+        """
+        Лоты не дальше radius_km от точки: [(лот, км)], ближайшие первыми.
+        С limit читаются только окрестности точки; limit=None — весь круг, время растёт с числом лотов в нём.
+        """
+        if limit:
+            found = self._nearest(latitude, longitude, limit, radius_km)
+        else:
+            found = self._nearby(latitude, longitude, radius_km)
+        return self._with_listings(found)
+    
+    def find_nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 10,
+        max_radius_km: float = NEAREST_MAX_RADIUS_KM
+    ) -> List[Tuple[Listing, float]]:
+        """k ближайших к точке лотов: [(лот, км)]"""
+        return self._with_listings(self._nearest(latitude, longitude, k, max_radius_km))
+    
     def get_stats(self) -> Dict[str, int]:
-        """Статистика БД"""
-        total = self.db.query(Listing).filter(Listing.is_active == True).count()
+        """Статистика БД по счётчикам stats_counters — без COUNT(*) по listings"""
+        conn = self.db.connection()
+        land_uses = read_counters(conn, 'land_use')
         
         stats = {
-            "total_listings": total,
-            "with_price": self.db.query(Listing).filter(
-                and_(Listing.is_active == True, Listing.start_price > 0)
-            ).count(),
-            "land_plots": self.db.query(Listing).filter(
-                and_(Listing.is_active == True, Listing.land_allowed_use_name.isnot(None))
-            ).count()
+            "total_listings": read_total(conn, 'listings'),
+            "with_price": read_total(conn, 'priced', key='1'),
+            "land_plots": sum(land_uses.values()) - land_uses.get('', 0),
         }
         
         logger.info(f"📊 Статистика БД: {stats}")
-        return stats
\ No newline at end of file
+        return stats
+
+
+class AsyncSearchService:
+    """
+    Поиск для обработчиков бота: запрос к LLM (блокирующий HTTP) идёт в потоке,
+    а запросы к БД — той же логикой SearchService через AsyncSession.run_sync,
+    поэтому цикл событий не ждёт ни сеть, ни SQLite.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._service = SearchService(None)
+
+    async def search_by_natural_language(
+        self,
+        user_query: str,
+        enable_fallback: bool = True
+    ) -> List[Listing]:
+        filters = await asyncio.to_thread(self._service.extract_filters, user_query)
+        return await self.db.run_sync(self._search, filters, user_query, enable_fallback)
+
+    def _bind(self, session: Session) -> SearchService:
+        """SearchService на синхронной сессии внутри run_sync (LLM-клиент общий)"""
+        service = copy.copy(self._service)
+        service.db = session
+        return service
+
+    def _search(self, session: Session, filters, user_query: str, enable_fallback: bool) -> List[Listing]:
+        return self._bind(session).search_with_filters(filters, user_query, enable_fallback)
+
+    async def find_within_radius(
+        self, latitude: float, longitude: float, radius_km: float, limit: Optional[int] = 10
+    ) -> List[Tuple[Listing, float]]:
+        return await self.db.run_sync(
+            lambda session: self._bind(session).find_within_radius(latitude, longitude, radius_km, limit)
+        )
+
+    async def find_nearest(
+        self, latitude: float, longitude: float, k: int = 10, max_radius_km: float = NEAREST_MAX_RADIUS_KM
+    ) -> List[Tuple[Listing, float]]:
+        return await self.db.run_sync(
+            lambda session: self._bind(session).find_nearest(latitude, longitude, k, max_radius_km)
+        )
+
+    async def get_stats(self) -> Dict[str, int]:
+        return await self.db.run_sync(lambda session: self._bind(session).get_stats())
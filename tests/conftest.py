@@ -0,0 +1,75 @@
+# tests/conftest.py
+# Общие фикстуры: временная SQLite вместо ./data/easuz, фейковый ЕАСУЗ, строки лотов
+
+import os
+import sys
+import tempfile
+import threading
+
+# Настройки читаются из окружения при импорте config.settings — задаём их до импорта src
+_TMP_DIR = tempfile.mkdtemp(prefix="easuz-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+os.environ["HTML_CACHE_PATH"] = ""
+os.environ["RAW_ARCHIVE_DIR"] = ""
+os.environ["VSE_GPT_API_KEY"] = ""
+os.environ["INGEST_SCHEDULER_ENABLED"] = "False"
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from config.settings import settings
+from src.database.models import Base
+from src.parser.models import ListingRow
+
+
+@pytest.fixture
+def engine():
+    """Движок src.database.session на пустой схеме (его же берут парсер, чекпоинты и шарды)"""
+    from src.database.session import engine
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def fake_easuz(monkeypatch):
+    """Фейковый портал (scripts/fake_easuz.py) в потоке; feed можно менять во время обхода"""
+    from scripts.fake_easuz import FakeEasuzServer, FakeFeed
+
+    def start(lots: int):
+        server = FakeEasuzServer(('127.0.0.1', 0), FakeFeed(lots))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append(server)
+        monkeypatch.setattr(settings, "EASUZ_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+        monkeypatch.setattr(settings, "PARSER_RATE_LIMIT", 1000.0)
+        monkeypatch.setattr(settings, "PARSER_RATE_BURST", 1000.0)
+        return server
+
+    servers = []
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def make_row(lot_id: int, **fields) -> ListingRow:
+    """Лот с разумными значениями по умолчанию; fields переопределяют поля ListingRow"""
+    address = f"Московская обл., г.о. Мытищи, участок {lot_id}"
+    values = dict(
+        id=lot_id, name=f"Земельный участок №{lot_id}", registry_number=f"TEST-{lot_id:07d}",
+        start_price=1_000_000.0 + lot_id, deposit_amount=200_000.0, start_step_amount=30_000.0,
+        total_square=1000.0, address_description=address,
+        latitude=55.9 + lot_id / 10000, longitude=37.7 + lot_id / 10000, district_code="50:12",
+        right_term_use_year=None, right_term_use_month=None,
+        purchase_kind_name="Продажа", purchase_form_name="Аукцион",
+        stage_state_name="Прием заявок",
+        land_allowed_use_name="Для индивидуального жилищного строительства",
+        accept_plan_end_date=None, review_plan_end_date=None, count_views=0, photos_json=None,
+        full_address=address, direct_url=f"https://easuz.mosreg.ru/{lot_id}",
+        object_type="land", cadastral_number=f"50:12:0000000:{lot_id}",
+    )
+    values.update(fields)
+    return ListingRow(**values)
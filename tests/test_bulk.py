@@ -0,0 +1,99 @@
+# tests/test_bulk.py
+# ListingWriter: upsert, пропуск неизменившихся лотов, история изменений
+
+from sqlalchemy.orm import Session
+
+from src.database.bulk import ListingWriter
+from src.database.models import Listing, ListingHistory
+from tests.conftest import make_row
+
+
+def write(engine, rows, generation=1):
+    with ListingWriter(engine=engine, generation=generation) as writer:
+        writer.write(rows)
+    return writer
+
+
+def stored(engine, lot_id):
+    with Session(engine) as db:
+        listing = db.get(Listing, lot_id)
+        db.expunge(listing)
+        return listing
+
+
+def history(engine):
+    with Session(engine) as db:
+        return [(h.listing_id, h.field_name, h.old_value, h.new_value) for h in db.query(ListingHistory)]
+
+
+def test_insert_then_unchanged(engine):
+    rows = [make_row(i) for i in range(1, 4)]
+    writer = write(engine, rows)
+    assert (writer.inserted, writer.updated, writer.unchanged) == (3, 0, 0)
+    updated_at = stored(engine, 1).updated_at
+
+    writer = write(engine, rows)
+    assert (writer.inserted, writer.updated, writer.unchanged) == (0, 0, 3)
+    assert stored(engine, 1).updated_at == updated_at
+    assert history(engine) == []
+
+
+def test_unchanged_lot_is_touched(engine):
+    write(engine, [make_row(1)], generation=1)
+    updated_at = stored(engine, 1).updated_at
+
+    writer = write(engine, [make_row(1, count_views=42)], generation=2)
+
+    assert writer.unchanged == 1
+    listing = stored(engine, 1)
+    assert (listing.count_views, listing.crawl_generation) == (42, 2)
+    assert listing.updated_at == updated_at
+    assert history(engine) == []
+
+
+def test_changed_lot_writes_history(engine):
+    write(engine, [make_row(1), make_row(2)])
+
+    writer = write(engine, [make_row(1, start_price=500_000.0, stage_state_name="Торги завершены"), make_row(2)])
+
+    assert (writer.updated, writer.unchanged, writer.history_records) == (1, 1, 2)
+    assert sorted(history(engine)) == [
+        (1, 'stage_state_name', 'Прием заявок', 'Торги завершены'),
+        (1, 'start_price', '1000001', '500000'),
+    ]
+    listing = stored(engine, 1)
+    assert (listing.start_price, listing.stage_state_name) == (500_000.0, "Торги завершены")
+
+
+def test_duplicates_in_one_batch(engine):
+    writer = write(engine, [make_row(1), make_row(2), make_row(1, start_price=7.0)])
+
+    assert (writer.inserted, writer.updated, writer.written) == (2, 0, 2)
+    assert stored(engine, 1).start_price == 7.0
+    assert history(engine) == []
+
+
+def test_failed_detail_fetch_keeps_html_columns(engine):
+    row = make_row(1)
+    write(engine, [row])
+
+    # Так _parse_listing собирает лот, если карточка не загрузилась
+    failed = row._replace(direct_url='', cadastral_number='', full_address=row.address_description)
+    writer = write(engine, [failed])
+
+    assert writer.unchanged == 1
+    listing = stored(engine, 1)
+    assert (listing.direct_url, listing.cadastral_number) == (row.direct_url, row.cadastral_number)
+    assert history(engine) == []
+
+
+def test_lot_without_hash_is_compared_by_fields(engine):
+    write(engine, [make_row(1)])
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE listings SET content_hash = NULL")
+
+    writer = write(engine, [make_row(1)])
+
+    assert (writer.updated, writer.unchanged) == (0, 1)
+    assert history(engine) == []
+    assert stored(engine, 1).content_hash is not None
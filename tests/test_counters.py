@@ -0,0 +1,101 @@
+# tests/test_counters.py
+# stats_counters: триггеры против COUNT(*) и создание счётчиков только на новой схеме
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+
+from src.database import counters
+from src.database.bulk import ListingWriter, deactivate_stale_listings
+from src.database.models import Base, Listing, TelegramUser, missing_listing_columns
+from src.database.normalize import PURPOSE_CATEGORIES, purpose_category_ids
+from src.services.search import SearchService
+from tests.conftest import make_row
+
+
+def snapshot(conn):
+    rows = conn.exec_driver_sql(f"SELECT dimension, key, is_active, total FROM {counters.COUNTERS_TABLE}")
+    return {(dimension, key, bool(is_active)): total for dimension, key, is_active, total in rows if total}
+
+
+def rebuilt(conn):
+    for statement in counters.REBUILD_STATEMENTS:
+        conn.exec_driver_sql(statement)
+    return snapshot(conn)
+
+
+def test_triggers_match_full_recount(engine):
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write([make_row(i, district_code=f"50:{i % 3}", purchase_kind_name="Аренда земельных участков"
+                               if i % 2 else "Продажа", start_price=0.0 if i == 5 else 1000.0 + i)
+                      for i in range(1, 11)])
+    with ListingWriter(engine=engine, generation=2) as writer:
+        writer.write([make_row(i, district_code="50:9", land_allowed_use_name="Склад") for i in range(1, 7)])
+    deactivate_stale_listings(2, engine=engine)
+
+    with Session(engine) as db:
+        db.delete(db.get(Listing, 1))
+        db.get(Listing, 2).is_active = False
+        db.get(Listing, 3).start_price = 0
+        db.add_all(TelegramUser(telegram_id=100 + i) for i in range(5))
+        db.commit()
+        db.query(TelegramUser).filter(TelegramUser.telegram_id < 102).delete()
+        db.commit()
+
+    with engine.connect() as conn:
+        maintained = snapshot(conn)
+        assert counters.read_total(conn, 'listings') == 4
+        assert counters.read_total(conn, 'listings', is_active=None) == 9
+        assert counters.read_total(conn, counters.USERS) == 3
+        with Session(bind=conn) as db:
+            assert counters.read_total(conn, 'priced', key='1') == db.query(func.count(Listing.id)).filter(
+                Listing.is_active == True, Listing.start_price > 0).scalar()
+            assert counters.read_counters(conn, 'district') == dict(
+                db.query(Listing.district_code, func.count()).filter(Listing.is_active == True)
+                .group_by(Listing.district_code).all())
+        assert maintained == rebuilt(conn)
+        conn.rollback()
+
+
+def test_purpose_counts_main_category_while_search_uses_mask(engine):
+    multi_use = "Для индивидуального жилищного строительства; Магазины"
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write([make_row(1, land_allowed_use_name=multi_use), make_row(2, land_allowed_use_name="Магазины")])
+    shops = str(next(iter(purpose_category_ids(["Магазины"]))))
+    housing = str(next(iter(purpose_category_ids([PURPOSE_CATEGORIES[1]]))))
+
+    with engine.connect() as conn:
+        # Многоцелевой лот учтён один раз — в основной категории
+        assert counters.read_counters(conn, 'purpose') == {housing: 1, shops: 1}
+        with Session(bind=conn) as db:
+            found = SearchService._apply_purpose_filter(db.query(Listing.id), ["Магазины"], [])
+            assert {listing_id for (listing_id,) in found} == {1, 2}
+
+
+def test_create_all_on_old_schema_skips_counters(tmp_path):
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old.begin() as conn:
+        # listings до миграций: без purpose_category и id справочников
+        conn.exec_driver_sql("""CREATE TABLE listings (
+            id INTEGER PRIMARY KEY, name VARCHAR(500) NOT NULL, registry_number VARCHAR(100) NOT NULL,
+            start_price FLOAT NOT NULL, is_active BOOLEAN, land_allowed_use_name VARCHAR(500))""")
+        conn.exec_driver_sql("INSERT INTO listings VALUES (1, 'Лот', 'R-1', 1.0, 1, '')")
+
+    Base.metadata.create_all(old)
+
+    with old.connect() as conn:
+        assert 'purpose_category' in missing_listing_columns(conn)
+        tables = {name for (name,) in conn.exec_driver_sql("SELECT name FROM sqlite_master")}
+        assert counters.COUNTERS_TABLE not in tables
+    old.dispose()
+
+
+def test_create_all_on_new_database_creates_counters(tmp_path):
+    new = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+    Base.metadata.create_all(new)
+    with ListingWriter(engine=new, generation=1) as writer:
+        writer.write([make_row(1)])
+
+    with new.connect() as conn:
+        assert missing_listing_columns(conn) == []
+        assert counters.read_total(conn, 'listings') == 1
+    new.dispose()
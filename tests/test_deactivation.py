@@ -0,0 +1,82 @@
+# tests/test_deactivation.py
+# Снятие исчезнувших лотов: deactivate_stale_listings и решение полного обхода его запускать
+
+from sqlalchemy.orm import Session
+
+from src.database.bulk import ListingWriter, deactivate_stale_listings
+from src.database.models import Listing
+from src.parser import full_reparse
+from src.parser.scraper import EasuzParser
+from tests.conftest import make_row
+
+STALE_ID = 1          # лот из прошлых обходов, которого в фейковой ленте нет
+
+
+def active_ids(engine):
+    with Session(engine) as db:
+        return {listing_id for (listing_id,) in db.query(Listing.id).filter(Listing.is_active == True)}
+
+
+def write(engine, rows, generation):
+    with ListingWriter(engine=engine, generation=generation) as writer:
+        writer.write(rows)
+
+
+def test_deactivate_stale_listings(engine):
+    write(engine, [make_row(i) for i in range(1, 6)], generation=1)
+    write(engine, [make_row(i) for i in range(1, 4)], generation=2)
+
+    assert deactivate_stale_listings(2, engine=engine) == 2
+    assert active_ids(engine) == {1, 2, 3}
+    assert deactivate_stale_listings(2, engine=engine) == 0
+
+    # Лот вернулся в ленту — следующий обход снова делает его активным
+    write(engine, [make_row(i) for i in range(1, 6)], generation=3)
+    assert active_ids(engine) == {1, 2, 3, 4, 5}
+
+
+def test_full_crawl_that_fits_max_pages_deactivates(engine, fake_easuz):
+    # 25 лотов по 10 на странице: обход заканчивается ровно на max_pages=3
+    fake_easuz(25)
+    write(engine, [make_row(STALE_ID)], generation=None)
+
+    result = full_reparse.main(max_pages=3)
+
+    assert result['status'] == 'completed'
+    assert result['saved'] == 25
+    assert result['deactivated'] == 1
+    assert STALE_ID not in active_ids(engine)
+
+
+def test_crawl_stopped_by_max_pages_keeps_lots(engine, fake_easuz):
+    fake_easuz(25)
+    write(engine, [make_row(STALE_ID)], generation=None)
+
+    result = full_reparse.main(max_pages=2)
+
+    assert result['status'] == 'completed'
+    assert result['saved'] == 20
+    assert result['deactivated'] == 0
+    assert STALE_ID in active_ids(engine)
+
+
+def test_unparsed_lot_is_not_deactivated(engine, fake_easuz, monkeypatch):
+    server = fake_easuz(25)
+    broken_id = server.feed.lot_id(12)
+    write(engine, [make_row(STALE_ID), make_row(broken_id, registry_number="BROKEN")], generation=None)
+
+    parse_listing = EasuzParser._parse_listing
+
+    def fail_on_broken(self, obj, *args):
+        if obj['id'] == broken_id:
+            raise ValueError("битый лот")
+        return parse_listing(self, obj, *args)
+
+    monkeypatch.setattr(EasuzParser, "_parse_listing", fail_on_broken)
+    result = full_reparse.main(max_pages=None)
+
+    assert result['saved'] == 24
+    assert result['deactivated'] == 1
+    active = active_ids(engine)
+    assert STALE_ID not in active
+    assert broken_id in active
@@ -0,0 +1,57 @@
+# tests/test_extract.py
+# Быстрый экстрактор карточки лота против эталона на BeautifulSoup
+
+import os
+
+import pytest
+
+from src.parser.extract import extract_left_col_pairs, extract_left_col_pairs_soup, parse_lot_details
+
+SAMPLE_LOT = os.path.join(os.path.dirname(__file__), '..', 'correct_lot.html')
+
+
+def item(label, value, li_attrs='class="leftCol-list-li"'):
+    return (f'<li {li_attrs}><span class="grayColor">{label}</span>'
+            f'<span class="blackColor">{value}</span></li>')
+
+
+FRAGMENTS = {
+    'простые пары': item('Адрес', 'г. Мытищи') + item('Кадастровый номер', '50:12:0000000:1'),
+    'вложенные span и пробелы': item('<b>Адрес</b>:', '  <span>Московская обл,</span> <span>Мытищи</span> '),
+    'сущности': item('Площадь', '1&nbsp;000 м&sup2; &amp; &quot;склад&quot;'),
+    'несколько классов и одинарные кавычки': item('Адрес', 'Химки', li_attrs="class='x leftCol-list-li y'"),
+    'вложенный li': ('<li class="leftCol-list-li"><span class="grayColor">Адрес</span>'
+                     '<ul><li>пункт</li></ul><span class="blackColor">Химки</span></li>'),
+    'нет значения': '<li class="leftCol-list-li"><span class="grayColor">Адрес</span></li>',
+    'чужой класс': item('Адрес', 'Химки', li_attrs='class="leftCol-list-li-other"'),
+    'пустое значение': item('Кадастровый номер', ''),
+    'повтор span': ('<li class="leftCol-list-li"><span class="grayColor">Первый</span>'
+                    '<span class="grayColor">Второй</span><span class="blackColor">1</span>'
+                    '<span class="blackColor">2</span></li>'),
+}
+
+
+@pytest.mark.parametrize('html', FRAGMENTS.values(), ids=FRAGMENTS.keys())
+def test_fragments_match_soup(html):
+    page = f"<html><body><ul>{html}</ul></body></html>"
+    assert extract_left_col_pairs(page) == extract_left_col_pairs_soup(page)
+
+
+def test_sample_page_matches_soup():
+    with open(SAMPLE_LOT, encoding='utf-8') as f:
+        html = f.read()
+
+    pairs = extract_left_col_pairs(html)
+
+    assert pairs and pairs == extract_left_col_pairs_soup(html)
+    full_address, cadastral = parse_lot_details(html)
+    assert full_address and cadastral
+
+
+def test_fake_feed_pages_match_soup():
+    from scripts.fake_easuz import FakeFeed
+
+    feed = FakeFeed(20)
+    for index in range(20):
+        html = feed.lot_page(feed.lot_id(index))
+        assert extract_left_col_pairs(html) == extract_left_col_pairs_soup(html)
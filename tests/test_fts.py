@@ -0,0 +1,57 @@
+# tests/test_fts.py
+# listings_fts: триггеры держат индекс в согласии с listings при записи ListingWriter и ORM
+
+from sqlalchemy.orm import Session
+
+from src.database import fts
+from src.database.bulk import ListingWriter
+from src.database.models import Listing
+from tests.conftest import make_row
+
+
+def indexed(conn):
+    return set(conn.exec_driver_sql(f"SELECT rowid, {', '.join(fts.FTS_COLUMNS)} FROM {fts.FTS_TABLE}"))
+
+
+def found(engine, *texts, columns=None):
+    with Session(engine) as db:
+        ids = fts.matching_ids(fts.match_any(texts, columns))
+        return {listing_id for (listing_id,) in db.query(Listing.id).filter(Listing.id.in_(ids))}
+
+
+def test_triggers_keep_index_in_sync(engine):
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write([make_row(1), make_row(2), make_row(3, address_description="Солнечногорск, ул. Ёлочная")])
+    with ListingWriter(engine=engine, generation=2) as writer:
+        writer.write([
+            make_row(1, address_description="г.о. Химки, Новая улица", full_address="г.о. Химки, Новая улица"),
+            make_row(2, land_allowed_use_name="Склад"),
+        ])
+
+    with Session(engine) as db:
+        db.delete(db.get(Listing, 3))
+        db.get(Listing, 2).name = "Участок под логистику"
+        db.add(Listing(id=4, name="Новый лот", registry_number="ORM-4", start_price=1.0,
+                       address_description="Дмитров", land_allowed_use_name="Магазины"))
+        db.commit()
+
+    with engine.connect() as conn:
+        maintained = indexed(conn)
+        for statement in fts.REBUILD_STATEMENTS:
+            conn.exec_driver_sql(statement)
+        assert maintained == indexed(conn)
+        conn.rollback()
+
+    assert found(engine, "химки") == {1}
+    assert found(engine, "мытищ", columns=fts.ADDRESS_COLUMNS) == {2}
+    assert found(engine, "склад", columns=("land_allowed_use_name",)) == {2}
+    assert found(engine, "логистик") == {2}
+    assert found(engine, "магазин") == {4}
+    assert found(engine, "елочная") == set()
+
+
+def test_yo_is_folded(engine):
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write([make_row(1, address_description="пос. Ёлкино")])
+
+    assert found(engine, "елкино") == found(engine, "Ёлкино") == {1}
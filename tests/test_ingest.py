@@ -0,0 +1,39 @@
+# tests/test_ingest.py
+# Планировщик синхронизаций: проверка crawl_runs не блокирует цикл событий
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from src.services.ingest import IngestScheduler
+
+
+class BlockingRunner:
+    """start() как у IngestRunner: синхронный и медленный (запрос к БД под блокировкой)"""
+
+    def __init__(self):
+        self.thread = None
+        self.release = threading.Event()
+
+    def start(self, mode):
+        self.thread = threading.current_thread()
+        self.release.wait(5)
+        future = Future()
+        future.set_result({"mode": mode, "status": "completed", "inserted": 0})
+        return future
+
+
+def test_scheduler_starts_runner_off_the_event_loop():
+    runner = BlockingRunner()
+
+    async def scenario():
+        run = asyncio.create_task(IngestScheduler(runner=runner).run("incremental"))
+        # Пока start() ждёт, цикл продолжает обслуживать другие задачи
+        await asyncio.sleep(0.05)
+        runner.release.set()
+        return await run
+
+    result = asyncio.run(scenario())
+
+    assert result["status"] == "completed"
+    assert runner.thread is not threading.main_thread()
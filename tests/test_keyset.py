@@ -0,0 +1,95 @@
+# tests/test_keyset.py
+# Обход ленты с курсором по Id: лента растёт и сокращается во время обхода, продолжение с --resume
+
+import pytest
+
+from src.parser.scraper import EasuzParser
+
+PER_PAGE = 10
+
+
+class MutableFeed:
+    """Лента по убыванию Id; changes — {номер запроса: функция(ids)}, меняет ленту перед ответом"""
+
+    def __init__(self, ids, changes=None):
+        self.ids = sorted(ids, reverse=True)
+        self.changes = changes or {}
+        self.requests = 0
+
+    def fetch_page(self, page, per_page):
+        self.requests += 1
+        change = self.changes.pop(self.requests, None)
+        if change:
+            self.ids = sorted(change(self.ids), reverse=True)
+        start = (page - 1) * per_page
+        objects = [{'id': lot_id} for lot_id in self.ids[start:start + per_page]]
+        return objects, {'countTotal': len(self.ids)}
+
+
+@pytest.fixture
+def parser():
+    parser = EasuzParser()
+    yield parser
+    parser.close()
+
+
+def crawl(parser, feed, **kwargs):
+    parser.fetch_page = feed.fetch_page
+    seen = []
+    for _, objects in parser.iter_keyset_pages(PER_PAGE, **kwargs):
+        seen.extend(obj['id'] for obj in objects)
+    return seen
+
+
+def test_stable_feed(parser):
+    seen = crawl(parser, MutableFeed(range(1, 46)))
+
+    assert seen == list(range(45, 0, -1))
+    assert parser.feed_exhausted
+
+
+def test_max_pages_does_not_exhaust_feed(parser):
+    seen = crawl(parser, MutableFeed(range(1, 46)), max_pages=2)
+
+    assert seen == list(range(45, 25, -1))
+    assert not parser.feed_exhausted
+
+
+def test_feed_grows_during_crawl(parser):
+    # Перед второй страницей в начало ленты добавились 5 лотов: страницы сдвинулись вперёд
+    feed = MutableFeed(range(1, 51), {2: lambda ids: ids + list(range(51, 56))})
+
+    seen = crawl(parser, feed)
+
+    assert seen == list(range(50, 0, -1))
+    assert parser.feed_exhausted
+
+
+def test_feed_shrinks_during_crawl(parser):
+    # Перед третьей страницей сняли 5 уже прочитанных лотов: страницы сдвинулись назад
+    feed = MutableFeed(range(1, 51), {3: lambda ids: [i for i in ids if not 41 <= i <= 45]})
+
+    seen = crawl(parser, feed)
+
+    assert seen == list(range(50, 0, -1))
+    assert len(set(seen)) == len(seen)
+
+
+def test_resume_steps_back_to_cursor(parser):
+    # Прерванный обход прочитал 3 страницы (курсор 21), затем сняли 10 лотов из начала ленты:
+    # сохранённая страница 4 теперь начинается с Id 10, и без выравнивания 20…11 пропали бы
+    feed = MutableFeed(range(1, 41))
+
+    seen = crawl(parser, feed, start_page=4, cursor=21)
+
+    assert seen == list(range(20, 0, -1))
+
+
+def test_resume_after_feed_grew(parser):
+    # После прерывания в начало ленты добавились лоты: сохранённая страница уже позади курсора,
+    # повторы отсекаются курсором
+    feed = MutableFeed(range(1, 61))
+
+    seen = crawl(parser, feed, start_page=2, cursor=31)
+
+    assert seen == list(range(30, 0, -1))
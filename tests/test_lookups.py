@@ -0,0 +1,50 @@
+# tests/test_lookups.py
+# Справочники: переход на id — только изменение хранения, тексты читаются как записаны
+
+from sqlalchemy.orm import Session
+
+from src.database.bulk import ListingWriter
+from src.database.models import LandUse, Listing, ListingHistory
+from src.services.search import SearchService
+from tests.conftest import make_row
+
+
+def write(engine, rows):
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write(rows)
+    return writer
+
+
+def test_lookup_values_round_trip(engine):
+    write(engine, [make_row(1), make_row(2, land_allowed_use_name=''), make_row(3, land_allowed_use_name=None)])
+
+    with Session(engine) as db:
+        names = dict(db.query(Listing.id, Listing.land_allowed_use_name))
+        assert names == {1: "Для индивидуального жилищного строительства", 2: '', 3: None}
+        assert db.query(LandUse).count() == 2
+        # Прежний смысл land_plots: land_allowed_use_name IS NOT NULL — '' тоже считается
+        assert SearchService(db).get_stats()["land_plots"] == 2
+
+
+def test_empty_lookup_value_does_not_write_history(engine):
+    write(engine, [make_row(1, land_allowed_use_name='', stage_state_name='')])
+
+    writer = write(engine, [make_row(1, land_allowed_use_name='', stage_state_name='', start_price=5.0)])
+
+    assert writer.updated == 1
+    with Session(engine) as db:
+        changes = [(h.field_name, h.old_value, h.new_value) for h in db.query(ListingHistory)]
+        assert changes == [('start_price', '1000001', '5')]
+        listing = db.get(Listing, 1)
+        assert (listing.land_allowed_use_name, listing.stage_state_name) == ('', '')
+
+
+def test_orm_writes_go_through_lookups(engine):
+    with Session(engine) as db:
+        db.add(Listing(name="Лот", registry_number="ORM-1", start_price=1.0,
+                       land_allowed_use_name='', purchase_kind_name="Продажа"))
+        db.commit()
+    with Session(engine) as db:
+        listing = db.query(Listing).filter(Listing.registry_number == "ORM-1").one()
+        assert (listing.land_allowed_use_name, listing.purchase_kind_name) == ('', "Продажа")
+        assert listing.land_allowed_use_id is not None
@@ -0,0 +1,99 @@
+# tests/test_normalize.py
+# Теневые колонки поиска: муниципалитет, категории назначения, тип сделки
+
+import pytest
+from sqlalchemy.orm import Session
+
+from src.database.bulk import ListingWriter
+from src.database.models import Listing
+from src.database.normalize import (
+    DEAL_RENT, DEAL_SALE, PURPOSE_CATEGORIES, category_mask, deal_type, municipality, municipality_key,
+    purpose_category, purpose_category_ids, purpose_mask,
+)
+from src.services.search import SearchService
+from tests.conftest import make_row
+
+MULTI_USE = "Для индивидуального жилищного строительства; Для ведения личного подсобного хозяйства; Магазины"
+
+
+def category(name):
+    return next(category_id for category_id, value in PURPOSE_CATEGORIES.items() if value == name)
+
+
+def test_municipality_key_matches_forms_of_name():
+    keys = {
+        municipality("Московская обл, Одинцовский г.о., Лесной городок д"),
+        municipality("Московская область, г. Одинцово"),
+        municipality_key("Одинцовский район"),
+    }
+    assert keys == {"одинцов"}
+    assert municipality(None, "Московская обл., г.о. Мытищи") == "мытищ"
+
+
+@pytest.mark.parametrize("noun, adjective", [
+    ("Мытищи", "Мытищинский"),
+    ("Балашиха", "Балашихинский"),
+    ("Химки", "Химкинский"),
+    ("Люберцы", "Люберецкий"),
+    ("Коломна", "Коломенский"),
+    ("Лобня", "Лобненский"),
+    ("Пушкино", "Пушкинский"),
+    ("Луховицы", "Луховицкий"),
+    ("Котельники", "Котельниковский"),
+])
+def test_municipality_key_matches_adjective(noun, adjective):
+    assert municipality_key(noun) == municipality_key(f"{adjective} городской округ")
+
+
+def test_city_filter_finds_lot_by_district_adjective(engine):
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write([
+            make_row(1, address_description="Московская обл., г.о. Мытищи, д. Сгонники"),
+            make_row(2, address_description="Московская обл., г. Химки"),
+        ])
+
+    with Session(engine) as db:
+        service = SearchService(db)
+        for city in ("Мытищинский городской округ", "Мытищи"):
+            query = db.query(Listing.id).filter(service._municipality_condition(city))
+            assert [listing_id for (listing_id,) in query] == [1]
+
+
+def test_purpose_mask_keeps_every_category():
+    assert purpose_category(MULTI_USE) == category("Для индивидуального жилищного строительства")
+    assert purpose_mask(MULTI_USE) == category_mask([
+        category("Для индивидуального жилищного строительства"),
+        category("Для ведения личного подсобного хозяйства"),
+        category("Магазины"),
+    ])
+    # Как LIKE '%Склад%': «Складские площадки» попадает и в «Склад»
+    assert purpose_mask("Складские площадки") == category_mask([category("Склад"), category("Складские площадки")])
+    assert purpose_mask("Иное") is None
+    assert purpose_mask("") is None
+
+
+def test_deal_type():
+    assert deal_type("Аренда земельных участков") == DEAL_RENT
+    assert deal_type("Торги по продаже прав на заключение договоров аренды") == DEAL_RENT
+    assert deal_type("Продажа имущества") == DEAL_SALE
+    assert deal_type("Безвозмездное пользование") is None
+
+
+def test_purpose_filter_finds_multi_use_lot_under_each_category(engine):
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write([
+            make_row(1, land_allowed_use_name=MULTI_USE),
+            make_row(2, land_allowed_use_name="Магазины"),
+            make_row(3, land_allowed_use_name="Склад"),
+        ])
+
+    def found(*purposes):
+        with Session(engine) as db:
+            query = SearchService._apply_purpose_filter(db.query(Listing.id), list(purposes), [])
+            return {listing_id for (listing_id,) in query}
+
+    assert found("Для индивидуального жилищного строительства") == {1}
+    assert found("Для ведения личного подсобного хозяйства") == {1}
+    assert found("Магазины") == {1, 2}
+    assert found("Склад", "Магазины") == {1, 2, 3}
+    assert purpose_category_ids(["Склад", "Неизвестное"]) is None
@@ -0,0 +1,51 @@
+# tests/test_photos.py
+# Кэш фото для Telegram: запись через UPSERT и какие ошибки помечают URL битым
+
+from sqlalchemy.orm import Session
+
+from src.database.models import PhotoCache
+from src.services.photos import PhotoCacheService
+
+URL = "https://easuz.mosreg.ru/photo/1.jpg"
+
+
+def entry(engine):
+    with Session(engine) as db:
+        row = db.get(PhotoCache, URL)
+        db.expunge(row)
+        return row
+
+
+def test_remember_and_mark_bad_upsert(engine):
+    with Session(engine) as db:
+        PhotoCacheService(db).mark_bad(URL, "Bad Request: failed to get HTTP URL content")
+    with Session(engine) as db:
+        PhotoCacheService(db).mark_bad(URL, "Bad Request: wrong type of the web page content")
+    row = entry(engine)
+    assert (row.is_bad, row.failures, row.file_id) == (True, 2, None)
+    assert PhotoCacheService.is_bad(row)
+
+    # Повторная запись того же URL другой сессией не падает на первичном ключе
+    for file_id in ("file-1", "file-2"):
+        with Session(engine) as db:
+            PhotoCacheService(db).remember(URL, file_id)
+    row = entry(engine)
+    assert (row.is_bad, row.file_id, row.last_error) == (False, "file-2", None)
+    assert not PhotoCacheService.is_bad(row)
+
+
+def test_remember_new_url(engine):
+    with Session(engine) as db:
+        PhotoCacheService(db).remember(URL, "file-1")
+    row = entry(engine)
+    assert (row.is_bad, row.failures, row.file_id) == (False, 0, "file-1")
+
+
+def test_only_url_errors_mark_photo_bad():
+    assert PhotoCacheService.is_bad_url_error(
+        "Telegram server says - Bad Request: failed to get HTTP URL content")
+    assert PhotoCacheService.is_bad_url_error("Bad Request: wrong type of the web page content")
+    assert PhotoCacheService.is_bad_url_error("Bad Request: IMAGE_PROCESS_FAILED")
+    assert not PhotoCacheService.is_bad_url_error("Flood control exceeded. Retry in 30 seconds")
+    assert not PhotoCacheService.is_bad_url_error("Bad Request: message caption is too long")
+    assert not PhotoCacheService.is_bad_url_error("Request timeout error")
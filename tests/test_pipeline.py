@@ -0,0 +1,48 @@
+# tests/test_pipeline.py
+# prefetch: фоновый поток завершается и закрывает источник, когда потребитель вышел раньше
+
+import itertools
+import threading
+import time
+
+from src.parser.pipeline import prefetch
+
+
+def test_producer_stops_when_consumer_breaks():
+    closed = threading.Event()
+
+    def source():
+        try:
+            yield from itertools.count()
+        finally:
+            closed.set()
+
+    # Ссылка на генератор остаётся у вызывающего: сборщик мусора его не закроет
+    feed = source()
+    items = prefetch(feed, depth=2)
+    for item in items:
+        if item == 3:
+            break
+    time.sleep(0.1)  # поток заполнил очередь и ждёт в put
+    started = time.monotonic()
+    items.close()
+
+    # После очистки очереди поток выходит сразу, а не по таймауту put
+    assert time.monotonic() - started < 0.25
+    assert closed.is_set()
+    assert not any(thread.name == 'feed-prefetch' for thread in threading.enumerate())
+
+
+def test_source_error_reaches_consumer():
+    def source():
+        yield 1
+        raise ValueError("страница не разобралась")
+
+    items = prefetch(source(), depth=2)
+    assert next(items) == 1
+    try:
+        next(items)
+    except ValueError as e:
+        assert "страница" in str(e)
+    else:
+        raise AssertionError("ошибка источника потерялась")
@@ -0,0 +1,204 @@
+# tests/test_sharding.py
+# ShardCoordinator: план, захват шардов, истечение аренды и завершение запуска
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from src.database.bulk import ListingWriter
+from src.database.models import CrawlRun, CrawlShard, Listing
+from src.parser import sharding
+from src.parser.checkpoint import CrawlRunTracker
+from src.parser.scraper import EasuzParser
+from src.parser.sharding import LeaseLostError, ShardCoordinator
+from tests.conftest import make_row
+
+STALE_ID = 1
+
+
+@pytest.fixture
+def feed(engine, fake_easuz, monkeypatch):
+    """Лента из 25 лотов (3 страницы по 10) и 2 страницы в шарде → 2 шарда"""
+    monkeypatch.setattr(settings, "CRAWL_RATE_BUDGET", 1000.0)
+    monkeypatch.setattr(settings, "CRAWL_SHARD_PAGES", 2)
+    return fake_easuz(25)
+
+
+def plan():
+    parser = EasuzParser()
+    try:
+        return ShardCoordinator.plan(parser)
+    finally:
+        parser.close()
+
+
+def active_ids(engine):
+    with Session(engine) as db:
+        return {listing_id for (listing_id,) in db.query(Listing.id).filter(Listing.is_active == True)}
+
+
+def run_status(engine, run_id):
+    with Session(engine) as db:
+        return db.get(CrawlRun, run_id).status
+
+
+def test_plan_splits_feed_into_overlapping_shards(engine, feed):
+    coordinator = plan()
+
+    with Session(engine) as db:
+        shards = [(s.shard_no, s.page_from, s.page_to, s.status)
+                  for s in db.query(CrawlShard).order_by(CrawlShard.shard_no)]
+    assert shards == [(0, 1, 3, 'pending'), (1, 3, None, 'pending')]
+    assert ShardCoordinator.latest().run_id == coordinator.run_id
+
+
+def test_claim_is_exclusive(feed):
+    coordinator = plan()
+
+    first = coordinator.claim("a")
+    second = coordinator.claim("b")
+
+    assert (first['shard_no'], first['attempts']) == (0, 1)
+    assert second['shard_no'] == 1
+    assert coordinator.claim("c") is None
+    assert coordinator.counts()['leased'] == 2
+
+
+def test_expired_lease_is_reclaimed(engine, feed):
+    coordinator = plan()
+    lost = coordinator.claim("dead")
+    coordinator.claim("b")
+    with engine.begin() as conn:
+        conn.execute(
+            update(CrawlShard.__table__).where(CrawlShard.id == lost['id'])
+            .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+
+    reclaimed = coordinator.claim("alive")
+
+    assert (reclaimed['id'], reclaimed['owner'], reclaimed['attempts']) == (lost['id'], "alive", 2)
+    # Прежний владелец не может отметить шард выполненным
+    with pytest.raises(LeaseLostError):
+        coordinator.complete(lost, 10)
+    coordinator.complete(reclaimed, 10)
+
+
+def test_shard_fails_after_max_attempts(engine, feed):
+    coordinator = ShardCoordinator(plan().run_id, max_attempts=1)
+    shard = coordinator.claim("dead")
+    with engine.begin() as conn:
+        conn.execute(
+            update(CrawlShard.__table__).where(CrawlShard.id == shard['id'])
+            .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+
+    other = coordinator.claim("b")
+
+    assert other['shard_no'] == 1
+    assert coordinator.counts()['failed'] == 1
+
+
+def test_finalize_waits_for_all_shards(engine, feed):
+    coordinator = plan()
+    shard = coordinator.claim("a")
+    coordinator.complete(shard, 20)
+
+    assert coordinator.finalize() is None
+    assert run_status(engine, coordinator.run_id) == 'running'
+
+
+def test_work_crawls_all_shards_and_deactivates(engine, feed):
+    with ListingWriter(engine=engine, generation=None) as writer:
+        writer.write([make_row(STALE_ID)])
+    coordinator = plan()
+
+    assert sharding.work(coordinator.run_id) == 2
+
+    assert run_status(engine, coordinator.run_id) == 'completed'
+    active = active_ids(engine)
+    assert len(active) == 25
+    assert STALE_ID not in active
+    # Повторный finalize уже ничего не делает
+    assert coordinator.finalize() is None
+
+
+def test_plan_refuses_while_another_crawl_runs(feed):
+    tracker = CrawlRunTracker.start('full')
+
+    assert plan() is None
+
+    tracker.finish('completed')
+    assert plan() is not None
+    assert plan() is None          # предыдущий распределённый запуск ещё не завершён
+
+
+def test_finalize_skips_deactivation_after_concurrent_run(engine, feed):
+    with ListingWriter(engine=engine, generation=None) as writer:
+        writer.write([make_row(STALE_ID)])
+    coordinator = plan()
+
+    # Инкрементальный обход стартовал после plan и пометил лот своим (бóльшим) поколением:
+    # generation < run_id его бы не сняло, поэтому снятие пропускается целиком
+    tracker = CrawlRunTracker.start('incremental')
+    with ListingWriter(engine=engine, generation=tracker.run_id) as writer:
+        writer.write([make_row(2)])
+    tracker.finish('completed')
+
+    sharding.work(coordinator.run_id)
+
+    assert run_status(engine, coordinator.run_id) == 'completed'
+    assert {STALE_ID, 2} <= active_ids(engine)
+
+
+def test_concurrent_workers_share_rate_budget(engine, fake_easuz, monkeypatch):
+    budget, workers = 10.0, 4
+    monkeypatch.setattr(settings, "CRAWL_RATE_BUDGET", budget)
+    monkeypatch.setattr(settings, "CRAWL_WORKERS", workers)
+    monkeypatch.setattr(settings, "CRAWL_SHARD_PAGES", 1)
+    # Воркеры — потоки одного процесса: у каждого свой владелец аренды
+    monkeypatch.setattr(sharding, "worker_id", lambda: f"test:{threading.get_ident()}")
+    server = fake_easuz(40)
+    coordinator = plan()
+
+    requests = []
+    count = server.count
+    server.count = lambda key: (requests.append(time.monotonic()), count(key))
+    threads = [threading.Thread(target=sharding.work, args=(coordinator.run_id,)) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert run_status(engine, coordinator.run_id) == 'completed'
+    # Запас токенов на старте у всех воркеров вместе — не больше секунды бюджета
+    duration = requests[-1] - requests[0]
+    assert len(requests) > 2 * budget
+    assert len(requests) <= budget * duration * 1.1 + budget
+
+
+def test_heartbeat_recomputes_rate_share(engine, feed):
+    coordinator = plan()
+    shard = coordinator.claim("a")
+    parser = EasuzParser(rate_limit=settings.CRAWL_RATE_BUDGET)
+    parser.rate_limiter.bucket("portal")
+    renewed = threading.Event()
+
+    def on_renew():
+        parser.set_rate_limit(coordinator.rate_share(workers=4))
+        renewed.set()
+
+    heartbeat = sharding.LeaseHeartbeat(shard['id'], "a", timedelta(seconds=0.3), on_renew=on_renew)
+    heartbeat.start()
+    try:
+        assert renewed.wait(5)
+    finally:
+        heartbeat.stop()
+        parser.close()
+
+    bucket = parser.rate_limiter.bucket("portal")
+    assert bucket.rate == bucket.capacity == settings.CRAWL_RATE_BUDGET / 4
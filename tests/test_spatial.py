@@ -0,0 +1,60 @@
+# tests/test_spatial.py
+# listings_rtree: триггеры и поиск по радиусу
+
+from math import cos, radians
+
+from sqlalchemy.orm import Session
+
+from src.database import spatial
+from src.database.bulk import ListingWriter, deactivate_stale_listings
+from src.database.models import Listing
+from tests.conftest import make_row
+
+CENTER = (55.75, 37.62)
+
+
+def boxes(conn):
+    return set(conn.exec_driver_sql(f"SELECT id, min_lat, max_lat, min_lon, max_lon FROM {spatial.RTREE_TABLE}"))
+
+
+def test_triggers_keep_index_in_sync(engine):
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write([make_row(1), make_row(2), make_row(3), make_row(4, latitude=None, longitude=None)])
+    with ListingWriter(engine=engine, generation=2) as writer:
+        writer.write([make_row(1, latitude=56.1, longitude=38.2), make_row(2, latitude=None, longitude=None),
+                      make_row(3), make_row(4)])
+
+    with Session(engine) as db:
+        db.delete(db.get(Listing, 3))
+        db.add(Listing(id=5, name="Новый лот", registry_number="ORM-5", start_price=1.0,
+                       latitude=CENTER[0], longitude=CENTER[1]))
+        db.commit()
+
+    with engine.connect() as conn:
+        maintained = boxes(conn)
+        assert {row[0] for row in maintained} == {1, 4, 5}
+        for statement in spatial.REBUILD_STATEMENTS:
+            conn.exec_driver_sql(statement)
+        assert maintained == boxes(conn)
+        conn.rollback()
+
+
+def test_points_in_box_covers_radius(engine):
+    # Точки на восток и на север от центра на 1, 4.9 и 5.1 км
+    east = spatial.KM_PER_DEGREE * cos(radians(CENTER[0]))
+    rows = []
+    for lot_id, km in ((1, 1.0), (2, 4.9), (3, 5.1)):
+        rows.append(make_row(lot_id, latitude=CENTER[0], longitude=CENTER[1] + km / east))
+        rows.append(make_row(lot_id + 10, latitude=CENTER[0] + km / spatial.KM_PER_DEGREE, longitude=CENTER[1]))
+    rows.append(make_row(20, latitude=CENTER[0], longitude=CENTER[1]))
+    with ListingWriter(engine=engine, generation=1) as writer:
+        writer.write(rows)
+    with ListingWriter(engine=engine, generation=2) as writer:
+        writer.write([row for row in rows if row.id != 20])
+    deactivate_stale_listings(2, engine=engine)
+
+    with engine.connect() as conn:
+        candidates = spatial.points_in_box(conn, *CENTER, 5.0)
+    within = {lot_id for lot_id, lat, lon in candidates if spatial.haversine(*CENTER, lat, lon) <= 5.0}
+
+    assert within == {1, 2, 11, 12}